@@ -15,8 +15,8 @@ from database.models import init_database
 init_database()
 
 from database.operations import (
-    UserOperations, StudentOperations, AttendanceOperations,
-    TrainingLogOperations
+    UserOperations, StudentOperations, FaceEncodingOperations, AttendanceOperations,
+    TrainingLogOperations, MARK_NEW, MARK_EXISTS
 )
 
 # Paths
@@ -709,7 +709,8 @@ def init_session_state():
         'student_id': None,
         'username': None,
         'page': 'role_select',
-        'selected_role': None
+        'selected_role': None,
+        'capture_encoders': []
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -1364,7 +1365,7 @@ def show_student_dashboard():
 
     # Recent attendance
     st.markdown('<div class="section-title">Recent Attendance</div>', unsafe_allow_html=True)
-    records = AttendanceOperations.get_student_attendance(st.session_state.student_id)[:5]
+    records = AttendanceOperations.get_student_attendance(st.session_state.student_id, limit=5)
 
     if records:
         for record in records:
@@ -1445,26 +1446,36 @@ def show_mark_attendance():
             """, unsafe_allow_html=True)
 
 
-def run_student_recognition():
-    """Run face recognition for student"""
-    model_path = TRAINED_MODELS_DIR / "face_encodings.pkl"
+def face_label_overlay(labels: list):
+    """Preview draw callback for [((top, right, bottom, left), text, color, font_scale)] face labels"""
+    import cv2
+    from utils.camera import scale_rect
 
-    if not model_path.exists():
-        st.error("Recognition model not trained. Contact admin.")
-        return
+    def draw(canvas, scale):
+        for (top, right, bottom, left), text, color, font_scale in labels:
+            x, y, w, h = scale_rect((left, top, right - left, bottom - top), scale)
+            cv2.rectangle(canvas, (x, y), (x + w, y + h), color, 3)
+            cv2.putText(canvas, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 2)
+    return draw
 
+
+def run_student_recognition():
+    """Run face recognition for student"""
     try:
         import cv2
+        from utils.camera import PreviewRenderer
+        from utils.face_recognizer import FaceRecognizer
         import numpy as np
-        import pickle
         import face_recognition
 
-        with open(model_path, 'rb') as f:
-            data = pickle.load(f)
+        recognizer = FaceRecognizer()
+        if not recognizer.known_ids:
+            st.error("Recognition model not trained. Contact admin.")
+            return
 
-        known_encodings = [np.array(enc) for enc in data['encodings']]
-        known_ids = data['ids']
-        known_names = data['names']
+        known_encodings = recognizer.known_encodings
+        known_ids = recognizer.known_ids
+        known_names = recognizer.known_names
 
         if st.session_state.student_id not in known_ids:
             st.error("Your face is not registered. Contact admin.")
@@ -1476,6 +1487,7 @@ def run_student_recognition():
             return
 
         camera_placeholder = st.empty()
+        preview = PreviewRenderer(camera_placeholder)
         status_placeholder = st.empty()
         result_placeholder = st.empty()
 
@@ -1490,6 +1502,7 @@ def run_student_recognition():
                 break
 
             frame = cv2.flip(frame, 1)
+            labels = []
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
             face_locations = face_recognition.face_locations(rgb_frame, model='hog')
@@ -1509,9 +1522,7 @@ def run_student_recognition():
                             matched_name = known_names[best_match_idx]
 
                             if matched_id == st.session_state.student_id:
-                                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 3)
-                                cv2.putText(frame, "MATCHED!", (left, top-10),
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                                labels.append(((top, right, bottom, left), "MATCHED!", (0, 255, 0), 0.8))
 
                                 success, msg = AttendanceOperations.mark_attendance(
                                     student_id=matched_id,
@@ -1522,16 +1533,11 @@ def run_student_recognition():
                                     matched = True
                                     result_placeholder.success(f"Attendance marked! Welcome, {matched_name}")
                             else:
-                                cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 3)
-                                cv2.putText(frame, "Wrong person", (left, top-10),
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                                labels.append(((top, right, bottom, left), "Wrong person", (0, 0, 255), 0.6))
                         else:
-                            cv2.rectangle(frame, (left, top), (right, bottom), (0, 165, 255), 3)
-                            cv2.putText(frame, "Unknown", (left, top-10),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+                            labels.append(((top, right, bottom, left), "Unknown", (0, 165, 255), 0.8))
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            camera_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
+            preview.render(frame, face_label_overlay(labels), force=matched)
             frame_count += 1
 
         cap.release()
@@ -1753,15 +1759,14 @@ def show_admin_dashboard():
         st.markdown(f'<div class="stat-card"><div class="stat-value" style="color:#f97316;">{rate}%</div><div class="stat-label">Attendance Rate</div></div>', unsafe_allow_html=True)
 
     st.markdown('<div class="section-title">Today\'s Attendance</div>', unsafe_allow_html=True)
-    records = AttendanceOperations.get_daily_attendance()
+    records = AttendanceOperations.get_daily_attendance_with_students()
 
     if records:
         for record in records:
-            student = StudentOperations.get_student(record.student_id)
             time_str = record.time_in.strftime('%H:%M:%S') if record.time_in else 'N/A'
             st.markdown(f"""
             <div class="attendance-row" style="display:flex;justify-content:space-between;align-items:center;">
-                <div><strong>{student.name if student else record.student_id}</strong><br><span style="font-size:12px;color:#64748b;">{record.student_id}</span></div>
+                <div><strong>{record.name or record.student_id}</strong><br><span style="font-size:12px;color:#64748b;">{record.student_id}</span></div>
                 <div><span style="font-size:12px;color:#64748b;">{time_str}</span> <span class="status-present" style="margin-left:10px;">{record.status}</span></div>
             </div>
             """, unsafe_allow_html=True)
@@ -1778,16 +1783,18 @@ def show_admin_students():
 
     st.markdown('<div class="header-bar"><h2 style="margin:0;">All Students</h2></div>', unsafe_allow_html=True)
 
-    students = StudentOperations.get_all_students()
+    students = StudentOperations.list_students()
 
     if not students:
         st.info("No students registered yet")
         return
 
+    all_stats = AttendanceOperations.get_all_student_stats()
+
     for student in students:
-        stats = AttendanceOperations.get_student_attendance_stats(student.student_id)
-        face_status = "status-present" if student.face_encoding else "status-absent"
-        face_text = "Face OK" if student.face_encoding else "No Face"
+        stats = all_stats.get(student.student_id, {'percentage': 0.0})
+        face_status = "status-present" if student.has_face_encoding else "status-absent"
+        face_text = "Face OK" if student.has_face_encoding else "No Face"
 
         col1, col2 = st.columns([4, 1])
         with col1:
@@ -1893,7 +1900,8 @@ def show_admin_edit_student():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Delete Face Data", use_container_width=True):
-            # Clear face encoding
+            # Clear stored encodings and the registration summary
+            FaceEncodingOperations.delete_encodings(student_id)
             success, msg = StudentOperations.update_student(student_id, face_encoding=None, image_count=0)
             if success:
                 # Delete face images
@@ -1941,6 +1949,8 @@ def show_admin_capture():
             st.rerun()
 
     st.markdown('<div class="header-bar"><h2 style="margin:0;">Add Face Images</h2></div>', unsafe_allow_html=True)
+    from utils.image_writer import report_capture_encoding
+    report_capture_encoding()
 
     students = StudentOperations.get_all_students()
 
@@ -2022,6 +2032,7 @@ def capture_faces(student_id: str, num_images: int):
     """Capture faces"""
     try:
         import cv2
+        from utils.camera import PreviewRenderer, scale_rect
 
         folder = DATASET_DIR / student_id
         folder.mkdir(parents=True, exist_ok=True)
@@ -2035,6 +2046,7 @@ def capture_faces(student_id: str, num_images: int):
             return
 
         camera_placeholder = st.empty()
+        preview = PreviewRenderer(camera_placeholder)
         progress = st.progress(0)
         status = st.empty()
 
@@ -2042,6 +2054,9 @@ def capture_faces(student_id: str, num_images: int):
         existing = len(list(folder.glob('*.jpg')))
         status.info("Capturing... Move head slowly")
 
+        from utils.image_writer import start_capture_writer
+        writer, encoder = start_capture_writer()
+
         while captured < num_images:
             ret, frame = cap.read()
             if not ret:
@@ -2052,26 +2067,38 @@ def capture_faces(student_id: str, num_images: int):
             faces = face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(100, 100))
 
             for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                 face_img = frame[y:y+h, x:x+w]
                 face_resized = cv2.resize(face_img, (200, 200))
-                img_path = folder / f"{student_id}_{existing + captured + 1:04d}.jpg"
-                cv2.imwrite(str(img_path), face_resized)
+                if writer.submit(student_id, face_resized, existing + captured + 1) is None:
+                    continue
                 captured += 1
                 progress.progress(captured / num_images)
 
-            cv2.putText(frame, f"Captured: {captured}/{num_images}", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            def draw_overlays(canvas, scale):
+                for rect in faces:
+                    x, y, w, h = scale_rect(rect, scale)
+                    cv2.rectangle(canvas, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                cv2.putText(canvas, f"Captured: {captured}/{num_images}", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            camera_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
+            # Boxes go on the preview only, never into the saved crops
+            preview.render(frame, draw_overlays)
 
         cap.release()
         camera_placeholder.empty()
 
+        write_report = writer.close()
+        if encoder:
+            # Encoding keeps going in the background, reported on a later run
+            encoder.finish()
+            st.session_state.capture_encoders.append(encoder)
+        if write_report['failed']:
+            st.warning(f"{len(write_report['failed'])} images could not be saved: "
+                       f"{write_report['failed'][0][1]}")
+
         total = len(list(folder.glob('*.jpg')))
         StudentOperations.update_student(student_id, image_count=total)
-        st.success(f"Captured {captured} images!")
+        st.success(f"Captured {write_report['written']} images!")
 
     except Exception as e:
         st.error(f"Error: {str(e)}")
@@ -2105,11 +2132,13 @@ def train_model():
         import face_recognition
         import pickle
         import numpy as np
+        from utils.face_recognizer import image_source_hash
 
         TRAINED_MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
         students = StudentOperations.get_all_students()
         encodings, ids, names = [], [], []
+        gallery, image_counts = {}, {}
 
         progress = st.progress(0)
         status = st.empty()
@@ -2129,17 +2158,23 @@ def train_model():
                 image = face_recognition.load_image_file(str(img_path))
                 face_encs = face_recognition.face_encodings(image)
                 if face_encs:
-                    student_encodings.append(face_encs[0])
+                    student_encodings.append((face_encs[0], None, image_source_hash(img_path.read_bytes())))
 
             if student_encodings:
-                avg_encoding = np.mean(student_encodings, axis=0)
+                avg_encoding = np.mean([enc for enc, _, _ in student_encodings], axis=0)
                 encodings.append(avg_encoding.tolist())
                 ids.append(student.student_id)
                 names.append(student.name)
-                StudentOperations.update_face_encoding(student.student_id, avg_encoding.tolist(), len(images))
+                gallery[student.student_id] = student_encodings
+                image_counts[student.student_id] = len(images)
 
             progress.progress((i + 1) / len(students))
 
+        success, msg = FaceEncodingOperations.replace_encodings(gallery, image_counts, exclusive=True)
+        if not success:
+            st.error(msg)
+            return
+
         model_path = TRAINED_MODELS_DIR / "face_encodings.pkl"
         with open(model_path, 'wb') as f:
             pickle.dump({'encodings': encodings, 'ids': ids, 'names': names}, f)
@@ -2174,6 +2209,14 @@ def process_uploaded_photos(student_id: str, student_name: str, uploaded_files,
         rejected_count = 0
         saved_images = []
 
+        # Encode the saved crops in the background so training can reuse them
+        from config.settings import CAPTURE_SETTINGS
+        encoder = None
+        if CAPTURE_SETTINGS['precompute_encodings']:
+            from utils.face_recognizer import CaptureEncoder
+            encoder = CaptureEncoder()
+            encoder.start()
+
         for i, uploaded_file in enumerate(uploaded_files):
             status.info(f"Processing {uploaded_file.name}...")
 
@@ -2231,6 +2274,8 @@ def process_uploaded_photos(student_id: str, student_name: str, uploaded_files,
             # Save image
             img_path = folder / f"{student_id}_{existing_count + saved_count + 1:04d}.jpg"
             cv2.imwrite(str(img_path), face_resized)
+            if encoder:
+                encoder.submit(img_path, face_resized)
             saved_count += 1
             saved_images.append(image)
 
@@ -2239,6 +2284,10 @@ def process_uploaded_photos(student_id: str, student_name: str, uploaded_files,
         status.empty()
         progress.empty()
 
+        # Training below reads the precomputed encodings, so let them finish
+        if encoder:
+            encoder.close()
+
         # Update student image count
         total_images = len(list(folder.glob('*.jpg')) + list(folder.glob('*.png')) + list(folder.glob('*.jpeg')))
         StudentOperations.update_student(student_id, image_count=total_images)
@@ -2271,9 +2320,8 @@ def process_uploaded_photos(student_id: str, student_name: str, uploaded_files,
                 if training_data:
                     success, msg = recognizer.train_model(training_data)
                     if success:
+                        # train_model stored every student's encodings in the face_encodings table
                         st.success(f"Model trained successfully! {msg}")
-                        # Update face encoding status
-                        StudentOperations.update_face_encoding(student_id, [1], total_images)  # Placeholder encoding
                     else:
                         st.error(f"Training failed: {msg}")
                 else:
@@ -2318,18 +2366,24 @@ def run_quick_attendance():
     """Run quick attendance recognition"""
     try:
         import cv2
+        from utils.camera import PreviewRenderer
         import face_recognition
-        import pickle
+        from utils.face_recognizer import FaceRecognizer
         import numpy as np
         import time
+        from database.attendance_index import get_marked_today_index
 
-        model_path = TRAINED_MODELS_DIR / "face_encodings.pkl"
-        with open(model_path, 'rb') as f:
-            data = pickle.load(f)
+        marked_index = get_marked_today_index()
+        marked_index.load()
+
+        recognizer = FaceRecognizer()
+        if not recognizer.known_ids:
+            st.error("Recognition model not trained. Contact admin.")
+            return
 
-        known_encodings = [np.array(enc) for enc in data['encodings']]
-        known_ids = data['ids']
-        known_names = data['names']
+        known_encodings = recognizer.known_encodings
+        known_ids = recognizer.known_ids
+        known_names = recognizer.known_names
 
         cap = cv2.VideoCapture(0)
         if not cap.isOpened():
@@ -2337,6 +2391,7 @@ def run_quick_attendance():
             return
 
         camera_placeholder = st.empty()
+        preview = PreviewRenderer(camera_placeholder)
         result_placeholder = st.empty()
         status_placeholder = st.empty()
 
@@ -2352,6 +2407,7 @@ def run_quick_attendance():
                 break
 
             frame = cv2.flip(frame, 1)
+            labels = []
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
             face_locations = face_recognition.face_locations(rgb_frame, model='hog')
@@ -2370,30 +2426,31 @@ def run_quick_attendance():
                             matched_id = known_ids[best_idx]
                             matched_name = known_names[best_idx]
 
-                            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 3)
-                            cv2.putText(frame, matched_name, (left, top-10),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                            labels.append(((top, right, bottom, left), matched_name, (0, 255, 0), 0.8))
 
                             # Check if student exists
                             student = StudentOperations.get_student(matched_id)
                             if student:
-                                # Check if already marked today
-                                if AttendanceOperations.check_attendance_exists(matched_id):
+                                # Answer "already marked" from memory, otherwise a single upsert
+                                if matched_id in marked_index:
+                                    outcome = MARK_EXISTS
+                                else:
+                                    outcome = AttendanceOperations.mark_attendance_bulk([{
+                                        'student_id': matched_id,
+                                        'confidence_score': 1-min_distance,
+                                        'status': 'Present'
+                                    }], record_time_out=False).get(matched_id)
+                                if outcome == MARK_EXISTS:
                                     status_placeholder.warning(f"Attendance already marked for {matched_name} today!")
+                                elif outcome == MARK_NEW:
+                                    status_placeholder.success(f"Attendance marked successfully for {matched_name}!")
                                 else:
-                                    success, msg = AttendanceOperations.mark_attendance(matched_id, 1-min_distance, 'Present')
-                                    if success:
-                                        status_placeholder.success(f"Attendance marked successfully for {matched_name}!")
-                                    else:
-                                        status_placeholder.error(f"Failed to mark attendance: {msg}")
+                                    status_placeholder.error("Failed to mark attendance")
                                 attendance_marked = True
                         else:
-                            cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 3)
-                            cv2.putText(frame, "Unknown", (left, top-10),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+                            labels.append(((top, right, bottom, left), "Unknown", (0, 0, 255), 0.8))
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            camera_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
+            preview.render(frame, face_label_overlay(labels), force=attendance_marked)
 
         cap.release()
 
@@ -2436,17 +2493,22 @@ def run_admin_recognition():
     """Run admin recognition"""
     try:
         import cv2
+        from utils.camera import PreviewRenderer
         import face_recognition
-        import pickle
+        from utils.face_recognizer import FaceRecognizer
         import numpy as np
+        from collections import deque
+        from database.attendance_queue import get_attendance_sink
+        from database.attendance_index import get_marked_today_index
 
-        model_path = TRAINED_MODELS_DIR / "face_encodings.pkl"
-        with open(model_path, 'rb') as f:
-            data = pickle.load(f)
+        recognizer = FaceRecognizer()
+        if not recognizer.known_ids:
+            st.error("Recognition model not trained. Contact admin.")
+            return
 
-        known_encodings = [np.array(enc) for enc in data['encodings']]
-        known_ids = data['ids']
-        known_names = data['names']
+        known_encodings = recognizer.known_encodings
+        known_ids = recognizer.known_ids
+        known_names = recognizer.known_names
 
         cap = cv2.VideoCapture(0)
         if not cap.isOpened():
@@ -2454,9 +2516,15 @@ def run_admin_recognition():
             return
 
         camera_placeholder = st.empty()
+        preview = PreviewRenderer(camera_placeholder)
         result_placeholder = st.empty()
         marked = set()
 
+        sink = get_attendance_sink()
+        results = deque()
+        marked_index = get_marked_today_index()
+        marked_index.load()
+
         st.info("Press 'q' in camera window or refresh page to stop")
 
         while True:
@@ -2464,7 +2532,16 @@ def run_admin_recognition():
             if not ret:
                 break
 
+            while results:
+                event = results.popleft()
+                if event['type'] == 'marked':
+                    result_placeholder.success(f"Marked: {event['name']}")
+                elif event['type'] == 'failed':
+                    result_placeholder.error(f"Not marked: {event['name']} - {event['message']}")
+                    marked.discard(event['student_id'])
+
             frame = cv2.flip(frame, 1)
+            labels = []
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
             face_locations = face_recognition.face_locations(rgb_frame, model='hog')
@@ -2483,23 +2560,17 @@ def run_admin_recognition():
                             matched_id = known_ids[best_idx]
                             matched_name = known_names[best_idx]
 
-                            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 3)
-                            cv2.putText(frame, matched_name, (left, top-10),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                            labels.append(((top, right, bottom, left), matched_name, (0, 255, 0), 0.8))
 
-                            if matched_id not in marked:
-                                if not AttendanceOperations.check_attendance_exists(matched_id):
-                                    success, msg = AttendanceOperations.mark_attendance(matched_id, 1-min_distance, 'Present')
-                                    if success:
-                                        marked.add(matched_id)
-                                        result_placeholder.success(f"Marked: {matched_name}")
+                            if matched_id not in marked and matched_id not in marked_index:
+                                # Written in the background, reported once committed
+                                if sink.submit(matched_id, 1-min_distance, 'Present', name=matched_name,
+                                               on_result=results.append):
+                                    marked.add(matched_id)
                         else:
-                            cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 3)
-                            cv2.putText(frame, "Unknown", (left, top-10),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+                            labels.append(((top, right, bottom, left), "Unknown", (0, 0, 255), 0.8))
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            camera_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
+            preview.render(frame, face_label_overlay(labels))
 
     except Exception as e:
         st.error(f"Error: {str(e)}")
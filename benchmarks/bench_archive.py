@@ -0,0 +1,172 @@
+"""
+Benchmark of dashboard query latency against attendance table size
+For each history size the dashboard queries are timed with every record in the
+hot table, then again after all terms before the current one are archived.
+A report spanning the archives is timed too, to show the cost of the union read
+
+Usage: python benchmarks/bench_archive.py --rows 50000 200000 800000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+TERM_DAYS = 120
+
+
+def _timed(fn, repeat: int) -> float:
+    """Median milliseconds of repeat calls"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def seed(rows: int, students: int) -> tuple:
+    """History of rows records ending yesterday, split into TERM_DAYS-day terms"""
+    from sqlalchemy import insert
+    from database.models import get_session, rebuild_daily_stats, Student, Attendance
+
+    student_ids = [f"BENCH{i:05d}" for i in range(students)]
+    days = -(-rows // students)
+    today = date.today()
+    first_day = today - timedelta(days=days)
+
+    session = get_session()
+    try:
+        session.execute(insert(Student), [
+            {'student_id': sid, 'name': f"Student {sid}", 'department': f"Dept {i % 8}"}
+            for i, sid in enumerate(student_ids)
+        ])
+        batch = []
+        for d in range(days):
+            day = first_day + timedelta(days=d)
+            for i, sid in enumerate(student_ids):
+                batch.append({'student_id': sid, 'date': day,
+                              'time_in': (datetime(2020, 1, 1, 8) + timedelta(seconds=i)).time(),
+                              'status': 'Present' if i % 10 else 'Late'})
+            if len(batch) >= 50000:
+                session.execute(insert(Attendance), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Attendance), batch)
+        session.commit()
+    finally:
+        session.close()
+    rebuild_daily_stats()
+
+    # Terms are counted back from today; the newest one stays in the hot table
+    terms = []
+    term_end = today - timedelta(days=TERM_DAYS + 1)
+    while term_end >= first_day:
+        term_start = max(first_day, term_end - timedelta(days=TERM_DAYS - 1))
+        terms.append((f"term-{term_start.isoformat()}", term_start, term_end))
+        term_end = term_start - timedelta(days=1)
+    return student_ids, first_day, terms
+
+
+def measure(student_ids: list, first_day: date, repeat: int) -> dict:
+    from database.operations import AttendanceOperations
+
+    today = date.today()
+    term_start = today - timedelta(days=TERM_DAYS)
+    unmarked = iter(student_ids)
+    stamp = datetime.combine(today, datetime.min.time()).replace(hour=9)
+
+    return {
+        'today count': _timed(AttendanceOperations.get_today_attendance_count, repeat),
+        'today list': _timed(AttendanceOperations.get_daily_attendance_with_students, repeat),
+        'mark attendance': _timed(
+            lambda: AttendanceOperations.mark_attendance(next(unmarked), 0.9, timestamp=stamp), repeat
+        ),
+        'term stats': _timed(lambda: AttendanceOperations.get_all_student_stats(term_start, today), repeat),
+        'report page': _timed(
+            lambda: AttendanceOperations.get_attendance_report_page(today - timedelta(days=30), today),
+            repeat
+        ),
+        'full-history page': _timed(
+            lambda: AttendanceOperations.get_attendance_report_page(first_day, today), repeat
+        ),
+    }
+
+
+def run_size(rows: int, students: int, repeat: int, results):
+    os.environ['ATTENDANCE_DB_PATH'] = str(Path(tempfile.mkdtemp(prefix="attendance_bench_")) / "bench.db")
+    try:
+        from database.archive import archive_term
+
+        student_ids, first_day, terms = seed(rows, students)
+        # Each measurement marks repeat students, so split them between the two passes
+        half = len(student_ids) // 2
+        before = measure(student_ids[:half], first_day, repeat)
+
+        start = time.perf_counter()
+        for term, term_start, term_end in terms:
+            success, msg = archive_term(term, term_start, term_end)
+            if not success:
+                raise RuntimeError(msg)
+        archive_seconds = time.perf_counter() - start
+
+        after = measure(student_ids[half:], first_day, repeat)
+        results.put((None, (rows, len(terms), archive_seconds, before, after)))
+    except Exception:
+        results.put((traceback.format_exc(), None))
+
+
+def wait_result(proc, results, timeout: float):
+    """Result sent by proc; raises with the child's traceback if it failed or died"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            error, result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not proc.is_alive():
+                raise RuntimeError(f"Benchmark process exited with code {proc.exitcode}")
+            if time.monotonic() > deadline:
+                proc.terminate()
+                raise TimeoutError(f"Benchmark process gave no result within {timeout:.0f} s")
+    proc.join()
+    if error:
+        raise RuntimeError(f"Benchmark process failed:\n{error}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000, 200000, 800000])
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=3600, help="Seconds allowed per size")
+    args = parser.parse_args()
+    if args.repeat * 2 > args.students:
+        parser.error("--students must be at least twice --repeat")
+
+    ctx = mp.get_context('spawn')
+    for rows in args.rows:
+        # A fresh process per size so each gets its own database and engine
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_size, args=(rows, args.students, args.repeat, results))
+        proc.start()
+        rows, terms, archive_seconds, before, after = wait_result(proc, results, args.timeout)
+
+        print(f"\n{rows} records, {terms} terms archived in {archive_seconds:.1f} s (median ms)")
+        print(f"{'query':<20} {'all in hot table':>17} {'after archiving':>16}")
+        for name in before:
+            print(f"{name:<20} {before[name]:17.2f} {after[name]:16.2f}")
+
+
+if __name__ == '__main__':
+    main()
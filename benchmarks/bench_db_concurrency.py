@@ -0,0 +1,166 @@
+"""
+Concurrency benchmark of the SQLite database
+Kiosk-style writer processes mark attendance while report readers run
+get_attendance_report over the whole range. Each run is done twice, writers
+alone and writers with readers, so the extra write latency is the time spent
+waiting on locks held by readers
+
+Usage: python benchmarks/bench_db_concurrency.py --writers 4 --readers 2 --seconds 10
+       python benchmarks/bench_db_concurrency.py --journal-mode DELETE --synchronous FULL
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASE_DAY = date(2020, 1, 1)
+
+
+def _setup(db_path: str, pragmas: dict):
+    """Point a fresh process at the benchmark database before anything imports it"""
+    os.environ['ATTENDANCE_DB_PATH'] = db_path
+    from config.settings import DATABASE_SETTINGS
+    DATABASE_SETTINGS.update(pragmas)
+
+
+def _writer(db_path, pragmas, student_ids, first_day, seconds, results):
+    _setup(db_path, pragmas)
+    from database.operations import AttendanceOperations
+    AttendanceOperations.get_today_attendance_count()  # Open the pool before timing
+
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    day = first_day
+    while time.perf_counter() < deadline:
+        stamp = datetime.combine(BASE_DAY + timedelta(days=day), datetime.min.time())
+        for sid in student_ids:
+            start = time.perf_counter()
+            success, _ = AttendanceOperations.mark_attendance(
+                sid, confidence_score=0.9, timestamp=stamp.replace(hour=9)
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not success:
+                errors += 1
+        day += 1
+    results.put(('write', latencies, errors))
+
+
+def _reader(db_path, pragmas, seconds, results):
+    _setup(db_path, pragmas)
+    from database.operations import AttendanceOperations
+
+    latencies, rows = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        rows = len(AttendanceOperations.get_attendance_report(BASE_DAY, date(2100, 1, 1)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.put(('read', latencies, rows))
+
+
+def seed(db_path: str, pragmas: dict, students: int, days: int) -> list:
+    """Create students and a history of attendance for the readers to scan"""
+    _setup(db_path, pragmas)
+    from sqlalchemy import insert
+    from database.models import get_session, Student, Attendance
+
+    student_ids = [f"BENCH{i:05d}" for i in range(students)]
+    session = get_session()
+    try:
+        session.execute(insert(Student), [
+            {'student_id': sid, 'name': f"Student {sid}"} for sid in student_ids
+        ])
+        session.execute(insert(Attendance), [
+            {'student_id': sid, 'date': BASE_DAY + timedelta(days=d),
+             'time_in': datetime.min.time(), 'status': 'Present'}
+            for d in range(days) for sid in student_ids
+        ])
+        session.commit()
+    finally:
+        session.close()
+    return student_ids
+
+
+def run_phase(ctx, db_path, pragmas, student_ids, writers, readers, seconds, first_day):
+    results = ctx.Queue()
+    chunks = [student_ids[i::writers] for i in range(writers)]
+    procs = [
+        ctx.Process(target=_writer, args=(db_path, pragmas, chunk, first_day, seconds, results))
+        for chunk in chunks
+    ] + [
+        ctx.Process(target=_reader, args=(db_path, pragmas, seconds, results))
+        for _ in range(readers)
+    ]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    writes = [lat for kind, lats, _ in collected if kind == 'write' for lat in lats]
+    errors = sum(extra for kind, _, extra in collected if kind == 'write')
+    reads = [lat for kind, lats, _ in collected if kind == 'read' for lat in lats]
+    return writes, errors, reads
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--history-days', type=int, default=250)
+    parser.add_argument('--journal-mode', default=None, help="Override journal_mode, e.g. DELETE")
+    parser.add_argument('--synchronous', default=None, help="Override synchronous, e.g. FULL")
+    args = parser.parse_args()
+
+    pragmas = {}
+    if args.journal_mode:
+        pragmas['journal_mode'] = args.journal_mode
+    if args.synchronous:
+        pragmas['synchronous'] = args.synchronous
+
+    db_path = str(Path(tempfile.mkdtemp(prefix="attendance_bench_")) / "bench.db")
+    student_ids = seed(db_path, pragmas, args.students, args.history_days)
+
+    from config.settings import DATABASE_SETTINGS
+    print(f"journal_mode={DATABASE_SETTINGS['journal_mode']} "
+          f"synchronous={DATABASE_SETTINGS['synchronous']} "
+          f"rows={args.students * args.history_days}")
+
+    ctx = mp.get_context('spawn')
+    alone, alone_errors, _ = run_phase(ctx, db_path, pragmas, student_ids,
+                                       args.writers, 0, args.seconds, args.history_days)
+    mixed, mixed_errors, reads = run_phase(ctx, db_path, pragmas, student_ids,
+                                           args.writers, args.readers, args.seconds,
+                                           args.history_days + 10000)
+
+    for label, lats, errors in (("writers alone", alone, alone_errors),
+                                ("with readers", mixed, mixed_errors)):
+        print(f"{label:<14} {len(lats) / args.seconds:8.1f} writes/s   "
+              f"p50 {percentile(lats, 0.5):7.2f} ms   p99 {percentile(lats, 0.99):7.2f} ms   "
+              f"errors {errors}")
+    if reads:
+        print(f"{'reports':<14} {len(reads) / args.seconds:8.1f} reads/s    "
+              f"p50 {percentile(reads, 0.5):7.2f} ms")
+
+    if alone and mixed:
+        wait = statistics.mean(mixed) - statistics.mean(alone)
+        print(f"mean lock wait per write caused by readers: {max(wait, 0.0):.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of per-call database overhead
+Times AttendanceOperations.check_attendance_exists with the shared engine against
+the previous behaviour, where every get_session() built a new engine, ran
+create_all and queried for the admin user
+
+Usage: python benchmarks/bench_db_session.py --calls 500 --students 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def time_calls(func, student_ids, calls: int) -> list:
+    """Per-call latencies in milliseconds"""
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(student_ids[i % len(student_ids)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<10} mean {statistics.mean(latencies):8.3f} ms   "
+          f"p50 {statistics.median(latencies):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--students', type=int, default=200)
+    args = parser.parse_args()
+
+    # Work on a throwaway database, never the real one
+    tmpdir = tempfile.mkdtemp(prefix="attendance_bench_")
+    os.environ['ATTENDANCE_DB_PATH'] = str(Path(tmpdir) / "bench.db")
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import models, operations
+    from database.models import Base, User, Student
+    from database.operations import AttendanceOperations
+
+    session = models.get_session()
+    student_ids = [f"BENCH{i:05d}" for i in range(args.students)]
+    session.add_all(Student(student_id=sid, name=f"Student {sid}") for sid in student_ids)
+    session.commit()
+    session.close()
+    for sid in student_ids[::2]:
+        AttendanceOperations.mark_attendance(sid, confidence_score=0.9)
+
+    def legacy_get_session():
+        """get_session() as it was: new engine, create_all and admin lookup per call"""
+        engine = create_engine(f'sqlite:///{models.DATABASE_PATH}', echo=False)
+        Base.metadata.create_all(engine)
+        seed = sessionmaker(bind=engine)()
+        try:
+            seed.query(User).filter(User.username == 'admin').first()
+        finally:
+            seed.close()
+        return sessionmaker(bind=engine)()
+
+    shared_get_session = operations.get_session
+
+    print(f"check_attendance_exists x {args.calls} ({args.students} students)")
+
+    operations.get_session = legacy_get_session
+    try:
+        report("before", time_calls(AttendanceOperations.check_attendance_exists,
+                                    student_ids, args.calls))
+    finally:
+        operations.get_session = shared_get_session
+
+    report("after", time_calls(AttendanceOperations.check_attendance_exists,
+                               student_ids, args.calls))
+
+
+if __name__ == '__main__':
+    main()
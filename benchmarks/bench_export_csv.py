@@ -0,0 +1,144 @@
+"""
+Benchmark of CSV report export
+Compares the list-of-dicts + DataFrame export with the streaming exporter writing
+to a file and to an in-memory buffer (as handed to st.download_button). Each
+variant runs in its own process and reports time and peak RSS growth
+
+Usage: python benchmarks/bench_export_csv.py --rows 1000000
+"""
+
+import argparse
+import io
+import multiprocessing as mp
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASE_DAY = date(2020, 1, 1)
+
+
+def seed(rows: int, students: int) -> tuple:
+    """Fill a throwaway database with students x days attendance records"""
+    from sqlalchemy import insert
+    from database.models import get_session, Student, Attendance
+
+    student_ids = [f"BENCH{i:05d}" for i in range(students)]
+    days = -(-rows // students)
+    session = get_session()
+    try:
+        session.execute(insert(Student), [
+            {'student_id': sid, 'name': f"Student {sid}", 'department': f"Dept {i % 8}"}
+            for i, sid in enumerate(student_ids)
+        ])
+        batch = []
+        written = 0
+        for d in range(days):
+            for i, sid in enumerate(student_ids):
+                if written == rows:
+                    break
+                batch.append({'student_id': sid, 'date': BASE_DAY + timedelta(days=d),
+                              'time_in': (datetime(2020, 1, 1, 9) + timedelta(seconds=i)).time(),
+                              'status': 'Present', 'confidence_score': 0.9})
+                written += 1
+            if len(batch) >= 50000:
+                session.execute(insert(Attendance), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Attendance), batch)
+        session.commit()
+    finally:
+        session.close()
+    return BASE_DAY, BASE_DAY + timedelta(days=days)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_variant(variant: str, db_path: str, start_date: date, end_date: date, results):
+    os.environ['ATTENDANCE_DB_PATH'] = db_path
+    from database.operations import AttendanceOperations
+    from utils.export import ExportManager
+
+    export_manager = ExportManager()
+    # Warm the engine so its setup is not counted
+    AttendanceOperations.get_attendance_report_page(start_date, end_date, limit=1)
+    baseline = _peak_rss_mb()
+    out_dir = tempfile.mkdtemp(prefix="attendance_export_")
+
+    start = time.perf_counter()
+    if variant == 'dataframe':
+        data = export_manager.prepare_attendance_data(
+            AttendanceOperations.get_attendance_report(start_date, end_date)
+        )
+        path = export_manager.export_to_csv(data, filename=None)
+        size = os.path.getsize(path)
+        os.unlink(path)
+    elif variant == 'stream to file':
+        path = str(Path(out_dir) / "report.csv")
+        with open(path, 'wb') as f:
+            export_manager.export_attendance_csv(
+                AttendanceOperations.iter_attendance_report(start_date, end_date), f
+            )
+        size = os.path.getsize(path)
+    else:
+        buffer = export_manager.export_attendance_csv(
+            AttendanceOperations.iter_attendance_report(start_date, end_date), io.BytesIO()
+        )
+        size = buffer.getbuffer().nbytes
+    elapsed = time.perf_counter() - start
+
+    results.put((variant, elapsed, _peak_rss_mb() - baseline, size))
+
+
+def wait_result(proc, results, timeout: float = 3600):
+    """Result sent by proc; raises if it exits without one (its traceback is on stderr)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not proc.is_alive():
+                raise RuntimeError(f"Benchmark process exited with code {proc.exitcode}")
+            if time.monotonic() > deadline:
+                proc.terminate()
+                raise TimeoutError(f"Benchmark process gave no result within {timeout:.0f} s")
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--students', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = str(Path(tempfile.mkdtemp(prefix="attendance_bench_")) / "bench.db")
+    os.environ['ATTENDANCE_DB_PATH'] = db_path
+    start = time.perf_counter()
+    start_date, end_date = seed(args.rows, args.students)
+    print(f"Seeded {args.rows} attendance rows in {time.perf_counter() - start:.1f} s")
+
+    ctx = mp.get_context('spawn')
+    print(f"{'variant':<16} {'seconds':>8} {'rows/s':>10} {'peak RSS +MB':>13} {'CSV MB':>8}")
+    for variant in ('dataframe', 'stream to file', 'stream to buffer'):
+        # A fresh process per variant so peak RSS is not carried over
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_variant, args=(variant, db_path, start_date, end_date, results))
+        proc.start()
+        variant, elapsed, rss_mb, size = wait_result(proc, results)
+        print(f"{variant:<16} {elapsed:8.2f} {args.rows / elapsed:10.0f} {rss_mb:13.1f} "
+              f"{size / (1024 * 1024):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
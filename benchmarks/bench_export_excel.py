@@ -0,0 +1,78 @@
+"""
+Benchmark of Excel report export
+Compares the DataFrame.to_excel export with the constant_memory xlsxwriter
+exporter (one sheet, and one sheet per department) streaming from the report
+query. Each variant runs in its own process and reports time and peak RSS growth
+
+Usage: python benchmarks/bench_export_excel.py --rows 200000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_export_csv import seed, wait_result, _peak_rss_mb
+
+
+def run_variant(variant: str, db_path: str, start_date: date, end_date: date, results):
+    os.environ['ATTENDANCE_DB_PATH'] = db_path
+    from database.operations import AttendanceOperations
+    from utils.export import ExportManager
+
+    export_manager = ExportManager()
+    # Warm the engine so its setup is not counted
+    AttendanceOperations.get_attendance_report_page(start_date, end_date, limit=1)
+    baseline = _peak_rss_mb()
+    path = str(Path(tempfile.mkdtemp(prefix="attendance_export_")) / "report.xlsx")
+
+    start = time.perf_counter()
+    if variant == 'dataframe':
+        data = export_manager.prepare_attendance_data(
+            AttendanceOperations.get_attendance_report(start_date, end_date)
+        )
+        path = export_manager.export_to_excel(data)
+    else:
+        with open(path, 'wb') as f:
+            export_manager.export_attendance_excel(
+                AttendanceOperations.iter_attendance_report(start_date, end_date), f,
+                split_by_department=(variant == 'stream by dept')
+            )
+    elapsed = time.perf_counter() - start
+
+    size = os.path.getsize(path)
+    os.unlink(path)
+    results.put((variant, elapsed, _peak_rss_mb() - baseline, size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--students', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = str(Path(tempfile.mkdtemp(prefix="attendance_bench_")) / "bench.db")
+    os.environ['ATTENDANCE_DB_PATH'] = db_path
+    start_date, end_date = seed(args.rows, args.students)
+    print(f"{args.rows} attendance rows")
+
+    ctx = mp.get_context('spawn')
+    print(f"{'variant':<16} {'seconds':>8} {'rows/s':>10} {'peak RSS +MB':>13} {'XLSX MB':>8}")
+    for variant in ('dataframe', 'stream', 'stream by dept'):
+        # A fresh process per variant so peak RSS is not carried over
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_variant, args=(variant, db_path, start_date, end_date, results))
+        proc.start()
+        variant, elapsed, rss_mb, size = wait_result(proc, results)
+        print(f"{variant:<16} {elapsed:8.2f} {args.rows / elapsed:10.0f} {rss_mb:13.1f} "
+              f"{size / (1024 * 1024):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of PDF report export
+Times the single-table export_to_pdf against the chunked exporter streaming from
+the report query, in one document and with parallel per-department sections,
+and reports seconds per 10k rows for each report size
+
+Usage: python benchmarks/bench_export_pdf.py --rows 10000 50000 200000
+"""
+
+import argparse
+import io
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_export_csv import seed, wait_result
+
+
+def run_size(rows: int, students: int, legacy_max: int, workers: int, results):
+    os.environ['ATTENDANCE_DB_PATH'] = str(Path(tempfile.mkdtemp(prefix="attendance_bench_")) / "bench.db")
+    from database.operations import AttendanceOperations
+    from utils.export import ExportManager, write_department_pdf
+
+    start_date, end_date = seed(rows, students)
+    export_manager = ExportManager()
+    timings = {}
+
+    if rows <= legacy_max:
+        start = time.perf_counter()
+        data = export_manager.prepare_attendance_data(
+            AttendanceOperations.get_attendance_report(start_date, end_date)
+        )
+        path = export_manager.export_to_pdf(data)
+        timings['single table'] = time.perf_counter() - start
+        if path:
+            os.unlink(path)
+
+    start = time.perf_counter()
+    export_manager.export_attendance_pdf(
+        AttendanceOperations.iter_attendance_report(start_date, end_date), io.BytesIO()
+    )
+    timings['chunked'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_department_pdf(start_date, end_date, io.BytesIO(), max_workers=workers)
+    timings['by department'] = time.perf_counter() - start
+
+    results.put((rows, timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None, help="Section processes (default: CPUs)")
+    parser.add_argument('--legacy-max', type=int, default=50000,
+                        help="Largest report timed with the single-table exporter")
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    print(f"{'rows':>8} {'variant':<14} {'seconds':>8} {'s per 10k':>10}")
+    for rows in args.rows:
+        # A fresh process per size so each gets its own database and engine
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_size,
+                           args=(rows, args.students, args.legacy_max, args.workers, results))
+        proc.start()
+        rows, timings = wait_result(proc, results)
+        for variant, seconds in timings.items():
+            print(f"{rows:8d} {variant:<14} {seconds:8.2f} {seconds / rows * 10000:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
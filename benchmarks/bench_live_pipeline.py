@@ -0,0 +1,132 @@
+"""
+Headless benchmark of the live attendance pipeline
+Drives AttendancePipeline from the replay camera and reports sustained FPS,
+per-frame latency percentiles and memory growth over the run
+
+Usage: python benchmarks/bench_live_pipeline.py --seconds 300 --fps 0 --faces 4
+"""
+
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import TRAINED_MODELS_DIR, REPLAY_SETTINGS
+from utils.camera import CameraManager, REPLAY_SOURCE
+from utils.attendance_pipeline import AttendancePipeline
+
+
+def current_rss_mb() -> float:
+    """Resident set size in MB (Linux /proc, falling back to peak RSS)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_pipeline(use_db: bool) -> AttendancePipeline:
+    """Load whichever trained recognizers exist, like the Mark Attendance page"""
+    dlib_recognizer = lbph_recognizer = None
+    from database.operations import FaceEncodingOperations
+    if FaceEncodingOperations.has_gallery(TRAINED_MODELS_DIR / "face_encodings.pkl"):
+        from utils.face_recognizer import FaceRecognizer
+        dlib_recognizer = FaceRecognizer()
+    elif (TRAINED_MODELS_DIR / "lbph_model.yml").exists():
+        from utils.face_recognizer import LBPHRecognizer
+        lbph_recognizer = LBPHRecognizer()
+    else:
+        print("No trained model found: measuring detection only")
+
+    sink = None
+    if use_db:
+        from database.attendance_queue import get_attendance_sink
+        sink = get_attendance_sink()
+
+    return AttendancePipeline(
+        dlib_recognizer=dlib_recognizer,
+        lbph_recognizer=lbph_recognizer,
+        mark_attendance=use_db,
+        sink=sink
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60, help="Run duration")
+    parser.add_argument('--fps', type=float, default=0, help="Replay fps (0 = unthrottled)")
+    parser.add_argument('--faces', type=int, default=REPLAY_SETTINGS['faces_per_frame'],
+                        help="Faces composited per frame")
+    parser.add_argument('--video', help="Loop this video instead of dataset crops")
+    parser.add_argument('--with-db', action='store_true', help="Mark attendance in the database")
+    parser.add_argument('--sample-every', type=float, default=10, help="Memory sample interval (s)")
+    args = parser.parse_args()
+
+    REPLAY_SETTINGS['fps'] = args.fps
+    REPLAY_SETTINGS['faces_per_frame'] = args.faces
+
+    source = f"{REPLAY_SOURCE}:{args.video}" if args.video else REPLAY_SOURCE
+    camera = CameraManager(source)
+    if not camera.start():
+        sys.exit("Replay source has nothing to play (empty dataset and no --video)")
+
+    pipeline = build_pipeline(args.with_db)
+
+    latencies = []
+    memory = [(0.0, current_rss_mb())]
+    faces_seen = 0
+    events = 0
+
+    started = time.perf_counter()
+    next_sample = started + args.sample_every
+
+    try:
+        while time.perf_counter() - started < args.seconds:
+            ret, frame = camera.read_frame()
+            if not ret:
+                break
+
+            t0 = time.perf_counter()
+            faces, frame_events = pipeline.process_frame(frame)
+            latencies.append(time.perf_counter() - t0)
+
+            faces_seen += len(faces)
+            events += len(frame_events)
+
+            if t0 >= next_sample:
+                memory.append((t0 - started, current_rss_mb()))
+                next_sample += args.sample_every
+    finally:
+        camera.stop()
+
+    elapsed = time.perf_counter() - started
+    memory.append((elapsed, current_rss_mb()))
+
+    if not latencies:
+        sys.exit("No frames processed")
+
+    ms = np.array(latencies) * 1000
+    print(f"Frames:        {len(ms)} in {elapsed:.1f}s")
+    print(f"Sustained FPS: {len(ms) / elapsed:.2f}")
+    print(f"Faces/frame:   {faces_seen / len(ms):.2f}  events: {events}")
+    print("Latency (ms):  p50={:.1f} p90={:.1f} p95={:.1f} p99={:.1f} max={:.1f}".format(
+        *np.percentile(ms, [50, 90, 95, 99]), ms.max()))
+
+    # Memory growth: slope of RSS over time, after the first sample warms caches
+    times = np.array([t for t, _ in memory])
+    rss = np.array([m for _, m in memory])
+    slope = np.polyfit(times[1:], rss[1:], 1)[0] * 60 if len(memory) > 2 else 0.0
+    print(f"RSS (MB):      start={rss[0]:.1f} end={rss[-1]:.1f} peak={rss.max():.1f} "
+          f"growth={slope:.2f} MB/min")
+
+
+if __name__ == '__main__':
+    main()
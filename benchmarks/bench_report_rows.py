@@ -0,0 +1,103 @@
+"""
+Benchmark of report read paths
+Compares loading the attendance report as ORM (Attendance, Student) pairs with the
+read-only AttendanceRow projection, both fully materialized and streamed, and
+reports rows/second and peak Python memory per 100k rows
+
+Usage: python benchmarks/bench_report_rows.py --rows 200000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASE_DAY = date(2020, 1, 1)
+
+
+def seed(rows: int, students: int):
+    """Fill a throwaway database with students x days attendance records"""
+    from sqlalchemy import insert
+    from database.models import get_session, Student, Attendance
+
+    student_ids = [f"BENCH{i:05d}" for i in range(students)]
+    days = -(-rows // students)
+    session = get_session()
+    try:
+        session.execute(insert(Student), [
+            {'student_id': sid, 'name': f"Student {sid}", 'department': f"Dept {i % 8}"}
+            for i, sid in enumerate(student_ids)
+        ])
+        records = [
+            {'student_id': sid, 'date': BASE_DAY + timedelta(days=d),
+             'time_in': (datetime(2020, 1, 1, 9) + timedelta(seconds=i)).time(),
+             'status': 'Present', 'confidence_score': 0.9}
+            for d in range(days) for i, sid in enumerate(student_ids)
+        ][:rows]
+        for start in range(0, len(records), 50000):
+            session.execute(insert(Attendance), records[start:start + 50000])
+        session.commit()
+    finally:
+        session.close()
+    return BASE_DAY, BASE_DAY + timedelta(days=days)
+
+
+def measure(label: str, load):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_100k = peak / max(count, 1) * 100000 / (1024 * 1024)
+    print(f"{label:<22} {count / elapsed:10.0f} rows/s   peak {per_100k:8.1f} MB per 100k rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--students', type=int, default=500)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="attendance_bench_")
+    os.environ['ATTENDANCE_DB_PATH'] = str(Path(tmpdir) / "bench.db")
+
+    from database.models import get_session, Attendance, Student
+    from database.operations import AttendanceOperations
+
+    start_date, end_date = seed(args.rows, args.students)
+    print(f"{args.rows} attendance rows")
+
+    def orm_pairs():
+        session = get_session()
+        try:
+            return len(session.query(Attendance, Student).join(
+                Student, Attendance.student_id == Student.student_id
+            ).filter(
+                Attendance.date >= start_date, Attendance.date <= end_date
+            ).order_by(Attendance.date.desc(), Attendance.time_in).all())
+        finally:
+            session.close()
+
+    def row_list():
+        return len(AttendanceOperations.get_attendance_report(start_date, end_date))
+
+    def row_stream():
+        return sum(1 for _ in AttendanceOperations.iter_attendance_report(start_date, end_date))
+
+    measure("ORM objects (.all())", orm_pairs)
+    measure("AttendanceRow list", row_list)
+    measure("AttendanceRow stream", row_stream)
+
+
+if __name__ == '__main__':
+    main()
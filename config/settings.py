@@ -12,6 +12,24 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Database settings
 DATABASE_PATH = BASE_DIR / "database" / "attendance.db"
 
+# SQLite connection pragmas, applied to every pooled connection
+DATABASE_SETTINGS = {
+    "journal_mode": "WAL",  # Readers no longer block the attendance writers
+    "synchronous": "NORMAL",  # fsync at checkpoints instead of on every commit (safe with WAL)
+    "mmap_size": 256 * 1024 * 1024,  # Bytes of the database file memory-mapped for reads
+    "cache_size_kb": 64 * 1024,  # Page cache per connection
+    "busy_timeout_ms": 5000,  # Wait this long for a lock before "database is locked"
+    "wal_autocheckpoint": 1000,  # Pages in the WAL before SQLite checkpoints on commit (0 = off)
+    "checkpoint_interval": 0,  # Seconds between background checkpoints (0 = disabled)
+    "checkpoint_mode": "PASSIVE",  # PASSIVE, FULL, RESTART or TRUNCATE
+}
+
+# Archived terms: attendance moved out of the hot table into per-term SQLite files
+ARCHIVE_SETTINGS = {
+    "directory": None,  # Where archive files live (None = "archive" next to the database)
+    "max_attached": 8,  # Archive files one connection keeps attached (SQLite allows 10)
+}
+
 # Dataset paths
 DATASET_DIR = BASE_DIR / "dataset"
 TRAINED_MODELS_DIR = BASE_DIR / "trained_models"
@@ -46,6 +64,43 @@ CAMERA_SETTINGS = {
     "frame_width": 640,
     "frame_height": 480,
     "fps": 30,
+    "probe_max_devices": 5,  # Device indices checked when listing cameras
+    "probe_ttl_seconds": 300,  # Reuse the cached device list for this long
+}
+
+# Buffered system log (system_logs table) settings
+SYSTEM_LOG_SETTINGS = {
+    "flush_interval": 2.0,  # Seconds between background bulk inserts
+    "flush_size": 200,  # Flush early once this many entries are buffered
+    "max_pending": 5000,  # Entries held in memory before the overload policy applies
+    "overload_policy": "sample",  # 'drop' new entries or 'sample' them when overloaded
+    "sample_every": 10,  # With 'sample', keep one in this many entries (errors are always kept)
+}
+
+# Live preview settings (display is decoupled from the processing rate)
+DISPLAY_SETTINGS = {
+    "max_fps": 10,  # Preview frames sent to the browser per second
+    "scale": 0.75,  # Preview size relative to the camera frame
+    "jpeg_quality": 80,
+}
+
+# Replay camera settings (synthetic source for headless load testing)
+REPLAY_SETTINGS = {
+    "fps": 15,  # Frames served per second (0 = as fast as the consumer reads)
+    "faces_per_frame": 3,  # Dataset crops composited into each frame
+    "video_path": None,  # Loop this video file instead of dataset crops
+    "max_cached_crops": 256,  # Decoded crops kept in memory
+}
+
+# Offline (recorded lecture) attendance settings
+VIDEO_ATTENDANCE_SETTINGS = {
+    "chunk_seconds": 60,  # Length of each chunk handed to a worker process
+    "frame_skip": 10,  # Process every Nth frame (faces stay in view for many frames)
+    "max_workers": None,  # None = os.cpu_count()
+    "detection_scale": 0.5,  # Downscale factor for face detection
+    "num_jitters": 1,  # Encoding jitters per detected face (live-speed setting)
+    "min_detections": 2,  # Sightings required before a student is marked
+    "image_sequence_fps": 1.0,  # Assumed frame rate for image-directory sources
 }
 
 # Dataset capture settings
@@ -53,6 +108,32 @@ CAPTURE_SETTINGS = {
     "num_images": 50,  # Number of images to capture per person
     "capture_interval": 0.1,  # Seconds between captures
     "image_size": (200, 200),
+    "writer_queue_size": 64,  # Crops buffered for the background writer
+    "fsync_batch": 16,  # fsync after this many files (0 = leave to the OS)
+    "jpeg_quality": 95,
+    "precompute_encodings": True,  # Encode crops in the background so training can skip them
+}
+
+# Bulk enrollment from a CSV roster and a photos/<student_id>/* tree
+BULK_IMPORT_SETTINGS = {
+    "max_workers": None,  # Photo-processing processes (None = os.cpu_count())
+    "face_padding": 30,  # Pixels kept around the detected face when cropping
+    "photo_extensions": (".jpg", ".jpeg", ".png"),
+    "state_dir": LOGS_DIR / "bulk_import",  # Resume state and per-student reports
+}
+
+# PDF report export settings
+PDF_EXPORT_SETTINGS = {
+    "rows_per_table": 40,  # Rows per table flowable (about one A4 page)
+    "rows_per_part": 10000,  # Rows rendered per document part before concatenation (needs pypdf)
+    "max_workers": None,  # Processes rendering department sections (None = os.cpu_count())
+}
+
+# On-disk cache of generated report downloads
+EXPORT_CACHE_SETTINGS = {
+    "enabled": True,
+    "directory": EXPORTS_DIR / "cache",
+    "max_bytes": 256 * 1024 * 1024,  # Least recently used files are evicted above this size
 }
 
 # Attendance settings
@@ -60,6 +141,14 @@ ATTENDANCE_SETTINGS = {
     "duplicate_check_hours": 24,  # Hours before allowing duplicate entry
     "confidence_threshold": 0.65,  # Minimum confidence for marking attendance (stricter)
     "unknown_threshold": 0.5,  # Below this, mark as unknown
+    "sink_flush_ms": 250,  # Write-behind queue: commit queued marks at least this often
+    "sink_batch_size": 50,  # ...or as soon as this many are queued
+    "sink_queue_size": 1000,  # Marks allowed to wait before submit() falls back
+    "sink_retry_attempts": 3,  # Failed writes of a mark are retried this many times
+    "sink_retry_backoff_ms": 500,  # ...after this delay, doubled on every attempt
+    # Ask the database when a student is missing from the in-memory "marked today" index.
+    # Only needed when other processes (kiosks) write to the same database file
+    "marked_index_db_fallback": False,
 }
 
 # Liveness detection settings
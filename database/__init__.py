@@ -1,3 +1,14 @@
 """Database package"""
-from .models import init_database, get_session, Student, Attendance, TrainingLog, SystemLog
-from .operations import StudentOperations, AttendanceOperations, TrainingLogOperations, SystemLogOperations
+from .models import (
+    init_database, get_session, get_engine, Student, FaceEncoding, Attendance, AttendanceArchive,
+    DataVersion, TrainingLog, SystemLog
+)
+from .operations import (
+    StudentOperations, FaceEncodingOperations, AttendanceOperations, TrainingLogOperations,
+    SystemLogOperations
+)
+from .attendance_queue import AttendanceSink, get_attendance_sink
+from .attendance_index import MarkedTodayIndex, get_marked_today_index
+from .rows import AttendanceRow, StudentRow
+from .log_buffer import SystemLogBuffer, get_system_log_buffer
+from .archive import archive_term, restore_term, list_archives
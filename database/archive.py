@@ -0,0 +1,342 @@
+"""
+Attendance Archive
+Closed terms are moved out of the attendance table into per-term SQLite files.
+Reads that reach into an archived range attach those files read-only on the
+session's connection and query the union of the hot table and the archives.
+SQLite limits how many files one connection can attach, so ranges spanning more
+archives are read in batches (aggregates) or copied into a temp table (row reads)
+"""
+
+import os
+import re
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional
+import sys
+
+from sqlalchemy import (
+    MetaData, Table, Column, create_engine, select, insert, delete, func, and_, union_all
+)
+from sqlalchemy.schema import CreateTable
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import ARCHIVE_SETTINGS
+
+from .models import DATABASE_PATH, get_engine, get_session, Attendance, AttendanceArchive
+
+logger = logging.getLogger(__name__)
+
+# Schema name prefix of attached archive files
+SCHEMA_PREFIX = 'archive_'
+
+# Attendance table copies bound to an attached schema, by schema name
+_schema_tables = {}
+
+# Rows moved per round trip when archived rows are copied into the temp table
+ARCHIVE_COPY_ROWS = 5000
+
+# Per-connection temp table holding archived rows of reads that span too many archives.
+# Named apart from 'attendance': unqualified names resolve to temp tables first
+_archived_rows = Table(
+    'attendance_archived', MetaData(),
+    *[Column(column.name, column.type) for column in Attendance.__table__.c],
+    schema='temp'
+)
+
+
+def get_archive_dir() -> Path:
+    """Directory holding the per-term archive files"""
+    directory = ARCHIVE_SETTINGS['directory']
+    return Path(directory) if directory else DATABASE_PATH.parent / "archive"
+
+
+def _slug(term: str) -> str:
+    slug = re.sub(r'[^0-9A-Za-z]+', '_', term).strip('_').lower()
+    if not slug:
+        raise ValueError(f"Invalid term name: {term!r}")
+    return slug
+
+
+def _schema_table(schema: str):
+    """The attendance table as seen inside an attached schema"""
+    table = _schema_tables.get(schema)
+    if table is None:
+        table = Attendance.__table__.to_metadata(MetaData(), schema=schema)
+        _schema_tables[schema] = table
+    return table
+
+
+def list_archives(session=None) -> List[AttendanceArchive]:
+    """Archived terms, oldest first"""
+    own_session = session is None
+    session = session or get_session()
+    try:
+        return session.query(AttendanceArchive).order_by(AttendanceArchive.start_date).all()
+    finally:
+        if own_session:
+            session.close()
+
+
+def _overlapping(session, start_date: Optional[date], end_date: Optional[date]) -> list:
+    query = session.query(AttendanceArchive)
+    if start_date:
+        query = query.filter(AttendanceArchive.end_date >= start_date)
+    if end_date:
+        query = query.filter(AttendanceArchive.start_date <= end_date)
+    return query.order_by(AttendanceArchive.start_date).all()
+
+
+def archived_dates(session, days) -> set:
+    """The dates among days that fall in an archived term, whose records are read-only"""
+    days = set(days)
+    if not days:
+        return set()
+    archives = _overlapping(session, min(days), max(days))
+    return {day for day in days if any(a.start_date <= day <= a.end_date for a in archives)}
+
+
+def _attach(connection, archives: list) -> list:
+    """
+    Attach archive files read-only to this pooled connection, reusing earlier attachments
+    Returns the schema names, in the order of archives
+    """
+    attached = connection.info.setdefault('attendance_archives', {})
+    wanted = {SCHEMA_PREFIX + _slug(a.term): a for a in archives}
+
+    limit = ARCHIVE_SETTINGS['max_attached']
+    if len(wanted) > limit:
+        raise ValueError(f"Query spans {len(wanted)} archived terms; at most {limit} can be attached")
+
+    # Make room by detaching files this query does not need
+    for schema in [s for s in attached if s not in wanted]:
+        if len(attached) + len(set(wanted) - set(attached)) <= limit:
+            break
+        connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+        del attached[schema]
+
+    for schema, archive in wanted.items():
+        signature = (archive.filename, archive.created_at)
+        if attached.get(schema) == signature:
+            continue
+        if schema in attached:
+            # The term was restored and archived again since this connection attached it
+            connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+            del attached[schema]
+
+        path = get_archive_dir() / archive.filename
+        if not path.exists():
+            raise FileNotFoundError(f"Archive file for term {archive.term} is missing: {path}")
+        connection.exec_driver_sql(
+            f"ATTACH DATABASE ? AS {schema}", (path.resolve().as_uri() + "?mode=ro",)
+        )
+        attached[schema] = signature
+    return list(wanted)
+
+
+def _batches(archives: list) -> list:
+    """archives split into groups that can be attached at the same time"""
+    limit = ARCHIVE_SETTINGS['max_attached']
+    return [archives[i:i + limit] for i in range(0, len(archives), limit)]
+
+
+def _filtered(table, start_date: Optional[date], end_date: Optional[date],
+              student_id: Optional[str]):
+    """SELECT of table's rows within the range (and for one student)"""
+    stmt = select(table)
+    if start_date:
+        stmt = stmt.where(table.c.date >= start_date)
+    if end_date:
+        stmt = stmt.where(table.c.date <= end_date)
+    if student_id:
+        stmt = stmt.where(table.c.student_id == student_id)
+    return stmt
+
+
+def _union(tables: list, start_date, end_date, student_id):
+    parts = [_filtered(table, start_date, end_date, student_id) for table in tables]
+    if len(parts) == 1:
+        return parts[0].subquery('attendance_all')
+    return union_all(*parts).subquery('attendance_all')
+
+
+def _materialize(connection, archives: list, start_date, end_date, student_id):
+    """
+    Copy the matching archived rows into this connection's temp table
+    Each file is read through its own read-only connection rather than attached:
+    the copy runs in a transaction, and SQLite cannot detach a file the open
+    transaction has read, so attachments could not be rotated
+    """
+    connection.execute(CreateTable(_archived_rows, if_not_exists=True))
+    connection.execute(delete(_archived_rows))
+    source = Attendance.__table__
+    for archive in archives:
+        path = get_archive_dir() / archive.filename
+        if not path.exists():
+            raise FileNotFoundError(f"Archive file for term {archive.term} is missing: {path}")
+        reader = create_engine(f"sqlite:///{path.resolve().as_uri()}?mode=ro&uri=true")
+        try:
+            with reader.connect() as archive_conn:
+                result = archive_conn.execution_options(yield_per=ARCHIVE_COPY_ROWS).execute(
+                    _filtered(source, start_date, end_date, student_id)
+                )
+                for rows in result.mappings().partitions():
+                    connection.execute(insert(_archived_rows), [dict(row) for row in rows])
+        finally:
+            reader.dispose()
+    return _archived_rows
+
+
+def attendance_source(session, start_date: date = None, end_date: date = None,
+                      student_id: str = None):
+    """
+    Table to read attendance from for a date range
+    The attendance table itself when no archived term overlaps the range, otherwise
+    a UNION ALL of it and the overlapping archives (attached on the session's connection).
+    When the range spans more archives than can be attached, their rows (for student_id
+    only, if given) are first copied into a temp table on the connection
+    """
+    archives = _overlapping(session, start_date, end_date)
+    if not archives:
+        return Attendance.__table__
+
+    connection = session.connection()
+    if len(archives) <= ARCHIVE_SETTINGS['max_attached']:
+        tables = [_schema_table(s) for s in _attach(connection, archives)]
+    else:
+        tables = [_materialize(connection, archives, start_date, end_date, student_id)]
+    return _union([Attendance.__table__] + tables, start_date, end_date, student_id)
+
+
+def attendance_source_batches(session, start_date: date = None, end_date: date = None,
+                              student_id: str = None) -> Iterator:
+    """
+    Sources that together cover the range, for aggregates that can be merged
+    Each attaches at most ARCHIVE_SETTINGS['max_attached'] archives, so a source must be
+    fully read before the next one is taken; the attendance table is in the first
+    """
+    archives = _overlapping(session, start_date, end_date)
+    if not archives:
+        yield Attendance.__table__
+        return
+
+    for index, batch in enumerate(_batches(archives)):
+        tables = [_schema_table(s) for s in _attach(session.connection(), batch)]
+        if index == 0:
+            tables.insert(0, Attendance.__table__)
+        yield _union(tables, start_date, end_date, student_id)
+
+
+def archive_term(term: str, start_date: date, end_date: date) -> tuple:
+    """
+    Move the attendance records of a closed term into their own SQLite file
+    Daily aggregates are kept, so summaries over the term still work without the file
+    """
+    if start_date > end_date:
+        return False, "Start date is after end date"
+    if end_date >= date.today():
+        return False, "Only terms that have ended can be archived"
+
+    session = get_session()
+    try:
+        if session.query(AttendanceArchive).filter(AttendanceArchive.term == term).first():
+            return False, f"Term {term} is already archived"
+        if _overlapping(session, start_date, end_date):
+            return False, "Date range overlaps an archived term"
+    finally:
+        session.close()
+
+    archive_dir = get_archive_dir()
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    filename = f"attendance_{_slug(term)}.db"
+    path = archive_dir / filename
+    if path.exists():
+        return False, f"Archive file already exists: {path}"
+
+    hot = Attendance.__table__
+    in_term = and_(hot.c.date >= start_date, hot.c.date <= end_date)
+    partial = path.with_suffix('.partial')
+    if partial.exists():
+        partial.unlink()
+
+    # 1. Write the term into a fresh file with the same table definition
+    archive_engine = create_engine(f'sqlite:///{partial}')
+    try:
+        hot.create(archive_engine)
+    finally:
+        archive_engine.dispose()
+
+    engine = get_engine()
+    schema = 'pending_archive'
+    target = _schema_table(schema)
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (str(partial),))
+            try:
+                conn.execute(insert(target).from_select(
+                    [c.name for c in hot.c], select(hot).where(in_term)
+                ))
+                conn.commit()
+                copied = conn.execute(select(func.count()).select_from(target)).scalar()
+                expected = conn.execute(select(func.count()).select_from(hot).where(in_term)).scalar()
+            finally:
+                conn.rollback()
+                conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+
+        if copied != expected:
+            raise RuntimeError(f"Copied {copied} of {expected} records")
+        os.replace(partial, path)
+
+        # 2. Drop the term from the hot table and register the file in one transaction
+        with engine.begin() as conn:
+            conn.execute(delete(hot).where(in_term))
+            conn.execute(insert(AttendanceArchive).values(
+                term=term, filename=filename, start_date=start_date,
+                end_date=end_date, row_count=copied
+            ))
+    except Exception as e:
+        logger.error(f"Archiving term {term} failed: {str(e)}")
+        for leftover in (partial, path):
+            if leftover.exists():
+                leftover.unlink()
+        return False, f"Error: {str(e)}"
+
+    logger.info(f"Archived term {term}: {copied} records to {path}")
+    return True, f"Archived {copied} records of term {term}"
+
+
+def restore_term(term: str) -> tuple:
+    """Move an archived term back into the attendance table and delete its file"""
+    session = get_session()
+    try:
+        archive = session.query(AttendanceArchive).filter(AttendanceArchive.term == term).first()
+        if not archive:
+            return False, f"Term {term} is not archived"
+        filename = archive.filename
+    finally:
+        session.close()
+
+    path = get_archive_dir() / filename
+    if not path.exists():
+        return False, f"Archive file is missing: {path}"
+
+    hot = Attendance.__table__
+    schema = 'restoring_archive'
+    source = _schema_table(schema)
+    try:
+        with get_engine().connect() as conn:
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+            try:
+                conn.execute(insert(hot).from_select([c.name for c in hot.c], select(source)))
+                conn.execute(delete(AttendanceArchive).where(AttendanceArchive.term == term))
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+    except Exception as e:
+        logger.error(f"Restoring term {term} failed: {str(e)}")
+        return False, f"Error: {str(e)}"
+
+    path.unlink()
+    logger.info(f"Restored term {term} from {path}")
+    return True, f"Restored term {term}"
@@ -0,0 +1,120 @@
+"""
+Marked-Today Index
+In-memory set of students with an attendance record for the current day,
+shared by every recognition loop in the process
+"""
+
+import threading
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Optional
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import ATTENDANCE_SETTINGS
+
+from .models import get_session, Attendance
+
+logger = logging.getLogger(__name__)
+
+
+class MarkedTodayIndex:
+    """
+    Day-scoped set of student IDs marked today
+    Loaded with one query and reloaded when the date rolls over; our own
+    writes keep it current through AttendanceOperations
+    """
+
+    def __init__(self, db_fallback: bool = None):
+        self.db_fallback = (ATTENDANCE_SETTINGS['marked_index_db_fallback']
+                            if db_fallback is None else db_fallback)
+        self._day = None
+        self._marked = set()
+        self._lock = threading.Lock()
+
+    def load(self, target_date: date = None):
+        """(Re)load the set for a day (default today) with a single query"""
+        target_date = target_date or date.today()
+        session = get_session()
+        try:
+            rows = session.query(Attendance.student_id).filter(
+                Attendance.date == target_date
+            ).all()
+        finally:
+            session.close()
+
+        with self._lock:
+            self._day = target_date
+            self._marked = {student_id for (student_id,) in rows}
+        logger.debug(f"Loaded {len(rows)} marked students for {target_date}")
+
+    def _ensure_current(self):
+        if self._day != date.today():
+            self.load()
+
+    def contains(self, student_id: str) -> bool:
+        """Whether the student is already marked today"""
+        self._ensure_current()
+        with self._lock:
+            if student_id in self._marked:
+                return True
+        if not self.db_fallback:
+            return False
+
+        # Another process may have marked the student since we loaded
+        session = get_session()
+        try:
+            found = session.query(Attendance.id).filter(
+                Attendance.student_id == student_id,
+                Attendance.date == self._day
+            ).first() is not None
+        finally:
+            session.close()
+        if found:
+            self.add([student_id], self._day)
+        return found
+
+    __contains__ = contains
+
+    def add(self, student_ids: Iterable[str], day: date = None):
+        """Record students marked on a day; ignored unless it is the indexed day"""
+        with self._lock:
+            if (day or date.today()) == self._day:
+                self._marked.update(student_ids)
+
+    def discard(self, student_id: str, day: date = None):
+        """Forget a student whose record for the day was removed"""
+        with self._lock:
+            if (day or date.today()) == self._day:
+                self._marked.discard(student_id)
+
+    def __len__(self) -> int:
+        self._ensure_current()
+        with self._lock:
+            return len(self._marked)
+
+
+_index: Optional[MarkedTodayIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_marked_today_index() -> MarkedTodayIndex:
+    """Process-wide index, shared across cameras and sessions"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MarkedTodayIndex()
+    return _index
+
+
+def record_marked(student_ids: Iterable[str], day: date):
+    """Update the index after a successful mark, if it has been created"""
+    if _index is not None:
+        _index.add(student_ids, day)
+
+
+def record_removed(student_id: str, day: date):
+    """Update the index after an attendance record is deleted"""
+    if _index is not None:
+        _index.discard(student_id, day)
@@ -0,0 +1,252 @@
+"""
+Attendance Write-Behind Queue
+Recognition loops enqueue marks; one writer thread commits them in batches
+"""
+
+import atexit
+import queue
+import threading
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import ATTENDANCE_SETTINGS
+
+from .operations import AttendanceOperations, MARK_NEW
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _Flush:
+    """Queue marker: commit everything queued before it, then set the event"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class AttendanceSink:
+    """
+    Write-behind attendance marking
+    submit() returns immediately; a single writer thread coalesces queued marks
+    into one upsert every flush_ms milliseconds or batch_size marks.
+    A batch whose write fails is requeued with exponential backoff, up to
+    retry_attempts times per mark, before its marks are reported as failed.
+    Results reach the caller through the on_result callback given to submit()
+    """
+
+    def __init__(self, flush_ms: int = None, batch_size: int = None, max_queue: int = None,
+                 retry_attempts: int = None, retry_backoff_ms: int = None):
+        self.flush_interval = (flush_ms or ATTENDANCE_SETTINGS['sink_flush_ms']) / 1000
+        self.batch_size = batch_size or ATTENDANCE_SETTINGS['sink_batch_size']
+        self.max_queue = max_queue or ATTENDANCE_SETTINGS['sink_queue_size']
+        self.retry_attempts = (retry_attempts if retry_attempts is not None
+                               else ATTENDANCE_SETTINGS['sink_retry_attempts'])
+        self.retry_backoff = (retry_backoff_ms if retry_backoff_ms is not None
+                              else ATTENDANCE_SETTINGS['sink_retry_backoff_ms']) / 1000
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        # [(monotonic due time, entry)] of marks waiting to be written again, writer thread only
+        self._retries = []
+
+        self.committed = 0
+        self.batches = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the writer thread"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="attendance-sink", daemon=True)
+                self._thread.start()
+
+    def submit(self, student_id: str, confidence_score: float = None, status: str = 'Present',
+               notes: str = None, timestamp: datetime = None, name: str = None,
+               on_result: Callable[[dict], None] = None) -> bool:
+        """
+        Queue an attendance mark without touching the database
+        on_result: optional callable(event) run on the writer thread once the mark is committed,
+        event: {'type': 'marked'|'already_marked'|'failed', 'student_id', 'name', 'confidence', 'message'}
+        Returns False when the queue is full
+        """
+        self.start()
+        entry = {
+            'student_id': student_id,
+            'name': name or student_id,
+            'confidence_score': confidence_score,
+            'status': status,
+            'notes': notes,
+            'timestamp': timestamp or datetime.now(),
+            'on_result': on_result
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            logger.warning(f"Attendance queue full, mark for {student_id} not queued")
+            return False
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Marks queued or waiting for a retry, not yet committed"""
+        return self._queue.qsize() + len(self._retries)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every mark submitted so far is committed or has failed for good"""
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = None):
+        """Flush remaining marks and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            wake = min((t for t in (deadline, self._next_retry()) if t is not None), default=None)
+            wait = None if wake is None else max(0.0, wake - time.monotonic())
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+
+            due = self._due_retries()
+            if due:
+                batch.extend(due)
+                if deadline is None:
+                    deadline = time.monotonic()
+
+            if isinstance(item, dict):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            # Batch full, interval elapsed, flush requested or stopping
+            if batch:
+                self._schedule_retries(self._write_batch(batch))
+                batch = []
+            deadline = None
+
+            if isinstance(item, _Flush) or item is _STOP:
+                # Wait out the backoff of marks still to be retried
+                self._drain_retries()
+
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is _STOP:
+                break
+
+    def _next_retry(self) -> Optional[float]:
+        return min((due for due, _ in self._retries), default=None)
+
+    def _due_retries(self) -> List[dict]:
+        """Take the marks whose backoff has elapsed off the retry list"""
+        now = time.monotonic()
+        due = [entry for at, entry in self._retries if at <= now]
+        if due:
+            self._retries = [(at, entry) for at, entry in self._retries if at > now]
+        return due
+
+    def _schedule_retries(self, failed: List[dict]):
+        """Requeue failed marks with exponential backoff, reporting those out of attempts"""
+        now = time.monotonic()
+        for entry in failed:
+            attempts = entry.get('attempts', 0) + 1
+            if attempts > self.retry_attempts:
+                self.failed += 1
+                logger.error(f"Giving up on attendance for {entry['student_id']} after {attempts} attempts")
+                self._notify(entry, 'failed', "Could not write attendance")
+                continue
+            entry['attempts'] = attempts
+            self.retried += 1
+            self._retries.append((now + self.retry_backoff * 2 ** (attempts - 1), entry))
+
+    def _drain_retries(self):
+        """Retry failed marks until each is written or out of attempts"""
+        while self._retries:
+            time.sleep(max(0.0, self._next_retry() - time.monotonic()))
+            self._schedule_retries(self._write_batch(self._due_retries()))
+
+    def _write_batch(self, batch: List[dict]) -> List[dict]:
+        """
+        Commit a batch with one upsert per day and report each mark's outcome
+        Returns: the entries of days whose write failed, to be retried
+        """
+        failed = []
+        by_date = {}
+        for entry in batch:
+            by_date.setdefault(entry['timestamp'].date(), []).append(entry)
+
+        for day_entries in by_date.values():
+            # Days already recorded are left untouched, like a mark from a single loop
+            outcomes = AttendanceOperations.mark_attendance_bulk(day_entries, record_time_out=False)
+            self.batches += 1
+            if not outcomes:
+                # The transaction was rolled back, nothing of this day was written
+                failed.extend(day_entries)
+                continue
+
+            # The earliest entry per student is the one that was inserted
+            first = {}
+            for entry in sorted(day_entries, key=lambda e: e['timestamp']):
+                first.setdefault(entry['student_id'], entry)
+
+            for entry in day_entries:
+                outcome = outcomes.get(entry['student_id'])
+                if outcome is None:
+                    failed.append(entry)
+                elif outcome == MARK_NEW and first[entry['student_id']] is entry:
+                    self.committed += 1
+                    self._notify(entry, 'marked', "Attendance marked successfully")
+                else:
+                    self._notify(entry, 'already_marked', "Already marked today")
+        return failed
+
+    @staticmethod
+    def _notify(entry: dict, event_type: str, message: str):
+        if entry['on_result'] is None:
+            return
+        try:
+            entry['on_result']({
+                'type': event_type,
+                'student_id': entry['student_id'],
+                'name': entry['name'],
+                'confidence': entry['confidence_score'],
+                'message': message
+            })
+        except Exception as e:
+            logger.error(f"Attendance result callback failed: {str(e)}")
+
+
+_sink: Optional[AttendanceSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_attendance_sink() -> AttendanceSink:
+    """Process-wide sink, flushed at interpreter exit"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = AttendanceSink()
+            _sink.start()
+            atexit.register(_sink.close)
+    return _sink
@@ -0,0 +1,167 @@
+"""
+Buffered System Log
+Collects system_logs entries in memory and bulk-inserts them from a background thread
+"""
+
+import atexit
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import sys
+
+from sqlalchemy import insert
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import SYSTEM_LOG_SETTINGS
+
+from .models import get_session, SystemLog
+
+logger = logging.getLogger(__name__)
+
+# Levels never sampled away when the buffer is overloaded
+_ALWAYS_KEEP = {'ERROR', 'CRITICAL'}
+
+
+class SystemLogBuffer:
+    """
+    Write-behind buffer for the system_logs table
+    Entries are inserted with one executemany every flush_interval seconds or
+    flush_size entries. Past max_pending unflushed entries new ones are dropped,
+    or sampled (one in sample_every, errors always kept) up to twice that limit
+    """
+
+    def __init__(self, flush_interval: float = None, flush_size: int = None,
+                 max_pending: int = None, overload_policy: str = None,
+                 sample_every: int = None):
+        settings = SYSTEM_LOG_SETTINGS
+        self.flush_interval = flush_interval or settings['flush_interval']
+        self.flush_size = flush_size or settings['flush_size']
+        self.max_pending = max_pending or settings['max_pending']
+        self.overload_policy = overload_policy or settings['overload_policy']
+        self.sample_every = max(1, sample_every or settings['sample_every'])
+        if self.overload_policy not in ('drop', 'sample'):
+            raise ValueError(f"Unknown overload policy: {self.overload_policy}")
+
+        self._buffer = []
+        self._inflight = []  # Entries being written, still visible to readers
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._overflow_seen = 0
+
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="system-log-buffer", daemon=True)
+            self._thread.start()
+
+    def add(self, level: str, module: str, message: str, user_action: str = None) -> bool:
+        """Buffer a log entry, returns False if the overload policy discarded it"""
+        entry = {
+            'timestamp': datetime.now(),
+            'level': level,
+            'module': module,
+            'message': message,
+            'user_action': user_action
+        }
+
+        with self._lock:
+            pending = len(self._buffer) + len(self._inflight)
+            if pending >= self.max_pending and not self._accept_overloaded(entry, pending):
+                self.dropped += 1
+                return False
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.flush_size
+
+        if full:
+            self._wakeup.set()
+        return True
+
+    def _accept_overloaded(self, entry: dict, pending: int) -> bool:
+        """Overload policy, called with the lock held"""
+        if self.overload_policy == 'drop' or pending >= 2 * self.max_pending:
+            return False
+        if str(entry['level']).upper() in _ALWAYS_KEEP:
+            return True
+        self._overflow_seen += 1
+        return self._overflow_seen % self.sample_every == 0
+
+    def flush(self) -> int:
+        """Write all buffered entries in one executemany, returns the number written"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                self._inflight, self._buffer = self._buffer, []
+                self._overflow_seen = 0
+
+            entries = self._inflight
+            session = get_session()
+            try:
+                session.execute(insert(SystemLog), entries)
+                session.commit()
+                self.written += len(entries)
+                return len(entries)
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to write {len(entries)} system log entries: {str(e)}")
+                # Keep them for the next attempt, within the memory bound
+                with self._lock:
+                    retained = entries + self._buffer
+                    overflow = max(0, len(retained) - 2 * self.max_pending)
+                    self._buffer = retained[overflow:]
+                    self.dropped += overflow
+                if overflow:
+                    logger.warning(f"Dropped the {overflow} oldest unwritten system log entries")
+                return 0
+            finally:
+                session.close()
+                with self._lock:
+                    self._inflight = []
+
+    def pending_entries(self, limit: int = None) -> List[SystemLog]:
+        """Unflushed entries, newest first, as transient SystemLog objects"""
+        with self._lock:
+            entries = self._buffer + self._inflight
+        entries = sorted(entries, key=lambda e: e['timestamp'], reverse=True)[:limit]
+        return [SystemLog(**entry) for entry in entries]
+
+    def close(self):
+        """Stop the flush thread and write whatever is left"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"System log flush failed: {str(e)}")
+
+
+_buffer: Optional[SystemLogBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_system_log_buffer() -> SystemLogBuffer:
+    """Process-wide log buffer, flushed at interpreter exit"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = SystemLogBuffer()
+            _buffer.start()
+            atexit.register(_buffer.close)
+    return _buffer
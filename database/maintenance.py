@@ -0,0 +1,93 @@
+"""
+Database Maintenance Commands
+
+Usage: python -m database.maintenance rebuild-stats
+       python -m database.maintenance checkpoint [--mode TRUNCATE]
+       python -m database.maintenance archive 2024-fall --start 2024-08-01 --end 2024-12-31
+       python -m database.maintenance archives
+       python -m database.maintenance restore 2024-fall
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date
+
+from .models import init_database, rebuild_daily_stats, checkpoint
+from .archive import archive_term, restore_term, list_archives, get_archive_dir
+
+logger = logging.getLogger(__name__)
+
+
+def cmd_rebuild_stats(args) -> int:
+    """Recompute attendance_daily_stats from the attendance table"""
+    rows = rebuild_daily_stats()
+    print(f"Rebuilt attendance_daily_stats: {rows} aggregate rows")
+    return 0
+
+
+def cmd_checkpoint(args) -> int:
+    """Checkpoint the WAL into the main database file"""
+    busy, wal_pages, done = checkpoint(args.mode)
+    print(f"Checkpointed {done}/{wal_pages} WAL pages" + (" (busy)" if busy else ""))
+    return 1 if busy else 0
+
+
+def cmd_archive(args) -> int:
+    """Move a closed term's attendance into its own archive file"""
+    success, msg = archive_term(args.term, args.start, args.end)
+    print(msg)
+    return 0 if success else 1
+
+
+def cmd_archives(args) -> int:
+    """List archived terms"""
+    archives = list_archives()
+    if not archives:
+        print("No archived terms")
+    for archive in archives:
+        print(f"{archive.term:<20} {archive.start_date} .. {archive.end_date}  "
+              f"{archive.row_count:>9} records  {get_archive_dir() / archive.filename}")
+    return 0
+
+
+def cmd_restore(args) -> int:
+    """Move an archived term back into the attendance table"""
+    success, msg = restore_term(args.term)
+    print(msg)
+    return 0 if success else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m database.maintenance",
+                                     description="Attendance database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-stats", help=cmd_rebuild_stats.__doc__)
+    rebuild.set_defaults(func=cmd_rebuild_stats)
+
+    ckpt = commands.add_parser("checkpoint", help=cmd_checkpoint.__doc__)
+    ckpt.add_argument("--mode", default=None, help="PASSIVE, FULL, RESTART or TRUNCATE")
+    ckpt.set_defaults(func=cmd_checkpoint)
+
+    archive = commands.add_parser("archive", help=cmd_archive.__doc__)
+    archive.add_argument("term", help="Term name, e.g. 2024-fall")
+    archive.add_argument("--start", type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD)")
+    archive.add_argument("--end", type=date.fromisoformat, required=True, help="Last day (YYYY-MM-DD)")
+    archive.set_defaults(func=cmd_archive)
+
+    archives = commands.add_parser("archives", help=cmd_archives.__doc__)
+    archives.set_defaults(func=cmd_archives)
+
+    restore = commands.add_parser("restore", help=cmd_restore.__doc__)
+    restore.add_argument("term")
+    restore.set_defaults(func=cmd_restore)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    init_database()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,17 +4,34 @@ Face Recognition Attendance System
 """
 
 from sqlalchemy import (
-    create_engine, Column, Integer, String, DateTime, Float,
-    Boolean, Text, ForeignKey, Date, Time, UniqueConstraint
+    create_engine, event, inspect, select, insert, delete, func, and_, or_, not_, Column, Integer,
+    String, DateTime, Float, Boolean, Text, LargeBinary, ForeignKey, Date, Time, UniqueConstraint
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
 from pathlib import Path
+import os
+import sys
+import logging
+import threading
 
-# Database path
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import DATABASE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Database path (ATTENDANCE_DB_PATH overrides it, e.g. for benchmarks)
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATABASE_PATH = BASE_DIR / "database" / "attendance.db"
+DATABASE_PATH = Path(os.environ.get('ATTENDANCE_DB_PATH', BASE_DIR / "database" / "attendance.db"))
+
+# Connection pool sizing for the process-wide engine
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+# Face encodings are stored as packed little-endian float32 vectors
+ENCODING_DIM = 128
+ENCODING_DTYPE = '<f4'
 
 Base = declarative_base()
 
@@ -41,11 +58,38 @@ class Student(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     attendance_records = relationship("Attendance", back_populates="student")
+    face_encodings = relationship("FaceEncoding", back_populates="student",
+                                  cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Student(id={self.student_id}, name={self.name})>"
 
 
+class FaceEncoding(Base):
+    """
+    One face encoding per training image
+    encoding holds ENCODING_DIM packed float32 values; source_hash identifies the
+    image it was computed from so re-training the same image does not duplicate it
+    """
+    __tablename__ = 'face_encodings'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    student_id = Column(String(50), ForeignKey('students.student_id'), nullable=False, index=True)
+    encoding = Column(LargeBinary, nullable=False)
+    quality = Column(Float, nullable=True)
+    source_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('student_id', 'source_hash', name='unique_face_encoding_source'),
+    )
+
+    student = relationship("Student", back_populates="face_encodings")
+
+    def __repr__(self):
+        return f"<FaceEncoding(student={self.student_id}, source={self.source_hash[:8]})>"
+
+
 class User(Base):
     """User authentication model"""
     __tablename__ = 'users'
@@ -95,6 +139,63 @@ class Attendance(Base):
         return f"<Attendance(student={self.student_id}, date={self.date}, status={self.status})>"
 
 
+class AttendanceDailyStats(Base):
+    """
+    Attendance counts per day, department, section and status
+    Maintained by AttendanceOperations in the same transaction as each attendance write;
+    department and section are taken from the student when the record is written
+    """
+    __tablename__ = 'attendance_daily_stats'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(Date, nullable=False)
+    department = Column(String(100), nullable=False, default='')
+    section = Column(String(10), nullable=False, default='')
+    status = Column(String(20), nullable=False, default='')
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('date', 'department', 'section', 'status', name='unique_daily_stats'),
+    )
+
+    def __repr__(self):
+        return f"<AttendanceDailyStats(date={self.date}, department={self.department}, status={self.status}, count={self.count})>"
+
+
+class AttendanceArchive(Base):
+    """
+    Registry of archived terms
+    Each row points at a SQLite file holding the attendance records of one closed term
+    """
+    __tablename__ = 'attendance_archives'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    term = Column(String(50), unique=True, nullable=False)
+    filename = Column(String(255), nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    row_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<AttendanceArchive(term={self.term}, {self.start_date}..{self.end_date}, rows={self.row_count})>"
+
+
+class DataVersion(Base):
+    """
+    Change counters, bumped in the same transaction as the writes they track
+    Caches of derived data (e.g. report exports) include the version in their keys
+    """
+    __tablename__ = 'data_versions'
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<DataVersion({self.name}={self.version})>"
+
+
 class TrainingLog(Base):
     """Model training history"""
     __tablename__ = 'training_logs'
@@ -121,13 +222,106 @@ class SystemLog(Base):
     user_action = Column(String(100), nullable=True)
 
 
-def init_database():
-    """Initialize the database and create all tables"""
-    DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    engine = create_engine(f'sqlite:///{DATABASE_PATH}', echo=False)
-    Base.metadata.create_all(engine)
+# Process-wide engine and session factory, created once by init_database()
+_engine = None
+_session_factory = None
+_init_lock = threading.Lock()
+_checkpoint_stop = None
+
+
+def get_engine():
+    """Return the shared engine, initializing the database on first use"""
+    if _engine is None:
+        init_database()
+    return _engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply DATABASE_SETTINGS pragmas to a new SQLite connection"""
+    settings = DATABASE_SETTINGS
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout_ms'])}")
+        cursor.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size = {-int(settings['cache_size_kb'])}")
+        cursor.execute(f"PRAGMA wal_autocheckpoint = {int(settings['wal_autocheckpoint'])}")
+    finally:
+        cursor.close()
+
+
+def checkpoint(mode: str = None) -> tuple:
+    """
+    Checkpoint the WAL into the main database file
+    Returns: (busy, wal_pages, checkpointed_pages) as reported by SQLite
+    """
+    mode = (mode or DATABASE_SETTINGS['checkpoint_mode']).upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f"Unknown checkpoint mode: {mode}")
+
+    with get_engine().connect() as conn:
+        result = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return tuple(result) if result else (0, 0, 0)
+
+
+def _run_checkpoints(interval: float, stop: threading.Event):
+    """Background checkpoint loop started by init_database()"""
+    while not stop.wait(interval):
+        try:
+            busy, wal_pages, done = checkpoint()
+            logger.debug(f"WAL checkpoint: {done}/{wal_pages} pages, busy={busy}")
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed: {str(e)}")
+
+
+def rebuild_daily_stats(connection=None) -> int:
+    """
+    Recompute attendance_daily_stats from the attendance table
+    Rows for archived terms are left as they are
+    Returns the number of aggregate rows in the table
+    """
+    if connection is None:
+        with get_engine().begin() as conn:
+            return rebuild_daily_stats(conn)
+
+    # Days in archived terms keep the counts they had when they were archived
+    archived = [
+        (start, end) for start, end in connection.execute(
+            select(AttendanceArchive.start_date, AttendanceArchive.end_date)
+        )
+    ]
+
+    def live_days(column):
+        return not_(or_(*[and_(column >= start, column <= end) for start, end in archived]))
 
-    # Create default admin if not exists
+    department = func.coalesce(Student.department, '')
+    section = func.coalesce(Student.section, '')
+    status = func.coalesce(Attendance.status, '')
+    clear = delete(AttendanceDailyStats)
+    counts = (
+        select(Attendance.date, department, section, status, func.count(Attendance.id))
+        .select_from(Attendance)
+        .outerjoin(Student, Attendance.student_id == Student.student_id)
+        .group_by(Attendance.date, department, section, status)
+    )
+    if archived:
+        clear = clear.where(live_days(AttendanceDailyStats.date))
+        counts = counts.where(live_days(Attendance.date))
+
+    connection.execute(clear)
+    connection.execute(
+        insert(AttendanceDailyStats).from_select(
+            ['date', 'department', 'section', 'status', 'count'],
+            counts
+        )
+    )
+    return connection.execute(select(func.count()).select_from(AttendanceDailyStats)).scalar()
+
+
+def _seed_admin(engine):
+    """Create default admin if not exists"""
     Session = sessionmaker(bind=engine)
     session = Session()
     try:
@@ -143,11 +337,73 @@ def init_database():
     finally:
         session.close()
 
-    return engine
+
+def init_database():
+    """
+    Initialize the database and create all tables
+    Runs once per process; later calls return the existing engine
+    """
+    global _engine, _session_factory, _checkpoint_stop
+
+    with _init_lock:
+        if _engine is not None:
+            return _engine
+
+        DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        engine = create_engine(
+            f'sqlite:///{DATABASE_PATH}',
+            echo=False,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_pre_ping=True,
+            # Pooled connections are handed to whichever thread checks them out
+            # uri lets archive files be attached read-only with file:...?mode=ro
+            connect_args={
+                'check_same_thread': False,
+                'timeout': DATABASE_SETTINGS['busy_timeout_ms'] / 1000,
+                'uri': True
+            }
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        has_stats = inspect(engine).has_table(AttendanceDailyStats.__tablename__)
+        Base.metadata.create_all(engine)
+        _seed_admin(engine)
+
+        # Fill the aggregate table once for databases created before it existed
+        if not has_stats:
+            with engine.begin() as conn:
+                rebuild_daily_stats(conn)
+
+        _session_factory = sessionmaker(bind=engine)
+        _engine = engine
+
+        interval = DATABASE_SETTINGS['checkpoint_interval']
+        if interval and interval > 0:
+            _checkpoint_stop = threading.Event()
+            threading.Thread(
+                target=_run_checkpoints, args=(interval, _checkpoint_stop),
+                name="wal-checkpoint", daemon=True
+            ).start()
+
+    return _engine
 
 
 def get_session():
-    """Get a database session"""
-    engine = init_database()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Get a new database session bound to the shared engine"""
+    if _session_factory is None:
+        init_database()
+    return _session_factory()
+
+
+def dispose_engine():
+    """Close pooled connections and reset the engine (tests, forked workers)"""
+    global _engine, _session_factory, _checkpoint_stop
+
+    with _init_lock:
+        if _checkpoint_stop is not None:
+            _checkpoint_stop.set()
+            _checkpoint_stop = None
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
@@ -3,17 +3,62 @@ Database Operations
 CRUD operations for Face Recognition Attendance System
 """
 
-from datetime import datetime, date, timedelta
-from sqlalchemy import func, and_, or_
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import func, and_, or_, case, tuple_, select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 import json
 import hashlib
 import logging
 
-from .models import get_session, User, Student, Attendance, TrainingLog, SystemLog
+import numpy as np
+
+from .models import (
+    get_session, rebuild_daily_stats, User, Student, FaceEncoding, Attendance,
+    AttendanceDailyStats, DataVersion, TrainingLog, SystemLog, ENCODING_DIM, ENCODING_DTYPE
+)
+from .attendance_index import record_marked, record_removed
+from .archive import attendance_source, attendance_source_batches, archived_dates
+from .rows import (
+    AttendanceRow, StudentRow, attendance_select, student_select, fetch_rows, stream_rows
+)
 
 logger = logging.getLogger(__name__)
 
+# Outcomes of an attendance upsert
+MARK_NEW = 'new'  # First record of the day was inserted
+MARK_UPDATED = 'updated'  # Day already recorded, time_out set to this sighting
+MARK_EXISTS = 'exists'  # Day already recorded and left untouched (record_time_out=False)
+
+# DataVersion counter bumped by every write that changes attendance reports
+ATTENDANCE_DATA = 'attendance'
+
+# Student fields that appear in attendance reports
+REPORTED_STUDENT_FIELDS = ('name', 'department')
+
+# DataVersion counter bumped by every face_encodings write; non-zero once the
+# gallery is managed in the database
+FACE_ENCODING_DATA = 'face_encodings'
+
+
+def bump_data_version(session, name: str):
+    """Increment a DataVersion counter in the caller's transaction"""
+    stmt = sqlite_insert(DataVersion).values(name=name, version=1, updated_at=datetime.now())
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[DataVersion.name],
+        set_={'version': DataVersion.version + 1, 'updated_at': stmt.excluded.updated_at}
+    ))
+
+
+def get_data_version(name: str) -> int:
+    """Current value of a DataVersion counter, 0 if it was never bumped"""
+    session = get_session()
+    try:
+        version = session.query(DataVersion.version).filter(DataVersion.name == name).scalar()
+        return version or 0
+    finally:
+        session.close()
+
 
 class UserOperations:
     """CRUD operations for users"""
@@ -284,6 +329,41 @@ class StudentOperations:
         finally:
             session.close()
 
+    @staticmethod
+    def create_students_bulk(students: list) -> tuple:
+        """
+        Insert many students with one statement, skipping IDs that already exist
+        students: [dict] with student_id, name and any other Student columns
+        Returns: (inserted student_ids, already existing student_ids)
+        """
+        if not students:
+            return [], []
+        session = get_session()
+        try:
+            now = datetime.now()
+            # executemany needs the same keys in every row
+            columns = set().union(*students)
+            rows = [
+                {**{column: student.get(column) for column in columns}, 'created_at': now, 'updated_at': now}
+                for student in students
+            ]
+            inserted = session.execute(
+                sqlite_insert(Student).on_conflict_do_nothing(
+                    index_elements=['student_id']
+                ).returning(Student.student_id),
+                rows
+            ).scalars().all()
+            session.commit()
+
+            inserted_set = set(inserted)
+            existing = [s['student_id'] for s in students if s['student_id'] not in inserted_set]
+            return inserted, existing
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
     @staticmethod
     def get_student(student_id: str) -> Student:
         """Get a student by ID"""
@@ -307,6 +387,18 @@ class StudentOperations:
         finally:
             session.close()
 
+    @staticmethod
+    def list_students(active_only: bool = True) -> list:
+        """Students as read-only StudentRow tuples, for listings and reports"""
+        session = get_session()
+        try:
+            stmt = student_select()
+            if active_only:
+                stmt = stmt.where(Student.is_active == True)
+            return fetch_rows(session, stmt.order_by(Student.name), StudentRow)
+        finally:
+            session.close()
+
     @staticmethod
     def update_student(student_id: str, **kwargs) -> tuple:
         """Update student information"""
@@ -318,9 +410,22 @@ class StudentOperations:
             if not student:
                 return False, "Student not found"
 
+            reported = tuple(getattr(student, field) for field in REPORTED_STUDENT_FIELDS)
+            old_groups = (student.department or '', student.section or '')
             for key, value in kwargs.items():
                 if hasattr(student, key):
                     setattr(student, key, value)
+            if tuple(getattr(student, field) for field in REPORTED_STUDENT_FIELDS) != reported:
+                AttendanceOperations.bump_data_version(session)
+
+            # Daily stats count records under the student's groups; move them along
+            new_groups = (student.department or '', student.section or '')
+            if new_groups != old_groups:
+                changes = AttendanceOperations._student_stats(session, student_id, old_groups, -1)
+                for key, delta in AttendanceOperations._student_stats(
+                        session, student_id, new_groups, 1).items():
+                    changes[key] = changes.get(key, 0) + delta
+                AttendanceOperations._adjust_daily_stats(session, changes)
 
             student.updated_at = datetime.now()
             session.commit()
@@ -368,7 +473,18 @@ class StudentOperations:
                 student.is_active = False
                 student.updated_at = datetime.now()
             else:
+                # Attendance records go with the student, and out of the daily stats
+                groups = (student.department or '', student.section or '')
+                AttendanceOperations._adjust_daily_stats(
+                    session, AttendanceOperations._student_stats(session, student_id, groups, -1)
+                )
+                session.query(Attendance).filter(
+                    Attendance.student_id == student_id
+                ).delete(synchronize_session=False)
                 session.delete(student)
+                AttendanceOperations.bump_data_version(session)
+                # Its face_encodings rows are deleted with it
+                bump_data_version(session, FACE_ENCODING_DATA)
 
             session.commit()
             return True, "Student deleted successfully"
@@ -421,43 +537,369 @@ class StudentOperations:
             session.close()
 
 
-class AttendanceOperations:
-    """CRUD operations for attendance"""
+class FaceEncodingOperations:
+    """Per-image face encodings stored as float32 BLOBs"""
 
     @staticmethod
-    def mark_attendance(student_id: str, confidence_score: float = None,
-                        status: str = 'Present', notes: str = None) -> tuple:
-        """Mark attendance for a student"""
+    def pack(encoding) -> bytes:
+        """Serialize an encoding to the stored float32 layout"""
+        packed = np.asarray(encoding, dtype=ENCODING_DTYPE)
+        if packed.shape != (ENCODING_DIM,):
+            raise ValueError(f"Expected a {ENCODING_DIM}-d encoding, got shape {packed.shape}")
+        return packed.tobytes()
+
+    @staticmethod
+    def _rows(student_id: str, encodings: list) -> list:
+        """encodings: [(encoding, quality, source_hash)] -> insert parameter dicts"""
+        now = datetime.now()
+        return [
+            {'student_id': student_id, 'encoding': FaceEncodingOperations.pack(encoding),
+             'quality': quality, 'source_hash': source_hash, 'created_at': now}
+            for encoding, quality, source_hash in encodings
+        ]
+
+    @staticmethod
+    def _count(session, student_id: str) -> int:
+        return session.query(func.count(FaceEncoding.id)).filter(
+            FaceEncoding.student_id == student_id
+        ).scalar()
+
+    @staticmethod
+    def _sync_student(session, student_id: str, image_count: int = None) -> int:
+        """Keep Student.face_encoding as a registration summary of the stored encodings"""
+        count = FaceEncodingOperations._count(session, student_id)
+        values = {
+            'face_encoding': json.dumps({'encodings': count, 'dim': ENCODING_DIM}) if count else None,
+            'updated_at': datetime.now()
+        }
+        if image_count is not None:
+            values['image_count'] = image_count
+        session.query(Student).filter(Student.student_id == student_id).update(values)
+        return count
+
+    @staticmethod
+    def replace_encodings(gallery: dict, image_counts: dict = None, exclusive: bool = False) -> tuple:
+        """
+        Replace the stored encodings of several students in one transaction
+        gallery: {student_id: [(encoding, quality, source_hash)]}
+        exclusive: also drop the encodings of students not in gallery (full retrain)
+        """
         session = get_session()
         try:
-            today = date.today()
-            current_time = datetime.now().time()
+            image_counts = image_counts or {}
+            rows = []
+            for student_id, encodings in gallery.items():
+                rows.extend(FaceEncodingOperations._rows(student_id, encodings))
+
+            students = set(gallery)
+            if exclusive:
+                students.update(sid for (sid,) in session.query(FaceEncoding.student_id).distinct())
+                session.query(FaceEncoding).delete(synchronize_session=False)
+            else:
+                session.query(FaceEncoding).filter(
+                    FaceEncoding.student_id.in_(list(gallery))
+                ).delete(synchronize_session=False)
+            if rows:
+                session.execute(
+                    sqlite_insert(FaceEncoding).on_conflict_do_nothing(
+                        index_elements=['student_id', 'source_hash']
+                    ),
+                    rows
+                )
+            for student_id in students:
+                FaceEncodingOperations._sync_student(session, student_id, image_counts.get(student_id))
+            bump_data_version(session, FACE_ENCODING_DATA)
+            session.commit()
+            return True, f"Stored {len(rows)} encodings for {len(gallery)} students"
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error storing face encodings: {str(e)}")
+            return False, f"Error: {str(e)}"
+        finally:
+            session.close()
 
-            existing = session.query(Attendance).filter(
-                and_(
-                    Attendance.student_id == student_id,
-                    Attendance.date == today
+    @staticmethod
+    def add_encodings(student_id: str, encodings: list) -> tuple:
+        """
+        Add encodings for one student, skipping images already stored
+        encodings: [(encoding, quality, source_hash)]
+        """
+        session = get_session()
+        try:
+            rows = FaceEncodingOperations._rows(student_id, encodings)
+            before = FaceEncodingOperations._count(session, student_id)
+            if rows:
+                session.execute(
+                    sqlite_insert(FaceEncoding).on_conflict_do_nothing(
+                        index_elements=['student_id', 'source_hash']
+                    ),
+                    rows
                 )
-            ).first()
+            added = FaceEncodingOperations._sync_student(session, student_id) - before
+            bump_data_version(session, FACE_ENCODING_DATA)
+            session.commit()
+            return True, f"Added {added} encodings"
+        except Exception as e:
+            session.rollback()
+            return False, f"Error: {str(e)}"
+        finally:
+            session.close()
 
-            if existing:
-                existing.time_out = current_time
-                session.commit()
-                return True, "Time out recorded"
+    @staticmethod
+    def delete_encodings(student_id: str) -> tuple:
+        """Remove every stored encoding of a student"""
+        session = get_session()
+        try:
+            session.query(FaceEncoding).filter(
+                FaceEncoding.student_id == student_id
+            ).delete(synchronize_session=False)
+            FaceEncodingOperations._sync_student(session, student_id)
+            bump_data_version(session, FACE_ENCODING_DATA)
+            session.commit()
+            return True, "Face encodings deleted"
+        except Exception as e:
+            session.rollback()
+            return False, f"Error: {str(e)}"
+        finally:
+            session.close()
 
-            attendance = Attendance(
-                student_id=student_id,
-                date=today,
-                time_in=current_time,
-                status=status,
-                confidence_score=confidence_score,
-                notes=notes
+    @staticmethod
+    def is_initialized() -> bool:
+        """
+        Whether the gallery has ever been stored in the database
+        An empty table then means no student has encodings, not that the
+        legacy pickle still has to be migrated
+        """
+        if get_data_version(FACE_ENCODING_DATA):
+            return True
+        return FaceEncodingOperations.get_encoding_count() > 0
+
+    @staticmethod
+    def load_gallery(active_only: bool = True) -> tuple:
+        """
+        Load every stored encoding with one query
+        Returns: (encodings float32 array of shape (n, ENCODING_DIM), student_id per row,
+        {student_id: name})
+        """
+        session = get_session()
+        try:
+            query = session.query(
+                FaceEncoding.student_id, Student.name, FaceEncoding.encoding
+            ).join(
+                Student, FaceEncoding.student_id == Student.student_id
             )
-            session.add(attendance)
+            if active_only:
+                query = query.filter(Student.is_active == True)
+            rows = query.order_by(FaceEncoding.student_id, FaceEncoding.id).all()
+        finally:
+            session.close()
+
+        if not rows:
+            return np.empty((0, ENCODING_DIM), dtype=np.float32), [], {}
+
+        student_ids, names, blobs = zip(*rows)
+        encodings = np.frombuffer(b''.join(blobs), dtype=ENCODING_DTYPE).reshape(-1, ENCODING_DIM)
+        return encodings, list(student_ids), dict(zip(student_ids, names))
+
+    @staticmethod
+    def has_gallery(legacy_model=None) -> bool:
+        """
+        Whether face_recognition has a gallery to load: stored encodings, or a legacy
+        pickle (Path legacy_model) that FaceRecognizer migrates on its first load
+        """
+        if FaceEncodingOperations.get_encoding_count():
+            return True
+        return (legacy_model is not None and legacy_model.exists()
+                and not FaceEncodingOperations.is_initialized())
+
+    @staticmethod
+    def get_encoding_count(student_id: str = None) -> int:
+        """Number of stored encodings, for one student or overall"""
+        session = get_session()
+        try:
+            query = session.query(func.count(FaceEncoding.id))
+            if student_id:
+                query = query.filter(FaceEncoding.student_id == student_id)
+            return query.scalar() or 0
+        finally:
+            session.close()
+
+
+class AttendanceOperations:
+    """CRUD operations for attendance"""
+
+    @staticmethod
+    def _upsert_attendance(session, entries: list, record_time_out: bool) -> dict:
+        """
+        INSERT ... ON CONFLICT(student_id, date) for a list of marks in one statement
+        Returns: {(student_id, date): MARK_NEW | MARK_UPDATED | MARK_EXISTS}
+        Raises ValueError for marks on dates of an archived term
+        """
+        rows = {}
+        latest = {}
+        for entry in entries:
+            timestamp = entry.get('timestamp') or datetime.now()
+            key = (entry['student_id'], timestamp.date())
+            latest[key] = max(latest.get(key, timestamp.time()), timestamp.time())
+            # Keep one row per student and day, the earliest sighting sets time_in
+            current = rows.get(key)
+            if current is not None and current['time_in'] <= timestamp.time():
+                continue
+            rows[key] = {
+                'student_id': entry['student_id'],
+                'date': timestamp.date(),
+                'time_in': timestamp.time(),
+                'status': entry.get('status') or 'Present',
+                'confidence_score': entry.get('confidence_score'),
+                'notes': entry.get('notes')
+            }
+        if not rows:
+            return {}
+
+        # The term's records live in its archive file; a hot row would duplicate them
+        archived = archived_dates(session, {day for _, day in rows})
+        if archived:
+            raise ValueError(f"Dates are in an archived term: {', '.join(sorted(map(str, archived)))}")
+
+        stmt = sqlite_insert(Attendance).values(list(rows.values()))
+        if record_time_out:
+            # A recorded day gets the latest sighting of the batch as time_out, unless it
+            # already has a later one; rows carry only the earliest, so the latest is bound apart
+            later = [
+                (and_(Attendance.student_id == student_id, Attendance.date == day), seen)
+                for (student_id, day), seen in latest.items() if seen != rows[(student_id, day)]['time_in']
+            ]
+            last_seen = case(*later, else_=stmt.excluded.time_in) if later else stmt.excluded.time_in
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Attendance.student_id, Attendance.date],
+                set_={'time_out': func.max(func.coalesce(Attendance.time_out, last_seen), last_seen)}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=[Attendance.student_id, Attendance.date]
+            )
+        stmt = stmt.returning(Attendance.student_id, Attendance.date, Attendance.time_out)
+
+        # Rows skipped by DO NOTHING are not returned
+        outcomes = {key: MARK_EXISTS for key in rows}
+        for student_id, day, time_out in session.execute(stmt):
+            outcomes[(student_id, day)] = MARK_NEW if time_out is None else MARK_UPDATED
+
+        if any(outcome != MARK_EXISTS for outcome in outcomes.values()):
+            AttendanceOperations.bump_data_version(session)
+
+        # Count new records in the daily aggregates within the same transaction
+        new_keys = [key for key, outcome in outcomes.items() if outcome == MARK_NEW]
+        if new_keys:
+            groups = AttendanceOperations._student_groups(session, list({sid for sid, _ in new_keys}))
+            changes = {}
+            for student_id, day in new_keys:
+                stats_key = (day, *groups.get(student_id, ('', '')), rows[(student_id, day)]['status'])
+                changes[stats_key] = changes.get(stats_key, 0) + 1
+            AttendanceOperations._adjust_daily_stats(session, changes)
+
+        return outcomes
+
+    @staticmethod
+    def _student_groups(session, student_ids: list) -> dict:
+        """{student_id: (department, section)} with '' for missing values"""
+        rows = session.query(Student.student_id, Student.department, Student.section).filter(
+            Student.student_id.in_(student_ids)
+        ).all()
+        return {student_id: (department or '', section or '') for student_id, department, section in rows}
+
+    @staticmethod
+    def _student_stats(session, student_id: str, groups: tuple, sign: int) -> dict:
+        """
+        Daily stats deltas of a student's attendance records counted under groups
+        groups: (department, section); sign: 1 to add the records, -1 to remove them
+        """
+        department, section = groups
+        rows = session.query(Attendance.date, Attendance.status, func.count(Attendance.id)).filter(
+            Attendance.student_id == student_id
+        ).group_by(Attendance.date, Attendance.status).all()
+        return {(day, department, section, status or ''): sign * count for day, status, count in rows}
+
+    @staticmethod
+    def _adjust_daily_stats(session, changes: dict):
+        """
+        Apply count deltas to attendance_daily_stats in the caller's transaction
+        changes: {(date, department, section, status): delta}
+        """
+        values = [
+            {'date': day, 'department': department, 'section': section,
+             'status': status or '', 'count': delta}
+            for (day, department, section, status), delta in changes.items() if delta
+        ]
+        if not values:
+            return
+
+        stmt = sqlite_insert(AttendanceDailyStats).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttendanceDailyStats.date, AttendanceDailyStats.department,
+                            AttendanceDailyStats.section, AttendanceDailyStats.status],
+            set_={'count': AttendanceDailyStats.count + stmt.excluded.count}
+        )
+        session.execute(stmt)
+
+        if any(value['count'] < 0 for value in values):
+            # A rebuild has no rows for empty groups
+            session.execute(delete(AttendanceDailyStats).where(AttendanceDailyStats.count == 0))
+
+    @staticmethod
+    def bump_data_version(session):
+        """Increment the attendance data version in the caller's transaction"""
+        bump_data_version(session, ATTENDANCE_DATA)
+
+    @staticmethod
+    def get_data_version() -> int:
+        """Current attendance data version; changes whenever report contents may have changed"""
+        return get_data_version(ATTENDANCE_DATA)
+
+    @staticmethod
+    def _stats_key(session, attendance: Attendance) -> tuple:
+        """Aggregate row an attendance record is counted in"""
+        department, section = AttendanceOperations._student_groups(
+            session, [attendance.student_id]
+        ).get(attendance.student_id, ('', ''))
+        return attendance.date, department, section, attendance.status or ''
+
+    @staticmethod
+    def _index_marked(keys):
+        """Tell the in-memory marked-today index about committed (student_id, date) marks"""
+        by_day = {}
+        for student_id, day in keys:
+            by_day.setdefault(day, []).append(student_id)
+        for day, student_ids in by_day.items():
+            record_marked(student_ids, day)
+
+    @staticmethod
+    def mark_attendance(student_id: str, confidence_score: float = None,
+                        status: str = 'Present', notes: str = None,
+                        timestamp: datetime = None, record_time_out: bool = True) -> tuple:
+        """
+        Mark attendance for a student
+        timestamp: when the student was seen (defaults to now), used by offline processing
+        record_time_out: if the day is already recorded, store this sighting as time_out
+        """
+        session = get_session()
+        try:
+            outcomes = AttendanceOperations._upsert_attendance(session, [{
+                'student_id': student_id,
+                'confidence_score': confidence_score,
+                'status': status,
+                'notes': notes,
+                'timestamp': timestamp
+            }], record_time_out)
             session.commit()
-            return True, "Attendance marked successfully"
-        except IntegrityError:
-            session.rollback()
+            AttendanceOperations._index_marked(outcomes)
+
+            outcome = next(iter(outcomes.values()))
+
+            if outcome == MARK_NEW:
+                return True, "Attendance marked successfully"
+            if outcome == MARK_UPDATED:
+                return True, "Time out recorded"
             return False, "Attendance already marked for today"
         except Exception as e:
             session.rollback()
@@ -465,6 +907,32 @@ class AttendanceOperations:
         finally:
             session.close()
 
+    @staticmethod
+    def mark_attendance_bulk(entries: list, record_time_out: bool = True) -> dict:
+        """
+        Mark attendance for many students on one day in a single statement
+        entries: [{'student_id', optional 'confidence_score', 'status', 'notes', 'timestamp'}],
+        one record per student (the earliest entry wins), all timestamps on the same date
+        Returns: {student_id: MARK_NEW | MARK_UPDATED | MARK_EXISTS}, empty on error
+        Raises ValueError when the entries span several dates
+        """
+        days = {(entry.get('timestamp') or datetime.now()).date() for entry in entries}
+        if len(days) > 1:
+            raise ValueError(f"Attendance entries span {len(days)} dates, mark each day separately")
+
+        session = get_session()
+        try:
+            outcomes = AttendanceOperations._upsert_attendance(session, entries, record_time_out)
+            session.commit()
+            AttendanceOperations._index_marked(outcomes)
+            return {student_id: outcome for (student_id, _), outcome in outcomes.items()}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error marking attendance in bulk: {str(e)}")
+            return {}
+        finally:
+            session.close()
+
     @staticmethod
     def check_attendance_exists(student_id: str, check_date: date = None) -> bool:
         """Check if attendance exists for a student on a given date"""
@@ -498,84 +966,141 @@ class AttendanceOperations:
             session.close()
 
     @staticmethod
-    def get_student_attendance(student_id: str, start_date: date = None,
-                                end_date: date = None) -> list:
-        """Get attendance records for a specific student"""
+    def get_daily_attendance_with_students(target_date: date = None, latest: int = None) -> list:
+        """
+        Attendance records for a date joined with the student's name and department, in one query
+        latest: only return the most recent N records (still ordered by time in)
+        Returns: [AttendanceRow]; name and department are None for records without a matching student
+        """
         session = get_session()
         try:
-            query = session.query(Attendance).filter(
-                Attendance.student_id == student_id
-            )
+            if target_date is None:
+                target_date = date.today()
+
+            stmt = attendance_select(include_orphans=True).where(Attendance.date == target_date)
+
+            if latest:
+                stmt = stmt.order_by(Attendance.time_in.desc()).limit(latest)
+                return fetch_rows(session, stmt, AttendanceRow)[::-1]
+            return fetch_rows(session, stmt.order_by(Attendance.time_in), AttendanceRow)
+        finally:
+            session.close()
 
+    @staticmethod
+    def get_student_attendance(student_id: str, start_date: date = None,
+                                end_date: date = None, limit: int = None) -> list:
+        """
+        Get attendance records for a specific student as [AttendanceRow], newest first
+        (at most limit); archived terms in the range are included
+        """
+        def history_select(source):
+            src = source.c
+            stmt = attendance_select(include_orphans=True, source=source).where(src.student_id == student_id)
             if start_date:
-                query = query.filter(Attendance.date >= start_date)
+                stmt = stmt.where(src.date >= start_date)
             if end_date:
-                query = query.filter(Attendance.date <= end_date)
+                stmt = stmt.where(src.date <= end_date)
+            stmt = stmt.order_by(src.date.desc())
+            return stmt.limit(limit) if limit else stmt
 
-            return query.order_by(Attendance.date.desc()).all()
+        session = get_session()
+        try:
+            # Recent records usually fill the limit without touching the archives
+            if limit:
+                rows = fetch_rows(session, history_select(Attendance.__table__), AttendanceRow)
+                if len(rows) == limit:
+                    return rows
+            source = attendance_source(session, start_date, end_date, student_id)
+            return fetch_rows(session, history_select(source), AttendanceRow)
         finally:
             session.close()
 
+    @staticmethod
+    def _count_columns(source=None) -> tuple:
+        """Total, present and late counts as conditional aggregates over one scan"""
+        src = (Attendance.__table__ if source is None else source).c
+        return (
+            func.count(src.id),
+            func.coalesce(func.sum(case((src.status == 'Present', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((src.status == 'Late', 1), else_=0)), 0)
+        )
+
+    @staticmethod
+    def _stats_dict(total: int, present: int, late: int) -> dict:
+        total, present, late = total or 0, present or 0, late or 0
+        return {
+            'total': total,
+            'present': present,
+            'late': late,
+            'absent': total - present - late,
+            'percentage': round(present / max(total, 1) * 100, 1)
+        }
+
     @staticmethod
     def get_student_attendance_stats(student_id: str) -> dict:
         """Get attendance statistics for a student"""
         session = get_session()
         try:
-            total = session.query(func.count(Attendance.id)).filter(
-                Attendance.student_id == student_id
-            ).scalar()
+            total = present = late = 0
+            for source in attendance_source_batches(session, student_id=student_id):
+                counts = session.query(
+                    *AttendanceOperations._count_columns(source)
+                ).filter(
+                    source.c.student_id == student_id
+                ).one()
+                total, present, late = (a + b for a, b in zip((total, present, late), counts))
+
+            return AttendanceOperations._stats_dict(total, present, late)
+        finally:
+            session.close()
 
-            present = session.query(func.count(Attendance.id)).filter(
-                and_(
-                    Attendance.student_id == student_id,
-                    Attendance.status == 'Present'
+    @staticmethod
+    def get_all_student_stats(start_date: date = None, end_date: date = None) -> dict:
+        """
+        Attendance statistics for every student with one GROUP BY query
+        Returns: {student_id: stats} in the shape of get_student_attendance_stats;
+        students without records in the range are absent from the dict
+        """
+        session = get_session()
+        try:
+            # Counts per student are summed over batches of attached archives
+            counts = {}
+            for source in attendance_source_batches(session, start_date, end_date):
+                src = source.c
+                query = session.query(
+                    src.student_id, *AttendanceOperations._count_columns(source)
                 )
-            ).scalar()
+                if start_date:
+                    query = query.filter(src.date >= start_date)
+                if end_date:
+                    query = query.filter(src.date <= end_date)
 
-            late = session.query(func.count(Attendance.id)).filter(
-                and_(
-                    Attendance.student_id == student_id,
-                    Attendance.status == 'Late'
-                )
-            ).scalar()
+                for student_id, *row in query.group_by(src.student_id):
+                    counts[student_id] = [a + b for a, b in zip(counts.get(student_id, (0, 0, 0)), row)]
 
             return {
-                'total': total or 0,
-                'present': present or 0,
-                'late': late or 0,
-                'absent': (total or 0) - (present or 0) - (late or 0),
-                'percentage': round((present or 0) / max(total or 1, 1) * 100, 1)
+                student_id: AttendanceOperations._stats_dict(*row)
+                for student_id, row in counts.items()
             }
         finally:
             session.close()
 
     @staticmethod
     def get_attendance_summary(start_date: date, end_date: date) -> dict:
-        """Get attendance summary statistics"""
+        """Get attendance summary statistics from the daily aggregates"""
         session = get_session()
         try:
-            total_records = session.query(func.count(Attendance.id)).filter(
-                and_(
-                    Attendance.date >= start_date,
-                    Attendance.date <= end_date
-                )
-            ).scalar()
-
-            present_count = session.query(func.count(Attendance.id)).filter(
-                and_(
-                    Attendance.date >= start_date,
-                    Attendance.date <= end_date,
-                    Attendance.status == 'Present'
-                )
-            ).scalar()
-
-            late_count = session.query(func.count(Attendance.id)).filter(
+            stats = AttendanceDailyStats
+            total_records, present_count, late_count = session.query(
+                func.sum(stats.count),
+                func.sum(case((stats.status == 'Present', stats.count), else_=0)),
+                func.sum(case((stats.status == 'Late', stats.count), else_=0))
+            ).filter(
                 and_(
-                    Attendance.date >= start_date,
-                    Attendance.date <= end_date,
-                    Attendance.status == 'Late'
+                    stats.date >= start_date,
+                    stats.date <= end_date
                 )
-            ).scalar()
+            ).one()
 
             return {
                 'total': total_records or 0,
@@ -587,22 +1112,110 @@ class AttendanceOperations:
             session.close()
 
     @staticmethod
-    def get_attendance_report(start_date: date, end_date: date) -> list:
-        """Get detailed attendance report with student info"""
+    def rebuild_daily_stats() -> int:
+        """Recompute the daily aggregates from the attendance table"""
+        return rebuild_daily_stats()
+
+    @staticmethod
+    def _report_select(session, start_date: date, end_date: date, student_id: str = None,
+                       department: str = None) -> tuple:
+        """
+        AttendanceRow projection for a date range, optionally for one student or
+        department ('' for students without one), reading archived terms the range reaches into
+        Returns: (statement, source columns for filtering and ordering)
+        """
+        source = attendance_source(session, start_date, end_date, student_id)
+        src = source.c
+        stmt = attendance_select(source=source).where(
+            and_(
+                src.date >= start_date,
+                src.date <= end_date
+            )
+        )
+        if student_id:
+            stmt = stmt.where(src.student_id == student_id)
+        if department is not None:
+            stmt = stmt.where(func.coalesce(Student.department, '') == department)
+        return stmt, src
+
+    @staticmethod
+    def get_attendance_report_page(start_date: date, end_date: date, after: tuple = None,
+                                   limit: int = 100, student_id: str = None) -> tuple:
+        """
+        One page of the attendance report, ordered newest day first, then time in and id
+        after: cursor returned for the previous page, None for the first page
+        Returns: ([AttendanceRow], next_cursor or None)
+        """
         session = get_session()
         try:
-            results = session.query(
-                Attendance, Student
-            ).join(
-                Student, Attendance.student_id == Student.student_id
-            ).filter(
-                and_(
-                    Attendance.date >= start_date,
-                    Attendance.date <= end_date
-                )
-            ).order_by(Attendance.date.desc(), Attendance.time_in).all()
+            stmt, src = AttendanceOperations._report_select(session, start_date, end_date, student_id)
+            # Records without a time in sort first within their day
+            time_key = func.coalesce(src.time_in, time.min)
+
+            if after is not None:
+                after_date, after_time, after_id = after
+                stmt = stmt.where(or_(
+                    src.date < after_date,
+                    and_(
+                        src.date == after_date,
+                        tuple_(time_key, src.id) > tuple_(after_time or time.min, after_id)
+                    )
+                ))
 
-            return results
+            stmt = stmt.order_by(src.date.desc(), time_key, src.id).limit(limit + 1)
+            rows = fetch_rows(session, stmt, AttendanceRow)
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = (last.date, last.time_in, last.id)
+            return rows, next_cursor
+        finally:
+            session.close()
+
+    @staticmethod
+    def iter_attendance_report(start_date: date, end_date: date, student_id: str = None,
+                               batch_size: int = 1000, department: str = None):
+        """
+        Stream the attendance report as AttendanceRow tuples in report order,
+        fetching batch_size rows at a time so memory stays bounded
+        department: only students of this department ('' for students without one)
+        """
+        session = get_session()
+        try:
+            stmt, src = AttendanceOperations._report_select(
+                session, start_date, end_date, student_id, department
+            )
+            stmt = stmt.order_by(src.date.desc(), func.coalesce(src.time_in, time.min), src.id)
+            yield from stream_rows(session, stmt, AttendanceRow, batch_size)
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_report_departments(start_date: date, end_date: date, student_id: str = None) -> list:
+        """
+        Departments with attendance in the report range, as [(department, records)]
+        sorted by name; students without a department are reported under ''
+        """
+        session = get_session()
+        try:
+            stmt, _ = AttendanceOperations._report_select(session, start_date, end_date, student_id)
+            report = stmt.subquery()
+            department = func.coalesce(report.c.department, '')
+            return [tuple(row) for row in session.execute(
+                select(department, func.count()).group_by(department).order_by(department)
+            )]
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_attendance_report(start_date: date, end_date: date) -> list:
+        """Get detailed attendance report with student info as [AttendanceRow]"""
+        session = get_session()
+        try:
+            stmt, src = AttendanceOperations._report_select(session, start_date, end_date)
+            return fetch_rows(session, stmt.order_by(src.date.desc(), src.time_in), AttendanceRow)
         finally:
             session.close()
 
@@ -617,9 +1230,20 @@ class AttendanceOperations:
             if not attendance:
                 return False, "Attendance record not found"
 
+            old_key = AttendanceOperations._stats_key(session, attendance)
             for key, value in kwargs.items():
                 if hasattr(attendance, key):
                     setattr(attendance, key, value)
+            if archived_dates(session, [attendance.date]):
+                session.rollback()
+                return False, "Date is in an archived term"
+            if session.is_modified(attendance):
+                AttendanceOperations.bump_data_version(session)
+
+            # Move the record between aggregate rows if its date, status or student changed
+            new_key = AttendanceOperations._stats_key(session, attendance)
+            if new_key != old_key:
+                AttendanceOperations._adjust_daily_stats(session, {old_key: -1, new_key: 1})
 
             session.commit()
             return True, "Attendance updated successfully"
@@ -640,8 +1264,14 @@ class AttendanceOperations:
             if not attendance:
                 return False, "Attendance record not found"
 
+            student_id, day = attendance.student_id, attendance.date
+            AttendanceOperations._adjust_daily_stats(
+                session, {AttendanceOperations._stats_key(session, attendance): -1}
+            )
             session.delete(attendance)
+            AttendanceOperations.bump_data_version(session)
             session.commit()
+            record_removed(student_id, day)
             return True, "Attendance record deleted"
         except Exception as e:
             session.rollback()
@@ -654,8 +1284,8 @@ class AttendanceOperations:
         """Get today's attendance count"""
         session = get_session()
         try:
-            return session.query(func.count(Attendance.id)).filter(
-                Attendance.date == date.today()
+            return session.query(func.sum(AttendanceDailyStats.count)).filter(
+                AttendanceDailyStats.date == date.today()
             ).scalar() or 0
         finally:
             session.close()
@@ -715,30 +1345,24 @@ class SystemLogOperations:
 
     @staticmethod
     def log_activity(level: str, module: str, message: str,
-                     user_action: str = None):
-        """Log a system activity"""
-        session = get_session()
-        try:
-            log = SystemLog(
-                level=level,
-                module=module,
-                message=message,
-                user_action=user_action
-            )
-            session.add(log)
-            session.commit()
-        except Exception as e:
-            session.rollback()
-        finally:
-            session.close()
+                     user_action: str = None) -> bool:
+        """Log a system activity (buffered, written in the background)"""
+        from .log_buffer import get_system_log_buffer
+        return get_system_log_buffer().add(level, module, message, user_action)
 
     @staticmethod
     def get_recent_logs(limit: int = 100) -> list:
-        """Get recent system logs"""
+        """Get recent system logs, including entries not yet flushed to the database"""
+        from .log_buffer import get_system_log_buffer
+        pending = get_system_log_buffer().pending_entries(limit)
+
         session = get_session()
         try:
-            return session.query(SystemLog).order_by(
+            stored = session.query(SystemLog).order_by(
                 SystemLog.timestamp.desc()
             ).limit(limit).all()
         finally:
             session.close()
+
+        logs = sorted(pending + stored, key=lambda log: log.timestamp, reverse=True)
+        return logs[:limit]
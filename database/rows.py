@@ -0,0 +1,95 @@
+"""
+Read-Only Row Types
+Column projections for report, export and dashboard reads. Rows are plain
+named tuples built from Core select() results, so they carry no ORM identity
+map or instrumentation and stay usable after the session is closed
+"""
+
+from datetime import date, datetime, time
+from typing import Iterator, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from .models import Attendance, Student
+
+
+class AttendanceRow(NamedTuple):
+    """Attendance record with the student's name and department"""
+    id: int
+    student_id: str
+    name: Optional[str]
+    department: Optional[str]
+    date: date
+    time_in: Optional[time]
+    time_out: Optional[time]
+    status: Optional[str]
+    confidence_score: Optional[float]
+
+
+class StudentRow(NamedTuple):
+    """Student listing row (without the stored face encoding)"""
+    student_id: str
+    name: str
+    email: Optional[str]
+    phone: Optional[str]
+    department: Optional[str]
+    batch: Optional[str]
+    section: Optional[str]
+    image_count: int
+    is_active: bool
+    has_face_encoding: bool
+    created_at: Optional[datetime]
+
+
+def attendance_select(include_orphans: bool = False, source=None):
+    """
+    SELECT of AttendanceRow columns
+    include_orphans: keep records whose student no longer exists (name/department None)
+    source: table or subquery with the attendance columns (default: the attendance table)
+    """
+    source = Attendance.__table__ if source is None else source
+    stmt = select(
+        source.c.id,
+        source.c.student_id,
+        Student.name,
+        Student.department,
+        source.c.date,
+        source.c.time_in,
+        source.c.time_out,
+        source.c.status,
+        source.c.confidence_score
+    ).select_from(source)
+
+    onclause = source.c.student_id == Student.student_id
+    if include_orphans:
+        return stmt.outerjoin(Student, onclause)
+    return stmt.join(Student, onclause)
+
+
+def student_select():
+    """SELECT of StudentRow columns"""
+    return select(
+        Student.student_id,
+        Student.name,
+        Student.email,
+        Student.phone,
+        Student.department,
+        Student.batch,
+        Student.section,
+        Student.image_count,
+        Student.is_active,
+        Student.face_encoding.isnot(None),
+        Student.created_at
+    )
+
+
+def fetch_rows(session, stmt, row_type) -> list:
+    """Execute a projection and return row_type tuples"""
+    return list(map(row_type._make, session.execute(stmt)))
+
+
+def stream_rows(session, stmt, row_type, batch_size: int = 1000) -> Iterator:
+    """Execute a projection and yield row_type tuples, batch_size rows fetched at a time"""
+    result = session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from map(row_type._make, partition)
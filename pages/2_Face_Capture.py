@@ -14,7 +14,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.operations import StudentOperations
 from utils.face_detector import FaceDetector, LivenessDetector
-from utils.helpers import save_face_image, get_student_image_count, create_student_folder
+from utils.camera import get_camera_registry, PreviewRenderer, scale_rect
+from utils.helpers import get_student_image_count, create_student_folder
+from utils.image_writer import start_capture_writer, report_capture_encoding
 from config.settings import CAPTURE_SETTINGS, DATASET_DIR
 
 # Page configuration
@@ -87,17 +89,27 @@ def initialize_session_state():
         st.session_state.selected_student = None
     if 'camera_index' not in st.session_state:
         st.session_state.camera_index = 0
+    if 'capture_encoders' not in st.session_state:
+        st.session_state.capture_encoders = []
 
 
 def get_available_cameras():
-    """Get list of available cameras"""
-    cameras = []
-    for i in range(5):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            cameras.append(i)
-            cap.release()
-    return cameras if cameras else [0]
+    """Get list of available cameras from the cached registry (never probes inline)"""
+    cameras = get_camera_registry().get_cameras()
+    # Keep the current selection listed while a re-probe may not see a busy device
+    if isinstance(st.session_state.camera_index, int) and st.session_state.camera_index not in cameras:
+        cameras = sorted(cameras + [st.session_state.camera_index])
+    return cameras
+
+
+def show_camera_refresh():
+    """Manual re-probe of camera devices"""
+    registry = get_camera_registry()
+    if registry.is_probing:
+        st.caption("Scanning for cameras...")
+    if st.button("Refresh Cameras", key="refresh_cameras"):
+        registry.refresh()
+        st.rerun()
 
 
 def capture_face_images(student_id: str, student_name: str, num_images: int = 50):
@@ -124,6 +136,22 @@ def capture_face_images(student_id: str, student_name: str, num_images: int = 50
     last_capture_time = 0
     capture_interval = CAPTURE_SETTINGS['capture_interval']
 
+    # Encode and write crops off the capture loop
+    writer, encoder = start_capture_writer()
+
+    preview = PreviewRenderer(camera_placeholder)
+
+    # Instructions
+    info_placeholder.markdown("""
+    <div class="instruction-box">
+        <strong>Instructions:</strong><br>
+        - Keep your face centered in the frame<br>
+        - Slowly move your head left, right, up, and down<br>
+        - Vary your expression slightly<br>
+        - Ensure good lighting on your face
+    </div>
+    """, unsafe_allow_html=True)
+
     stop_button = st.button("Stop Capture", key="stop_capture")
 
     while captured < num_images and not stop_button:
@@ -133,7 +161,6 @@ def capture_face_images(student_id: str, student_name: str, num_images: int = 50
             break
 
         frame = cv2.flip(frame, 1)
-        display_frame = frame.copy()
 
         # Detect faces
         faces = face_detector.detect_faces_haar(frame)
@@ -141,9 +168,6 @@ def capture_face_images(student_id: str, student_name: str, num_images: int = 50
         current_time = time.time()
 
         for (x, y, w, h) in faces:
-            # Draw face rectangle
-            cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 200, 0), 2)
-
             # Check liveness
             face_gray = cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
 
@@ -156,7 +180,8 @@ def capture_face_images(student_id: str, student_name: str, num_images: int = 50
                 if face_img.size > 0:
                     # Resize face image
                     face_resized = cv2.resize(face_img, CAPTURE_SETTINGS['image_size'])
-                    save_face_image(student_id, face_resized, captured + 1)
+                    if writer.submit(student_id, face_resized, captured + 1) is None:
+                        continue
                     captured += 1
                     last_capture_time = current_time
 
@@ -168,40 +193,42 @@ def capture_face_images(student_id: str, student_name: str, num_images: int = 50
                         unsafe_allow_html=True
                     )
 
-        # Add overlay text
-        cv2.putText(display_frame, f"Student: {student_name}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(display_frame, f"Captured: {captured}/{num_images}", (10, 60),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-        if not faces:
-            cv2.putText(display_frame, "No face detected - Please face the camera", (10, 90),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-        # Convert to RGB for Streamlit
-        display_frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-        camera_placeholder.image(display_frame_rgb, channels="RGB", use_container_width=True)
-
-        # Instructions
-        info_placeholder.markdown("""
-        <div class="instruction-box">
-            <strong>Instructions:</strong><br>
-            - Keep your face centered in the frame<br>
-            - Slowly move your head left, right, up, and down<br>
-            - Vary your expression slightly<br>
-            - Ensure good lighting on your face
-        </div>
-        """, unsafe_allow_html=True)
+        def draw_overlays(canvas, scale):
+            for rect in faces:
+                x, y, w, h = scale_rect(rect, scale)
+                cv2.rectangle(canvas, (x, y), (x + w, y + h), (0, 200, 0), 2)
+
+            cv2.putText(canvas, f"Student: {student_name}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            cv2.putText(canvas, f"Captured: {captured}/{num_images}", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+            if not faces:
+                cv2.putText(canvas, "No face detected - Please face the camera", (10, 90),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+        # Preview is throttled independently of the capture rate
+        preview.render(frame, draw_overlays)
 
         # Check stop button
         if stop_button:
             break
 
-        time.sleep(0.03)
-
     cap.release()
     camera_placeholder.empty()
 
+    # Wait for queued images to reach disk before counting them
+    write_report = writer.close()
+    if encoder:
+        # Encoding keeps going in the background, reported on a later run
+        encoder.finish()
+        st.session_state.capture_encoders.append(encoder)
+    if write_report['failed']:
+        st.warning(f"{len(write_report['failed'])} images could not be saved:")
+        for path, error in write_report['failed'][:10]:
+            st.caption(f"{Path(path).name}: {error}")
+        captured = write_report['written']
+
     if captured > 0:
         # Update student record
         StudentOperations.update_student(student_id, image_count=get_student_image_count(student_id))
@@ -248,6 +275,7 @@ def show_existing_images(student_id: str):
 
 def main():
     initialize_session_state()
+    report_capture_encoding()
 
     st.markdown('<p class="main-header">Face Capture</p>', unsafe_allow_html=True)
 
@@ -269,6 +297,7 @@ def main():
             options=available_cameras,
             format_func=lambda x: f"Camera {x}"
         )
+        show_camera_refresh()
 
         # Number of images
         num_images = st.slider(
@@ -6,16 +6,21 @@ Real-time face recognition for attendance marking
 import streamlit as st
 import cv2
 import numpy as np
-import time
 from datetime import datetime, date
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from database.operations import StudentOperations, AttendanceOperations
+from database.operations import StudentOperations, AttendanceOperations, FaceEncodingOperations
+from database.attendance_queue import get_attendance_sink
+from database.attendance_index import get_marked_today_index
 from utils.face_detector import FaceDetector, LivenessDetector
 from utils.face_recognizer import FaceRecognizer, LBPHRecognizer
+from utils.camera import (
+    CameraManager, PreviewRenderer, REPLAY_SOURCE, get_camera_registry, scale_rect
+)
+from utils.attendance_pipeline import AttendancePipeline
 from utils.helpers import format_time
 from config.settings import ATTENDANCE_SETTINGS, TRAINED_MODELS_DIR, LIVENESS_SETTINGS
 
@@ -94,28 +99,43 @@ def initialize_session_state():
         st.session_state.recognition_active = False
     if 'last_recognized' not in st.session_state:
         st.session_state.last_recognized = None
-    if 'today_marked' not in st.session_state:
-        st.session_state.today_marked = set()
     if 'camera_index' not in st.session_state:
         st.session_state.camera_index = 0
+    # Recording start defaults, fixed once so reruns do not move the time input
+    if 'recording_date' not in st.session_state:
+        st.session_state.recording_date = date.today()
+    if 'recording_time' not in st.session_state:
+        st.session_state.recording_time = datetime.now().time().replace(second=0, microsecond=0)
 
 
 def get_available_cameras():
-    """Get list of available cameras"""
-    cameras = []
-    for i in range(5):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            cameras.append(i)
-            cap.release()
-    return cameras if cameras else [0]
+    """Get list of available cameras from the cached registry (never probes inline)"""
+    cameras = get_camera_registry().get_cameras()
+    # Keep the current selection listed while a re-probe may not see a busy device
+    if isinstance(st.session_state.camera_index, int) and st.session_state.camera_index not in cameras:
+        cameras = sorted(cameras + [st.session_state.camera_index])
+    return cameras
+
+
+def show_camera_refresh():
+    """Manual re-probe of camera devices"""
+    registry = get_camera_registry()
+    if registry.is_probing:
+        st.caption("Scanning for cameras...")
+    if st.button("Refresh Cameras", key="refresh_cameras"):
+        registry.refresh()
+        st.rerun()
 
 
 def check_models_exist():
     """Check if recognition models are trained"""
-    dlib_model = TRAINED_MODELS_DIR / "face_encodings.pkl"
     lbph_model = TRAINED_MODELS_DIR / "lbph_model.yml"
-    return dlib_model.exists() or lbph_model.exists()
+    return has_dlib_gallery() or lbph_model.exists()
+
+
+def has_dlib_gallery():
+    """Face encodings are stored in the database (or a legacy pickle is still to be migrated)"""
+    return FaceEncodingOperations.has_gallery(TRAINED_MODELS_DIR / "face_encodings.pkl")
 
 
 def run_attendance_recognition():
@@ -132,10 +152,9 @@ def run_attendance_recognition():
     dlib_recognizer = None
     lbph_recognizer = None
 
-    dlib_model = TRAINED_MODELS_DIR / "face_encodings.pkl"
     lbph_model = TRAINED_MODELS_DIR / "lbph_model.yml"
 
-    if dlib_model.exists():
+    if has_dlib_gallery():
         dlib_recognizer = FaceRecognizer()
     if lbph_model.exists():
         lbph_recognizer = LBPHRecognizer()
@@ -144,174 +163,160 @@ def run_attendance_recognition():
         st.error("Failed to load recognition models.")
         return
 
+    # Students already marked today, shared with other cameras in this process
+    marked_index = get_marked_today_index()
+    marked_index.load()
+
+    pipeline = AttendancePipeline(
+        dlib_recognizer=dlib_recognizer,
+        lbph_recognizer=lbph_recognizer,
+        liveness_detector=liveness_detector,
+        face_detector=face_detector,
+        required_frames=5,
+        cooldown_seconds=5,
+        sink=get_attendance_sink(),
+        marked_index=marked_index
+    )
+
     # UI elements
     camera_placeholder = st.empty()
     status_placeholder = st.empty()
     result_placeholder = st.empty()
     attendance_placeholder = st.empty()
 
-    cap = cv2.VideoCapture(st.session_state.camera_index)
+    camera = CameraManager(st.session_state.camera_index)
 
-    if not cap.isOpened():
+    if not camera.start():
         st.error("Failed to open camera. Please check camera connection.")
         return
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-    # Recognition state
-    recognition_buffer = {}
-    REQUIRED_FRAMES = 5
-    last_attendance_time = {}
-    COOLDOWN_SECONDS = 5
+    preview = PreviewRenderer(camera_placeholder)
 
     stop_button = st.button("Stop Recognition", key="stop_recognition")
 
     while not stop_button:
-        ret, frame = cap.read()
+        ret, frame = camera.read_frame()
         if not ret:
             st.warning("Failed to read frame")
             break
 
-        frame = cv2.flip(frame, 1)
-        display_frame = frame.copy()
-        current_time = time.time()
-
-        # Detect faces
-        faces = face_detector.detect_faces_haar(frame)
-
-        for (x, y, w, h) in faces:
-            face_color = (128, 128, 128)  # Gray for unknown
-            label = "Detecting..."
-
-            # Extract face region
-            face_img = frame[y:y+h, x:x+w]
-            face_gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-
-            # Check liveness if enabled
-            is_live = True
-            if liveness_detector:
-                is_live, blink_count, has_movement = liveness_detector.check_liveness(face_gray)
-
-            # Recognize face
-            student_id = "Unknown"
-            name = "Unknown"
-            confidence = 0.0
-
-            if dlib_recognizer:
-                # Get larger region for dlib
-                padding = 50
-                y1 = max(0, y - padding)
-                y2 = min(frame.shape[0], y + h + padding)
-                x1 = max(0, x - padding)
-                x2 = min(frame.shape[1], x + w + padding)
-                face_region = frame[y1:y2, x1:x2]
-
-                encoding = dlib_recognizer.get_face_encoding(face_region)
-                if encoding is not None:
-                    student_id, name, confidence = dlib_recognizer.recognize_face(encoding)
-
-            elif lbph_recognizer:
-                face_resized = cv2.resize(face_gray, (200, 200))
-                student_id, name, confidence = lbph_recognizer.recognize_face(face_resized)
-
-            # Update recognition buffer for stability
-            if student_id != "Unknown":
-                if student_id not in recognition_buffer:
-                    recognition_buffer[student_id] = {'count': 0, 'confidence': []}
-
-                recognition_buffer[student_id]['count'] += 1
-                recognition_buffer[student_id]['confidence'].append(confidence)
-
-                # Check if recognized consistently
-                if recognition_buffer[student_id]['count'] >= REQUIRED_FRAMES:
-                    avg_confidence = np.mean(recognition_buffer[student_id]['confidence'])
-
-                    # Check cooldown
-                    last_time = last_attendance_time.get(student_id, 0)
-                    if current_time - last_time > COOLDOWN_SECONDS:
-                        # Check if already marked today
-                        if not AttendanceOperations.check_attendance_exists(student_id):
-                            # Mark attendance
-                            success, msg = AttendanceOperations.mark_attendance(
-                                student_id=student_id,
-                                confidence_score=avg_confidence,
-                                status='Present'
-                            )
-                            if success:
-                                st.session_state.today_marked.add(student_id)
-                                result_placeholder.success(
-                                    f"Attendance marked for {name} ({student_id}) - Confidence: {avg_confidence:.1%}"
-                                )
-                            last_attendance_time[student_id] = current_time
-                        else:
-                            result_placeholder.info(
-                                f"{name} ({student_id}) - Already marked today"
-                            )
-                            last_attendance_time[student_id] = current_time
-
-                    # Set display values
-                    face_color = (0, 200, 0)  # Green for recognized
-                    label = f"{name} ({confidence:.0%})"
-
-                    # Reset buffer for this person
-                    recognition_buffer[student_id] = {'count': 0, 'confidence': []}
-
-            else:
-                # Unknown face
-                face_color = (0, 0, 200)  # Red for unknown
-                label = "Unknown"
-                recognition_buffer = {}
-
-            # Draw face box
-            cv2.rectangle(display_frame, (x, y), (x + w, y + h), face_color, 2)
-
-            # Draw label
-            label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)[0]
-            cv2.rectangle(display_frame, (x, y - 25), (x + label_size[0] + 10, y), face_color, -1)
-            cv2.putText(display_frame, label, (x + 5, y - 8),
+        faces, events = pipeline.process_frame(frame)
+
+        for event in events:
+            student_id, name = event['student_id'], event['name']
+            if event['type'] == 'marked':
+                result_placeholder.success(
+                    f"Attendance marked for {name} ({student_id}) - Confidence: {event['confidence']:.1%}"
+                )
+            elif event['type'] == 'already_marked':
+                result_placeholder.info(
+                    f"{name} ({student_id}) - Already marked today"
+                )
+            elif event['type'] == 'failed':
+                result_placeholder.error(
+                    f"{name} ({student_id}) - {event['message']}"
+                )
+
+        def draw_overlays(canvas, scale):
+            for face in faces:
+                x, y, w, h = scale_rect(face['rect'], scale)
+                face_color = face['color']
+                label = face['label']
+
+                # Draw face box
+                cv2.rectangle(canvas, (x, y), (x + w, y + h), face_color, 2)
+
+                # Draw label
+                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)[0]
+                cv2.rectangle(canvas, (x, y - 25), (x + label_size[0] + 10, y), face_color, -1)
+                cv2.putText(canvas, label, (x + 5, y - 8),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+                # Show liveness status if enabled
+                if liveness_detector:
+                    liveness_text = "Live" if face['is_live'] else "Check liveness"
+                    liveness_color = (0, 255, 0) if face['is_live'] else (0, 165, 255)
+                    cv2.putText(canvas, liveness_text, (x, y + h + 20),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, liveness_color, 1)
+
+            # Add timestamp
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cv2.putText(canvas, timestamp, (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+            # Add status
+            status_text = f"Faces: {len(faces)} | Marked today: {len(marked_index)}"
+            cv2.putText(canvas, status_text, (10, canvas.shape[0] - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
 
-            # Show liveness status if enabled
-            if liveness_detector:
-                liveness_text = "Live" if is_live else "Check liveness"
-                liveness_color = (0, 255, 0) if is_live else (0, 165, 255)
-                cv2.putText(display_frame, liveness_text, (x, y + h + 20),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, liveness_color, 1)
-
-        # Add timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cv2.putText(display_frame, timestamp, (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-        # Add status
-        status_text = f"Faces: {len(faces)} | Marked today: {len(st.session_state.today_marked)}"
-        cv2.putText(display_frame, status_text, (10, display_frame.shape[0] - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-
-        # Convert to RGB for Streamlit
-        display_frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-        camera_placeholder.image(display_frame_rgb, channels="RGB", use_container_width=True)
-
-        # Update today's attendance list
-        today_records = AttendanceOperations.get_daily_attendance()
-        if today_records:
-            with attendance_placeholder.container():
-                st.markdown("**Today's Attendance:**")
-                for record in today_records[-5:]:  # Show last 5
-                    student = StudentOperations.get_student(record.student_id)
-                    name = student.name if student else record.student_id
-                    st.markdown(f"- {name}: {format_time(record.time_in)}")
-
-        time.sleep(0.03)
-
-    cap.release()
+        # Recognition runs on every frame, the preview only at the display rate
+        if preview.render(frame, draw_overlays):
+            # Update today's attendance list
+            today_records = AttendanceOperations.get_daily_attendance_with_students(latest=5)
+            if today_records:
+                with attendance_placeholder.container():
+                    st.markdown("**Today's Attendance:**")
+                    for record in today_records:  # Show last 5
+                        name = record.name or record.student_id
+                        st.markdown(f"- {name}: {format_time(record.time_in)}")
+
+    camera.stop()
     camera_placeholder.empty()
 
+    # Commit marks still waiting in the write-behind queue
+    pipeline.sink.flush(timeout=5)
+
+
+def run_recording_attendance(source: str, recording_start: datetime):
+    """Compute attendance from a recorded lecture in a pool of worker processes"""
+    from utils.video_attendance import VideoAttendanceProcessor
+
+    if not Path(source).exists():
+        st.error(f"Recording not found: {source}")
+        return
+
+    processor = VideoAttendanceProcessor()
+    progress_bar = st.progress(0)
+    status_placeholder = st.empty()
+    status_placeholder.info(f"Processing recording with {processor.max_workers} workers...")
+
+    def on_progress(done, total):
+        progress_bar.progress(done / total)
+
+    result = processor.process(source, recording_start, progress_callback=on_progress)
+    status_placeholder.empty()
+
+    if 'stats' not in result:
+        st.error(result['message'])
+        return
+    if not result['success']:
+        st.warning(result['message'])
+
+    stats = result['stats']
+    st.info(
+        f"{stats['frames_total']} frames in {stats['elapsed_seconds']:.1f}s "
+        f"({stats['fps']:.1f} fps, {stats['realtime_factor']:.1f}x real time, "
+        f"{stats['processed_fps']:.1f} recognized frames/s on {stats['workers']} workers)"
+    )
+
+    students = result['students']
+    if not students:
+        st.warning("No registered students recognized in the recording.")
+        return
+
+    outcomes = processor.write_attendance(students, notes=f"Recording: {Path(source).name}")
+    for student_id, info in sorted(students.items(), key=lambda item: item[1]['first_seen']):
+        success, msg = outcomes[student_id]
+        line = f"{info['name']} ({student_id}) - first seen {info['first_seen'].strftime('%H:%M:%S')}"
+        if success:
+            st.markdown(f"- {line}: {msg}")
+        else:
+            st.markdown(f"- {line}: failed ({msg})")
+
 
 def show_today_attendance():
     """Show today's attendance records"""
-    records = AttendanceOperations.get_daily_attendance()
+    records = AttendanceOperations.get_daily_attendance_with_students()
 
     if not records:
         st.info("No attendance records for today yet.")
@@ -320,11 +325,10 @@ def show_today_attendance():
     st.markdown(f"**Total Present: {len(records)}**")
 
     for record in records:
-        student = StudentOperations.get_student(record.student_id)
         col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
 
         with col1:
-            st.markdown(f"**{student.name if student else record.student_id}**")
+            st.markdown(f"**{record.name or record.student_id}**")
         with col2:
             st.markdown(f"ID: {record.student_id}")
         with col3:
@@ -359,13 +363,14 @@ def main():
     with st.sidebar:
         st.markdown("### Settings")
 
-        # Camera selection
-        available_cameras = get_available_cameras()
+        # Camera selection (the replay source drives the loop without a webcam)
+        available_cameras = get_available_cameras() + [REPLAY_SOURCE]
         st.session_state.camera_index = st.selectbox(
             "Select Camera",
             options=available_cameras,
-            format_func=lambda x: f"Camera {x}"
+            format_func=lambda x: "Replay (load test)" if x == REPLAY_SOURCE else f"Camera {x}"
         )
+        show_camera_refresh()
 
         # Liveness detection
         liveness_enabled = st.checkbox(
@@ -403,6 +408,22 @@ def main():
         st.markdown("---")
         show_today_attendance()
 
+    # Offline attendance from a recorded lecture
+    st.markdown("---")
+    with st.expander("Attendance from Recording"):
+        st.markdown("Compute attendance from a lecture video file or a folder of frames")
+
+        source = st.text_input("Recording path (video file or image folder)")
+        rec_col1, rec_col2 = st.columns(2)
+        with rec_col1:
+            recording_date = st.date_input("Recording date", max_value=date.today(),
+                                           key="recording_date")
+        with rec_col2:
+            recording_time = st.time_input("Recording start time", key="recording_time")
+
+        if st.button("Process Recording", disabled=not source):
+            run_recording_attendance(source, datetime.combine(recording_date, recording_time))
+
     # Manual attendance option
     st.markdown("---")
     with st.expander("Manual Attendance Entry"):
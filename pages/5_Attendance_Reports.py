@@ -5,7 +5,9 @@ View and export attendance reports
 
 import streamlit as st
 import pandas as pd
+import io
 from datetime import datetime, date, timedelta
+from itertools import chain
 from pathlib import Path
 import sys
 
@@ -13,6 +15,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.operations import StudentOperations, AttendanceOperations
 from utils.export import ExportManager, generate_attendance_summary_report
+from utils.export_cache import get_export_cache, report_cache_key
 from utils.helpers import format_date, format_time, get_date_range, calculate_attendance_percentage
 
 # Page configuration
@@ -125,46 +128,64 @@ def show_summary_stats(start_date: date, end_date: date):
         """, unsafe_allow_html=True)
 
 
-def show_attendance_table(start_date: date, end_date: date,
-                          student_filter: str = None):
-    """Display attendance records in a table"""
-    records = AttendanceOperations.get_attendance_report(start_date, end_date)
+REPORT_PAGE_SIZE = 100
 
-    if not records:
-        st.info("No attendance records found for the selected period.")
-        return []
 
-    # Prepare data for display
-    data = []
-    for attendance, student in records:
-        if student_filter and student_filter not in [student.student_id, 'All']:
-            continue
+def report_row(record) -> dict:
+    """Display/export row for one AttendanceRow"""
+    return {
+        'Date': str(record.date),
+        'Student ID': record.student_id,
+        'Name': record.name,
+        'Department': record.department or 'N/A',
+        'Time In': format_time(record.time_in),
+        'Time Out': format_time(record.time_out) if record.time_out else '-',
+        'Status': record.status,
+        'Confidence': f"{record.confidence_score:.0%}" if record.confidence_score else 'N/A'
+    }
 
-        data.append({
-            'Date': str(attendance.date),
-            'Student ID': attendance.student_id,
-            'Name': student.name,
-            'Department': student.department or 'N/A',
-            'Time In': format_time(attendance.time_in),
-            'Time Out': format_time(attendance.time_out) if attendance.time_out else '-',
-            'Status': attendance.status,
-            'Confidence': f"{attendance.confidence_score:.0%}" if attendance.confidence_score else 'N/A'
-        })
 
-    if not data:
-        st.info("No records match the filter criteria.")
-        return []
+def show_attendance_table(start_date: date, end_date: date,
+                          student_filter: str = None) -> bool:
+    """Display attendance records one page at a time, returns whether any exist"""
+    # Cursor stack for the current query; a new query starts at the first page
+    query_key = (start_date, end_date, student_filter)
+    if st.session_state.get('report_query') != query_key:
+        st.session_state.report_query = query_key
+        st.session_state.report_cursors = [None]
+    cursors = st.session_state.report_cursors
+
+    records, next_cursor = AttendanceOperations.get_attendance_report_page(
+        start_date, end_date, after=cursors[-1], limit=REPORT_PAGE_SIZE,
+        student_id=student_filter
+    )
+
+    if not records and len(cursors) == 1:
+        st.info("No attendance records found for the selected period.")
+        return False
 
     # Display as dataframe
-    df = pd.DataFrame(data)
+    df = pd.DataFrame([report_row(record) for record in records])
     st.dataframe(df, use_container_width=True, hide_index=True)
 
-    return data
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("Previous", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(cursors)} ({REPORT_PAGE_SIZE} records per page)")
+    with col3:
+        if st.button("Next", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    return True
 
 
 def show_student_attendance_summary():
     """Show attendance summary per student"""
-    students = StudentOperations.get_all_students()
+    students = StudentOperations.list_students()
 
     if not students:
         st.info("No students registered.")
@@ -174,13 +195,13 @@ def show_student_attendance_summary():
     today = date.today()
     start_of_month = today.replace(day=1)
 
+    month_stats = AttendanceOperations.get_all_student_stats(start_of_month, today)
+
     data = []
     for student in students:
-        records = AttendanceOperations.get_student_attendance(
-            student.student_id, start_of_month, today
-        )
-        present_days = len([r for r in records if r.status == 'Present'])
-        late_days = len([r for r in records if r.status == 'Late'])
+        stats = month_stats.get(student.student_id, {})
+        present_days = stats.get('present', 0)
+        late_days = stats.get('late', 0)
         total_days = (today - start_of_month).days + 1
 
         data.append({
@@ -199,7 +220,7 @@ def show_student_attendance_summary():
 
 def show_daily_breakdown(target_date: date):
     """Show detailed breakdown for a specific day"""
-    records = AttendanceOperations.get_daily_attendance(target_date)
+    records = AttendanceOperations.get_daily_attendance_with_students(target_date)
 
     st.markdown(f"**Date: {format_date(target_date)}**")
 
@@ -210,11 +231,10 @@ def show_daily_breakdown(target_date: date):
     st.markdown(f"**Total Present: {len(records)}**")
 
     for record in records:
-        student = StudentOperations.get_student(record.student_id)
         col1, col2, col3 = st.columns([2, 2, 1])
 
         with col1:
-            st.markdown(f"**{student.name if student else 'Unknown'}**")
+            st.markdown(f"**{record.name or 'Unknown'}**")
             st.caption(f"ID: {record.student_id}")
         with col2:
             st.markdown(f"In: {format_time(record.time_in)}")
@@ -228,46 +248,81 @@ def show_daily_breakdown(target_date: date):
         st.divider()
 
 
-def export_report(data: list, format_type: str):
-    """Export attendance report"""
-    if not data:
-        st.warning("No data to export.")
-        return
+# File extension and MIME type of each export format
+EXPORT_FORMATS = {
+    'CSV': ('csv', "text/csv"),
+    'Excel': ('xlsx', "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    'PDF': ('pdf', "application/pdf"),
+}
 
-    export_manager = ExportManager()
 
-    if format_type == 'Excel':
-        filepath = export_manager.export_to_excel(data, f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-        if filepath:
-            with open(filepath, 'rb') as f:
-                st.download_button(
-                    label="Download Excel",
-                    data=f,
-                    file_name=Path(filepath).name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+def build_export(start_date: date, end_date: date, student_filter: str, format_type: str,
+                 split_by_department: bool = False):
+    """Render the report into memory; returns the file bytes, None if there is nothing to export"""
+    # Rows are streamed from the database rather than taken from the paged table
+    stream = AttendanceOperations.iter_attendance_report(
+        start_date, end_date, student_id=student_filter
+    )
+    first = next(stream, None)
+    if first is None:
+        st.warning("No data to export.")
+        return None
+    records = chain([first], stream)
 
-    elif format_type == 'CSV':
-        filepath = export_manager.export_to_csv(data)
-        if filepath:
-            with open(filepath, 'rb') as f:
-                st.download_button(
-                    label="Download CSV",
-                    data=f,
-                    file_name=Path(filepath).name,
-                    mime="text/csv"
-                )
+    export_manager = ExportManager()
+    buffer = io.BytesIO()
+
+    # Written straight from the query cursor into the download buffer
+    if format_type == 'CSV':
+        result = export_manager.export_attendance_csv(records, buffer)
+    elif format_type == 'Excel':
+        result = export_manager.export_attendance_excel(
+            records, buffer, split_by_department=split_by_department
+        )
+    elif split_by_department:
+        # Sections are queried and rendered per department by worker processes
+        stream.close()
+        result = export_manager.export_attendance_pdf(
+            sink=buffer, by_department=True, start_date=start_date,
+            end_date=end_date, student_id=student_filter
+        )
+    else:
+        result = export_manager.export_attendance_pdf(records, buffer)
+
+    if result is None:
+        st.error(f"{format_type} export failed. See the application log for details.")
+        return None
+    return buffer.getvalue()
+
+
+def export_report(start_date: date, end_date: date, student_filter: str, format_type: str,
+                  split_by_department: bool = False):
+    """Export attendance report as a download served from memory"""
+    def build():
+        return build_export(start_date, end_date, student_filter, format_type, split_by_department)
+
+    cache = get_export_cache()
+    if cache:
+        # Version read before building: a write during the build bumps it, so the
+        # entry is never served in place of the newer data
+        key = report_cache_key(
+            format_type, start_date, end_date,
+            {'student_id': student_filter, 'split_by_department': split_by_department},
+            AttendanceOperations.get_data_version()
+        )
+        data = cache.get_or_build(key, build)
+    else:
+        data = build()
+    if data is None:
+        return
 
-    elif format_type == 'PDF':
-        filepath = export_manager.export_to_pdf(data, title="Attendance Report")
-        if filepath:
-            with open(filepath, 'rb') as f:
-                st.download_button(
-                    label="Download PDF",
-                    data=f,
-                    file_name=Path(filepath).name,
-                    mime="application/pdf"
-                )
+    extension, mime = EXPORT_FORMATS[format_type]
+    st.download_button(
+        label=f"Download {format_type}",
+        data=data,
+        file_name=f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+        mime=mime
+    )
 
 
 def main():
@@ -316,7 +371,7 @@ def main():
                     st.date_input("End Date", value=end_date, disabled=True)
 
             # Student filter
-            students = StudentOperations.get_all_students()
+            students = StudentOperations.list_students()
             student_options = ['All'] + [s.student_id for s in students]
             student_filter = st.selectbox("Filter by Student", options=student_options)
 
@@ -330,27 +385,39 @@ def main():
 
         st.markdown("---")
 
-        # Show table and get data for export
-        data = show_attendance_table(start_date, end_date,
-                                     student_filter if student_filter != 'All' else None)
+        # Show table
+        student_filter = student_filter if student_filter != 'All' else None
+        has_records = show_attendance_table(start_date, end_date, student_filter)
 
         # Export options
-        if data:
+        if has_records:
             st.markdown("---")
             st.markdown("**Export Report**")
+            split_by_department = st.checkbox(
+                "Split by department (Excel sheets, PDF sections)", value=False
+            )
             col1, col2, col3 = st.columns(3)
 
             with col1:
                 if st.button("Export to Excel", use_container_width=True):
-                    export_report(data, 'Excel')
+                    export_report(start_date, end_date, student_filter, 'Excel', split_by_department)
 
             with col2:
                 if st.button("Export to CSV", use_container_width=True):
-                    export_report(data, 'CSV')
+                    export_report(start_date, end_date, student_filter, 'CSV')
 
             with col3:
                 if st.button("Export to PDF", use_container_width=True):
-                    export_report(data, 'PDF')
+                    export_report(start_date, end_date, student_filter, 'PDF', split_by_department)
+
+            cache = get_export_cache()
+            if cache:
+                stats = cache.stats()
+                st.caption(
+                    f"Export cache: {stats['hits']} of {stats['hits'] + stats['misses']} downloads "
+                    f"served from cache ({stats['hit_rate']:.0%}), "
+                    f"{stats['bytes'] / (1024 * 1024):.1f} MB in {stats['entries']} files"
+                )
 
     with tab3:
         st.markdown('<p class="sub-header">Student Attendance Summary</p>', unsafe_allow_html=True)
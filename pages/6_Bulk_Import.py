@@ -0,0 +1,166 @@
+"""
+Bulk Import Page
+Enroll many students at once from a CSV roster and a photo directory tree
+"""
+
+import streamlit as st
+import io
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.bulk_import import (
+    BulkImporter, ROSTER_COLUMNS, STATUS_READY, STATUS_INSUFFICIENT, STATUS_INVALID,
+    STATUS_FAILED, STATUS_NO_PHOTOS
+)
+from config.settings import BASE_DIR, BULK_IMPORT_SETTINGS
+
+# Page configuration
+st.set_page_config(
+    page_title="Bulk Import",
+    page_icon="",
+    layout="wide"
+)
+
+# Custom CSS - Orange, White & Black Theme
+st.markdown("""
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
+    * { font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif; }
+
+    .main-header {
+        font-size: 2rem;
+        font-weight: 600;
+        color: #171717;
+        margin-bottom: 1rem;
+        padding-bottom: 0.5rem;
+        border-bottom: 3px solid #f97316;
+    }
+    .sub-header {
+        font-size: 1.2rem;
+        font-weight: 500;
+        color: #171717;
+        margin-top: 1.5rem;
+        margin-bottom: 1rem;
+    }
+    .stat-card {
+        background-color: #ffffff;
+        border: 1px solid #e5e5e5;
+        border-radius: 12px;
+        padding: 1.5rem;
+        text-align: center;
+        margin: 0.5rem 0;
+        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1);
+    }
+    .stat-number {
+        font-size: 2rem;
+        font-weight: 700;
+        color: #f97316;
+    }
+    .stat-label {
+        font-size: 0.85rem;
+        color: #525252;
+        margin-top: 0.5rem;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+    }
+    .stButton>button {
+        background: #f97316;
+        color: white;
+        border: none;
+        border-radius: 8px;
+        padding: 0.75rem 1.5rem;
+        font-weight: 600;
+    }
+    .stButton>button:hover {
+        background: #ea580c;
+        transform: translateY(-1px);
+    }
+</style>
+""", unsafe_allow_html=True)
+
+
+def show_report(importer: BulkImporter, rows: list):
+    """Outcome counts, the per-student table and a CSV download"""
+    counts = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+
+    columns = st.columns(5)
+    for column, (status, label) in zip(columns, [
+        (STATUS_READY, "Ready"), (STATUS_INSUFFICIENT, "Too Few Photos"),
+        (STATUS_NO_PHOTOS, "No Photos"), (STATUS_FAILED, "Failed"), (STATUS_INVALID, "Invalid Rows")
+    ]):
+        with column:
+            st.markdown(f"""
+            <div class="stat-card">
+                <div class="stat-number">{counts.get(status, 0)}</div>
+                <div class="stat-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+    st.markdown('<p class="sub-header">Per-Student Report</p>', unsafe_allow_html=True)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    buffer = io.StringIO()
+    importer.write_report(buffer)
+    st.download_button(
+        label="Download Report (CSV)",
+        data=buffer.getvalue().encode('utf-8'),
+        file_name="bulk_import_report.csv",
+        mime="text/csv"
+    )
+
+
+def main():
+    st.markdown('<p class="main-header">Bulk Import</p>', unsafe_allow_html=True)
+
+    st.markdown(f"""
+    Upload a CSV roster with the columns `student_id` and `name` (optional:
+    {', '.join(f'`{c}`' for c in ROSTER_COLUMNS[2:])}). Photos are read from
+    `<photos directory>/<student_id>/` on the server; each photo is cropped to the face,
+    checked for quality and encoded.
+
+    Imports are resumable: running the same roster again continues with the students
+    that were not finished. Progress is kept in `{BULK_IMPORT_SETTINGS['state_dir']}`.
+    """)
+
+    roster_file = st.file_uploader("Roster (CSV)", type=['csv'])
+    photos_dir = st.text_input("Photos directory", value=str(BASE_DIR / "photos"))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        workers = st.number_input("Worker processes (0 = one per CPU)", min_value=0, max_value=64, value=0)
+    with col2:
+        restart = st.checkbox("Start over (ignore saved progress)", value=False)
+
+    if roster_file is None:
+        return
+
+    importer = BulkImporter(roster_file.getvalue(), photos_dir or None, max_workers=workers or None)
+    valid, invalid = importer.parse_roster()
+    st.info(f"Roster: {len(valid)} valid rows, {len(invalid)} invalid")
+
+    if photos_dir and not Path(photos_dir).is_dir():
+        st.warning(f"Photos directory not found: {photos_dir}. Students will be imported without photos.")
+
+    if st.button("Start Import", type="primary"):
+        progress = st.progress(0)
+        status = st.empty()
+
+        def on_progress(done: int, total: int):
+            progress.progress(done / max(total, 1))
+            status.text(f"{done}/{total} students processed")
+
+        with st.spinner("Importing..."):
+            rows = importer.run(progress_callback=on_progress, restart=restart)
+
+        progress.empty()
+        status.empty()
+        st.success("Import finished")
+        show_report(importer, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Shared fixtures: every test gets its own throwaway database"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the import-time database path away from the real one
+os.environ.setdefault('ATTENDANCE_DB_PATH', str(Path(tempfile.mkdtemp(prefix="attendance_test_")) / "test.db"))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Fresh database (and archive directory) under tmp_path"""
+    from database import models, archive
+    from config.settings import ARCHIVE_SETTINGS
+
+    models.dispose_engine()
+    monkeypatch.setattr(models, 'DATABASE_PATH', tmp_path / "attendance.db")
+    monkeypatch.setitem(ARCHIVE_SETTINGS, 'directory', str(tmp_path / "archive"))
+    archive._schema_tables.clear()
+    yield tmp_path
+    models.dispose_engine()
@@ -0,0 +1,83 @@
+"""Reads across more archived terms than one connection can attach"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from config.settings import ARCHIVE_SETTINGS
+
+TERM_DAYS = 10
+STUDENTS = ('S1', 'S2', 'S3')
+
+
+def seed_terms(terms: int) -> list:
+    """STUDENTS x days of attendance covering terms past terms; returns [(term, start, end)]"""
+    from database.models import get_session, rebuild_daily_stats, Student, Attendance
+
+    first_day = date.today() - timedelta(days=TERM_DAYS * terms + 1)
+    session = get_session()
+    try:
+        session.execute(insert(Student), [
+            {'student_id': sid, 'name': f"Student {sid}", 'department': 'CS'} for sid in STUDENTS
+        ])
+        session.execute(insert(Attendance), [
+            {'student_id': sid, 'date': first_day + timedelta(days=d),
+             'time_in': datetime(2020, 1, 1, 9).time(),
+             'status': 'Late' if (d + i) % 4 == 0 else 'Present'}
+            for d in range(TERM_DAYS * terms) for i, sid in enumerate(STUDENTS)
+        ])
+        session.commit()
+    finally:
+        session.close()
+    rebuild_daily_stats()
+
+    return [
+        (f"term-{t}", first_day + timedelta(days=t * TERM_DAYS),
+         first_day + timedelta(days=(t + 1) * TERM_DAYS - 1))
+        for t in range(terms)
+    ]
+
+
+def test_reads_span_more_archives_than_can_be_attached(db):
+    from database.archive import archive_term, list_archives
+    from database.operations import AttendanceOperations
+
+    terms = seed_terms(ARCHIVE_SETTINGS['max_attached'] + 2)
+    first_day, last_day = terms[0][1], terms[-1][2]
+
+    before_all = AttendanceOperations.get_all_student_stats()
+    before_one = AttendanceOperations.get_student_attendance_stats('S2')
+    before_history = AttendanceOperations.get_student_attendance('S2')
+    before_report = AttendanceOperations.get_attendance_report(first_day, last_day)
+
+    for term, start, end in terms:
+        success, msg = archive_term(term, start, end)
+        assert success, msg
+    assert len(list_archives()) == len(terms)
+
+    assert AttendanceOperations.get_all_student_stats() == before_all
+    assert AttendanceOperations.get_student_attendance_stats('S2') == before_one
+    assert before_one['total'] == TERM_DAYS * len(terms)
+    assert ([r.date for r in AttendanceOperations.get_student_attendance('S2')]
+            == [r.date for r in before_history])
+    after_report = AttendanceOperations.get_attendance_report(first_day, last_day)
+    assert sorted(r[1:] for r in after_report) == sorted(r[1:] for r in before_report)
+    assert len(list(AttendanceOperations.iter_attendance_report(first_day, last_day))) == len(before_report)
+
+
+def test_marks_into_archived_terms_are_rejected(db):
+    from database.archive import archive_term
+    from database.operations import AttendanceOperations
+
+    (term, start, end), = seed_terms(1)
+    assert archive_term(term, start, end)[0]
+    stats_before = AttendanceOperations.get_all_student_stats()
+
+    seen = datetime.combine(start, datetime(2020, 1, 1, 10).time())
+    success, msg = AttendanceOperations.mark_attendance('S1', timestamp=seen, record_time_out=False)
+    assert not success and 'archived' in msg
+    assert AttendanceOperations.mark_attendance_bulk([{'student_id': 'S2', 'timestamp': seen}]) == {}
+
+    assert AttendanceOperations.get_all_student_stats() == stats_before
+    report = AttendanceOperations.get_attendance_report(start, start)
+    assert sorted(r.student_id for r in report) == sorted(STUDENTS)
@@ -0,0 +1,49 @@
+"""Write-behind sink retries failed batches before reporting them"""
+
+from database.operations import AttendanceOperations
+
+
+def flaky_bulk(monkeypatch, failures: int) -> list:
+    """Make mark_attendance_bulk fail its first failures calls; returns the list of calls"""
+    calls = []
+    real = AttendanceOperations.mark_attendance_bulk
+
+    def mark_attendance_bulk(entries, record_time_out=True):
+        calls.append([entry['student_id'] for entry in entries])
+        if len(calls) <= failures:
+            return {}
+        return real(entries, record_time_out=record_time_out)
+
+    monkeypatch.setattr(AttendanceOperations, 'mark_attendance_bulk', staticmethod(mark_attendance_bulk))
+    return calls
+
+
+def test_failed_batch_is_retried(db, monkeypatch):
+    from database.attendance_queue import AttendanceSink
+
+    calls = flaky_bulk(monkeypatch, failures=2)
+    events = []
+    sink = AttendanceSink(flush_ms=10, retry_attempts=3, retry_backoff_ms=10)
+    assert sink.submit('S1', 0.9, on_result=events.append)
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    assert len(calls) == 3
+    assert [event['type'] for event in events] == ['marked']
+    assert AttendanceOperations.check_attendance_exists('S1')
+    assert sink.retried == 2 and sink.failed == 0
+
+
+def test_mark_fails_after_retries(db, monkeypatch):
+    from database.attendance_queue import AttendanceSink
+
+    calls = flaky_bulk(monkeypatch, failures=10)
+    events = []
+    sink = AttendanceSink(flush_ms=10, retry_attempts=2, retry_backoff_ms=10)
+    assert sink.submit('S1', 0.9, on_result=events.append)
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    assert len(calls) == 3
+    assert [event['type'] for event in events] == ['failed']
+    assert sink.pending == 0 and sink.failed == 1
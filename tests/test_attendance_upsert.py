@@ -0,0 +1,85 @@
+"""Attendance upserts are keyed by student and date"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from database.operations import AttendanceOperations, MARK_NEW, MARK_EXISTS
+
+
+def test_upsert_keeps_one_row_per_student_and_day(db):
+    from database.models import get_session, Attendance, AttendanceDailyStats
+
+    today = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    session = get_session()
+    try:
+        outcomes = AttendanceOperations._upsert_attendance(session, [
+            {'student_id': 'S1', 'timestamp': today + timedelta(minutes=5)},
+            {'student_id': 'S1', 'timestamp': yesterday},
+            {'student_id': 'S1', 'timestamp': today},
+            {'student_id': 'S2', 'timestamp': today},
+        ], record_time_out=False)
+        session.commit()
+
+        assert outcomes == {
+            ('S1', today.date()): MARK_NEW,
+            ('S1', yesterday.date()): MARK_NEW,
+            ('S2', today.date()): MARK_NEW,
+        }
+        rows = {(r.student_id, r.date): r.time_in for r in session.query(Attendance)}
+        assert rows == {
+            ('S1', today.date()): today.time(),
+            ('S1', yesterday.date()): yesterday.time(),
+            ('S2', today.date()): today.time(),
+        }
+        counts = dict(session.query(AttendanceDailyStats.date, func.sum(AttendanceDailyStats.count))
+                      .group_by(AttendanceDailyStats.date))
+        assert counts == {today.date(): 2, yesterday.date(): 1}
+    finally:
+        session.close()
+
+
+def test_bulk_mark_reports_per_student(db):
+    today = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    entries = [{'student_id': 'S1', 'timestamp': today}, {'student_id': 'S2', 'timestamp': today}]
+
+    assert AttendanceOperations.mark_attendance_bulk(entries, record_time_out=False) == {
+        'S1': MARK_NEW, 'S2': MARK_NEW
+    }
+    assert AttendanceOperations.mark_attendance_bulk(entries[:1], record_time_out=False) == {
+        'S1': MARK_EXISTS
+    }
+
+
+def test_bulk_mark_rejects_mixed_dates(db):
+    today = datetime.now()
+    with pytest.raises(ValueError):
+        AttendanceOperations.mark_attendance_bulk([
+            {'student_id': 'S1', 'timestamp': today},
+            {'student_id': 'S2', 'timestamp': today - timedelta(days=1)},
+        ])
+    assert not AttendanceOperations.check_attendance_exists('S1')
+
+
+def test_time_out_is_latest_sighting(db):
+    from database.models import get_session, Attendance
+
+    first = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    assert AttendanceOperations.mark_attendance('S1', timestamp=first)[0]
+
+    sightings = [first + timedelta(hours=h) for h in (2, 5, 3)]
+    AttendanceOperations.mark_attendance_bulk(
+        [{'student_id': 'S1', 'timestamp': seen} for seen in sightings]
+    )
+    # An earlier sighting does not move time_out back
+    AttendanceOperations.mark_attendance_bulk([{'student_id': 'S1', 'timestamp': first + timedelta(hours=1)}])
+
+    session = get_session()
+    try:
+        record = session.query(Attendance).filter(Attendance.student_id == 'S1').one()
+        assert record.time_in == first.time()
+        assert record.time_out == max(sightings).time()
+    finally:
+        session.close()
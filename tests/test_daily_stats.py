@@ -0,0 +1,63 @@
+"""Incrementally maintained daily stats match a rebuild from the attendance table"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from database.operations import StudentOperations, AttendanceOperations
+
+
+def daily_stats() -> dict:
+    from database.models import get_engine, AttendanceDailyStats
+
+    stats = AttendanceDailyStats
+    with get_engine().connect() as conn:
+        return {
+            (day, department, section, status): count
+            for day, department, section, status, count in conn.execute(
+                select(stats.date, stats.department, stats.section, stats.status, stats.count)
+            )
+        }
+
+
+def rebuilt_stats() -> dict:
+    from database.models import rebuild_daily_stats
+
+    rebuild_daily_stats()
+    return daily_stats()
+
+
+def test_stats_follow_student_edits_and_deletes(db):
+    for sid, department, section in (('S1', 'CS', 'A'), ('S2', 'CS', 'B'), ('S3', 'EE', 'A')):
+        success, msg = StudentOperations.create_student(sid, f"Student {sid}",
+                                                        department=department, section=section)
+        assert success, msg
+
+    today = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    for days_ago in range(3):
+        for sid in ('S1', 'S2', 'S3'):
+            success, msg = AttendanceOperations.mark_attendance(
+                sid, timestamp=today - timedelta(days=days_ago), record_time_out=False
+            )
+            assert success, msg
+
+    assert StudentOperations.update_student('S1', department='EE', section='B')[0]
+    assert StudentOperations.update_student('S2', name="Renamed")[0]
+    incremental = daily_stats()
+    assert incremental == rebuilt_stats()
+    assert incremental[(today.date(), 'EE', 'B', 'Present')] == 1
+
+    # Record edits after the move touch the new group, not the old one
+    record = AttendanceOperations.get_daily_attendance(today.date())
+    s1_record = next(r for r in record if r.student_id == 'S1')
+    assert AttendanceOperations.update_attendance(s1_record.id, status='Late')[0]
+    assert AttendanceOperations.delete_attendance(
+        next(r for r in record if r.student_id == 'S3').id
+    )[0]
+    assert daily_stats() == rebuilt_stats()
+
+    assert StudentOperations.delete_student('S2', soft_delete=False)[0]
+    incremental = daily_stats()
+    assert incremental == rebuilt_stats()
+    assert not any(department == 'CS' for _, department, _, _ in incremental)
+    assert all(count > 0 for count in incremental.values())
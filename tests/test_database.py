@@ -0,0 +1,53 @@
+"""Connection pragmas, and WAL letting readers and a writer run side by side"""
+
+import threading
+import time
+
+from config.settings import DATABASE_SETTINGS
+
+
+def test_connection_pragmas(db):
+    from database.models import get_engine
+
+    with get_engine().connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma('journal_mode').lower() == 'wal'
+        assert pragma('busy_timeout') == DATABASE_SETTINGS['busy_timeout_ms']
+        assert pragma('synchronous') == 1  # NORMAL
+
+
+def test_reader_and_writer_run_concurrently(db):
+    from database.models import get_engine
+
+    engine = get_engine()
+    reader = engine.raw_connection()
+    writer = engine.raw_connection()
+    try:
+        reader.driver_connection.isolation_level = None
+        read = reader.cursor()
+        read.execute("BEGIN")
+        before = read.execute("SELECT count(*) FROM students").fetchone()[0]
+
+        # The writer commits while the reader's transaction is open, without waiting for it
+        committed = threading.Event()
+
+        def write():
+            cursor = writer.cursor()
+            cursor.execute("INSERT INTO students (student_id, name, is_active) VALUES ('W1', 'Writer', 1)")
+            writer.commit()
+            committed.set()
+
+        thread = threading.Thread(target=write)
+        started = time.perf_counter()
+        thread.start()
+        assert committed.wait(DATABASE_SETTINGS['busy_timeout_ms'] / 1000 / 2)
+        thread.join()
+        assert time.perf_counter() - started < 1.0
+
+        # The reader keeps its snapshot until its transaction ends, then sees the row
+        assert read.execute("SELECT count(*) FROM students").fetchone()[0] == before
+        read.execute("COMMIT")
+        assert read.execute("SELECT count(*) FROM students").fetchone()[0] == before + 1
+    finally:
+        reader.close()
+        writer.close()
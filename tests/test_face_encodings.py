@@ -0,0 +1,27 @@
+"""The face_encodings table, not the legacy pickle, decides whether a gallery exists"""
+
+import numpy as np
+
+from database.operations import (
+    StudentOperations, FaceEncodingOperations, get_data_version, FACE_ENCODING_DATA
+)
+
+
+def test_gallery_follows_the_table(db, tmp_path):
+    legacy = tmp_path / "face_encodings.pkl"
+    assert not FaceEncodingOperations.has_gallery(legacy)
+    legacy.write_bytes(b"")
+    # Not migrated yet: the pickle still counts
+    assert FaceEncodingOperations.has_gallery(legacy)
+
+    assert StudentOperations.create_student('S1', "Student S1")[0]
+    encoding = np.ones(128, dtype=np.float32)
+    assert FaceEncodingOperations.replace_encodings({'S1': [(encoding, None, 'h1')]})[0]
+    assert FaceEncodingOperations.has_gallery()
+
+    version = get_data_version(FACE_ENCODING_DATA)
+    assert StudentOperations.delete_student('S1', soft_delete=False)[0]
+    assert get_data_version(FACE_ENCODING_DATA) > version
+    assert FaceEncodingOperations.get_encoding_count() == 0
+    # Initialized and empty: a leftover pickle no longer counts
+    assert not FaceEncodingOperations.has_gallery(legacy)
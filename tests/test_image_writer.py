@@ -0,0 +1,36 @@
+"""Images whose fsync fails are reported as failed, not as written"""
+
+import errno
+import os
+
+import numpy as np
+
+
+def test_fsync_failure_is_not_counted_as_written(tmp_path, monkeypatch):
+    from utils import image_writer
+    from utils.image_writer import AsyncImageWriter
+
+    monkeypatch.setattr(image_writer, 'create_student_folder', lambda student_id: tmp_path)
+    real_fsync = os.fsync
+    calls = []
+
+    def flaky_fsync(fd):
+        calls.append(fd)
+        if len(calls) == 2:
+            raise OSError(errno.EIO, "I/O error")
+        real_fsync(fd)
+
+    monkeypatch.setattr(image_writer.os, 'fsync', flaky_fsync)
+    handed_on = []
+    writer = AsyncImageWriter(fsync_batch=2, on_written=lambda path, image: handed_on.append(path))
+    writer.start()
+    image = np.zeros((20, 20, 3), dtype=np.uint8)
+    for index in range(1, 6):
+        assert writer.submit('S1', image, index)
+    report = writer.close()
+
+    assert report['written'] == 4
+    assert len(report['failed']) == 1
+    failed_path, error = report['failed'][0]
+    assert 'fsync' in error and failed_path not in writer.written
+    assert len(handed_on) == 5
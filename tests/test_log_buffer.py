@@ -0,0 +1,32 @@
+"""Entries the system log buffer cannot keep are counted as dropped"""
+
+
+def test_failed_flush_counts_truncated_entries(db, monkeypatch):
+    from database import log_buffer
+    from database.log_buffer import SystemLogBuffer
+
+    buffer = SystemLogBuffer(flush_size=1000, max_pending=5, overload_policy='sample', sample_every=1)
+    for i in range(10):
+        assert buffer.add('INFO', 'test', f"message {i}")
+
+    class FailingSession:
+        def execute(self, *args, **kwargs):
+            raise RuntimeError("database is locked")
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(log_buffer, 'get_session', FailingSession)
+    assert buffer.flush() == 0
+    # A failed write keeps everything within twice max_pending
+    assert buffer.dropped == 0 and len(buffer.pending_entries()) == 10
+
+    # Past twice max_pending the oldest entries are discarded, and counted
+    buffer._buffer.extend(dict(entry, message='late') for entry in list(buffer._buffer)[:3])
+    assert buffer.flush() == 0
+    assert buffer.dropped == 3
+    assert len(buffer.pending_entries()) == 10
+    assert buffer.dropped + len(buffer.pending_entries()) == 13
@@ -9,6 +9,7 @@ from .helpers import (
     FrameRateCalculator
 )
 from .export import ExportManager, generate_attendance_summary_report
+from .export_cache import ExportCache, get_export_cache
 
 # Lazy load opencv-dependent modules
 def get_face_detector():
@@ -30,3 +31,15 @@ def get_lbph_recognizer():
 def get_camera_manager():
     from .camera import CameraManager
     return CameraManager
+
+def get_video_attendance_processor():
+    from .video_attendance import VideoAttendanceProcessor
+    return VideoAttendanceProcessor
+
+def get_async_image_writer():
+    from .image_writer import AsyncImageWriter
+    return AsyncImageWriter
+
+def get_bulk_importer():
+    from .bulk_import import BulkImporter
+    return BulkImporter
@@ -0,0 +1,184 @@
+"""
+Attendance Pipeline Module
+Per-frame detection, liveness, recognition and attendance marking used by the
+live recognition loop, kept free of Streamlit so it can also run headless
+"""
+
+import time
+import logging
+from collections import deque
+from pathlib import Path
+from typing import List, Tuple
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.face_detector import FaceDetector
+
+logger = logging.getLogger(__name__)
+
+COLOR_UNKNOWN = (0, 0, 200)
+COLOR_PENDING = (128, 128, 128)
+COLOR_RECOGNIZED = (0, 200, 0)
+
+
+class AttendancePipeline:
+    """
+    Turns camera frames into face results and attendance events
+    A face must be recognized in required_frames frames before attendance is marked
+    """
+
+    def __init__(self, dlib_recognizer=None, lbph_recognizer=None,
+                 liveness_detector=None, face_detector: FaceDetector = None,
+                 required_frames: int = 5, cooldown_seconds: float = 5,
+                 mark_attendance: bool = True, sink=None, marked_index=None):
+        """
+        sink: optional AttendanceSink; marks are then written in the background
+        and their events are returned by a later process_frame call
+        marked_index: optional MarkedTodayIndex answering "already marked" from memory
+        """
+        self.face_detector = face_detector or FaceDetector()
+        self.dlib_recognizer = dlib_recognizer
+        self.lbph_recognizer = lbph_recognizer
+        self.liveness_detector = liveness_detector
+        self.required_frames = required_frames
+        self.cooldown_seconds = cooldown_seconds
+        self.mark_attendance = mark_attendance
+        self.sink = sink
+        self.marked_index = marked_index
+
+        self.recognition_buffer = {}
+        # Results delivered by the sink's writer thread
+        self._sink_events = deque()
+        self.last_attendance_time = {}
+
+    def recognize(self, frame: np.ndarray, face_rect: tuple,
+                  face_gray: np.ndarray) -> Tuple[str, str, float]:
+        """Recognize one detected face, preferring dlib over LBPH"""
+        x, y, w, h = face_rect
+
+        if self.dlib_recognizer:
+            # Get larger region for dlib
+            padding = 50
+            y1 = max(0, y - padding)
+            y2 = min(frame.shape[0], y + h + padding)
+            x1 = max(0, x - padding)
+            x2 = min(frame.shape[1], x + w + padding)
+            face_region = frame[y1:y2, x1:x2]
+
+            encoding = self.dlib_recognizer.get_face_encoding(face_region)
+            if encoding is not None:
+                return self.dlib_recognizer.recognize_face(encoding)
+
+        elif self.lbph_recognizer:
+            face_resized = cv2.resize(face_gray, (200, 200))
+            return self.lbph_recognizer.recognize_face(face_resized)
+
+        return "Unknown", "Unknown", 0.0
+
+    def _record_attendance(self, student_id: str, name: str,
+                           avg_confidence: float, current_time: float) -> dict:
+        """Mark attendance once the cooldown allows it, returns an event or None"""
+        last_time = self.last_attendance_time.get(student_id, 0)
+        if current_time - last_time <= self.cooldown_seconds:
+            return None
+
+        self.last_attendance_time[student_id] = current_time
+        event = {'student_id': student_id, 'name': name, 'confidence': avg_confidence}
+
+        if not self.mark_attendance:
+            event.update(type='marked', message="Dry run")
+            return event
+
+        if self.marked_index is not None and student_id in self.marked_index:
+            event.update(type='already_marked', message="Already marked today")
+            return event
+
+        if self.sink is not None and self.sink.submit(
+                student_id, confidence_score=avg_confidence, status='Present',
+                name=name, on_result=self._sink_events.append):
+            return None
+
+        from database.operations import AttendanceOperations, MARK_NEW
+
+        # One upsert; a day already recorded is left as it is
+        outcome = AttendanceOperations.mark_attendance_bulk([{
+            'student_id': student_id,
+            'confidence_score': avg_confidence,
+            'status': 'Present'
+        }], record_time_out=False).get(student_id)
+
+        if outcome is None:
+            event.update(type='failed', message="Could not write attendance")
+        elif outcome == MARK_NEW:
+            event.update(type='marked', message="Attendance marked successfully")
+        else:
+            event.update(type='already_marked', message="Already marked today")
+        return event
+
+    def process_frame(self, frame: np.ndarray,
+                      current_time: float = None) -> Tuple[List[dict], List[dict]]:
+        """
+        Run the pipeline on one frame
+        Returns: (faces, events)
+        faces: [{'rect', 'label', 'color', 'is_live'}] for drawing
+        events: [{'type', 'student_id', 'name', 'confidence', 'message'}]
+        """
+        if current_time is None:
+            current_time = time.time()
+
+        faces = []
+        events = []
+        while self._sink_events:
+            events.append(self._sink_events.popleft())
+
+        for (x, y, w, h) in self.face_detector.detect_faces_haar(frame):
+            face_color = COLOR_PENDING
+            label = "Detecting..."
+
+            # Extract face region
+            face_img = frame[y:y+h, x:x+w]
+            face_gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+
+            # Check liveness if enabled
+            is_live = True
+            if self.liveness_detector:
+                is_live, _, _ = self.liveness_detector.check_liveness(face_gray)
+
+            student_id, name, confidence = self.recognize(frame, (x, y, w, h), face_gray)
+
+            # Update recognition buffer for stability
+            if student_id != "Unknown":
+                buffer = self.recognition_buffer.setdefault(
+                    student_id, {'count': 0, 'confidence': []}
+                )
+                buffer['count'] += 1
+                buffer['confidence'].append(confidence)
+
+                # Check if recognized consistently
+                if buffer['count'] >= self.required_frames:
+                    avg_confidence = float(np.mean(buffer['confidence']))
+                    event = self._record_attendance(student_id, name, avg_confidence, current_time)
+                    if event:
+                        events.append(event)
+
+                    face_color = COLOR_RECOGNIZED
+                    label = f"{name} ({confidence:.0%})"
+
+                    # Reset buffer for this person
+                    self.recognition_buffer[student_id] = {'count': 0, 'confidence': []}
+            else:
+                face_color = COLOR_UNKNOWN
+                label = "Unknown"
+                self.recognition_buffer = {}
+
+            faces.append({
+                'rect': (x, y, w, h),
+                'label': label,
+                'color': face_color,
+                'is_live': is_live
+            })
+
+        return faces, events
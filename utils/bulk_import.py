@@ -0,0 +1,409 @@
+"""
+Bulk Import Module
+Enrolls students from a CSV roster and a photos/<student_id>/* directory tree.
+The roster goes in with one bulk insert; photos are decoded, cropped to the face,
+quality-gated and encoded in a pool of worker processes. Progress is checkpointed
+to a JSON state file after every student so an interrupted import resumes
+
+Usage: python -m utils.bulk_import roster.csv --photos photos/ [--workers 8] [--report report.csv]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import (
+    BULK_IMPORT_SETTINGS, CAPTURE_SETTINGS, DATASET_DIR, FACE_RECOGNITION_SETTINGS
+)
+from database.operations import StudentOperations, FaceEncodingOperations, SystemLogOperations
+from utils.helpers import validate_email, validate_phone
+
+logger = logging.getLogger(__name__)
+
+# Roster columns stored on the student; student_id and name are required
+ROSTER_COLUMNS = ('student_id', 'name', 'email', 'phone', 'department',
+                  'batch', 'semester', 'section', 'address')
+
+# Per-student outcomes
+STATUS_READY = 'ready'  # Enough encodings stored for recognition
+STATUS_INSUFFICIENT = 'insufficient'  # Some photos accepted, fewer than required
+STATUS_NO_PHOTOS = 'no_photos'
+STATUS_FAILED = 'failed'
+STATUS_INVALID = 'invalid'  # Roster row rejected
+
+REPORT_FIELDS = ('line', 'student_id', 'name', 'roster', 'photos', 'accepted',
+                 'rejected', 'encodings', 'status', 'message')
+
+
+def _process_student_photos(student_id: str, photo_paths: List[str], dataset_dir: str) -> dict:
+    """
+    Worker: turn one student's photos into face crops and training encodings
+    Crops are written to dataset_dir/<student_id>/ with a precomputed-encoding sidecar,
+    named after the source photo so a resumed import overwrites rather than duplicates
+    """
+    from utils.face_recognizer import (
+        FaceQualityValidator, compute_training_encoding, save_precomputed_encoding,
+        image_source_hash, ENCODING_OK
+    )
+    import face_recognition
+
+    folder = Path(dataset_dir) / student_id
+    folder.mkdir(parents=True, exist_ok=True)
+    width, height = CAPTURE_SETTINGS['image_size']
+    padding = BULK_IMPORT_SETTINGS['face_padding']
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, CAPTURE_SETTINGS['jpeg_quality']]
+
+    accepted, rejected, errors = [], {}, []
+
+    def reject(reason: str):
+        rejected[reason] = rejected.get(reason, 0) + 1
+
+    for photo_path in photo_paths:
+        try:
+            data = Path(photo_path).read_bytes()
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                reject('unreadable')
+                continue
+
+            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            locations = face_recognition.face_locations(rgb_image, model=FACE_RECOGNITION_SETTINGS['model'])
+            if not locations:
+                reject('no_face')
+                continue
+
+            # The largest face is the subject of a portrait
+            top, right, bottom, left = max(locations, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+            size_ok, _ = FaceQualityValidator.check_face_size((top, right, bottom, left))
+            if not size_ok:
+                reject('small_face')
+                continue
+
+            top, left = max(0, top - padding), max(0, left - padding)
+            bottom, right = min(image.shape[0], bottom + padding), min(image.shape[1], right + padding)
+            crop = cv2.resize(image[top:bottom, left:right], (width, height))
+
+            status, encoding, quality_report = compute_training_encoding(crop)
+            if status != ENCODING_OK:
+                reject(status)
+                continue
+
+            ok, buffer = cv2.imencode('.jpg', crop, encode_params)
+            if not ok:
+                reject('unreadable')
+                continue
+            crop_bytes = buffer.tobytes()
+            crop_path = folder / f"{student_id}_import_{image_source_hash(data)[:16]}.jpg"
+            crop_path.write_bytes(crop_bytes)
+            save_precomputed_encoding(crop_path, status, encoding, quality_report)
+
+            accepted.append((
+                np.asarray(encoding, dtype=np.float32),
+                float(quality_report['blur']['score']),
+                image_source_hash(crop_bytes)
+            ))
+        except Exception as e:
+            errors.append(f"{Path(photo_path).name}: {str(e)}")
+
+    return {'student_id': student_id, 'accepted': accepted, 'rejected': rejected, 'errors': errors}
+
+
+class BulkImporter:
+    """
+    Resumable enrollment of a roster plus photo tree
+    State is kept per roster (by content hash) in BULK_IMPORT_SETTINGS['state_dir'],
+    so running the same roster again continues with the students not yet done
+    """
+
+    def __init__(self, roster: Union[str, Path, bytes], photos_root: Union[str, Path] = None,
+                 state_path: Union[str, Path] = None, max_workers: int = None,
+                 dataset_dir: Union[str, Path] = None):
+        self.roster_bytes = roster if isinstance(roster, bytes) else Path(roster).read_bytes()
+        self.roster_hash = hashlib.sha256(self.roster_bytes).hexdigest()
+        self.photos_root = Path(photos_root) if photos_root else None
+        self.dataset_dir = Path(dataset_dir or DATASET_DIR)
+        self.max_workers = max_workers or BULK_IMPORT_SETTINGS['max_workers'] or os.cpu_count() or 1
+        self.state_path = Path(state_path) if state_path else (
+            Path(BULK_IMPORT_SETTINGS['state_dir']) / f"import_{self.roster_hash[:12]}.json"
+        )
+        self.min_encodings = FACE_RECOGNITION_SETTINGS.get('min_encodings_per_student', 5)
+        self.state = None
+
+    # Roster
+
+    def parse_roster(self) -> Tuple[List[dict], List[dict]]:
+        """
+        Read and validate the CSV roster
+        Returns: (valid student dicts, invalid rows as {'line', 'student_id', 'message'})
+        """
+        text = self.roster_bytes.decode('utf-8-sig')
+        reader = csv.DictReader(io.StringIO(text))
+        if reader.fieldnames is None:
+            return [], [{'line': 1, 'student_id': '', 'message': "Roster is empty"}]
+
+        headers = {name: name.strip().lower().replace(' ', '_') for name in reader.fieldnames if name}
+        missing = {'student_id', 'name'} - set(headers.values())
+        if missing:
+            return [], [{'line': 1, 'student_id': '', 'message': f"Missing columns: {', '.join(sorted(missing))}"}]
+
+        valid, invalid, seen = [], [], set()
+        for line, raw in enumerate(reader, start=2):
+            row = {
+                column: (raw.get(header) or '').strip() or None
+                for header, column in headers.items() if column in ROSTER_COLUMNS
+            }
+            student = {column: row.get(column) for column in ROSTER_COLUMNS}
+            student_id = student['student_id'] or ''
+
+            if not student_id or not student['name']:
+                message = "student_id and name are required"
+            elif student_id in seen:
+                message = "Duplicate student_id in roster"
+            elif student['email'] and not validate_email(student['email']):
+                message = f"Invalid email: {student['email']}"
+            elif student['phone'] and not validate_phone(student['phone']):
+                message = f"Invalid phone: {student['phone']}"
+            else:
+                seen.add(student_id)
+                student['line'] = line
+                valid.append(student)
+                continue
+            invalid.append({'line': line, 'student_id': student_id, 'message': message})
+
+        return valid, invalid
+
+    # State
+
+    def _load_state(self, restart: bool) -> dict:
+        if not restart and self.state_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text())
+                if state.get('roster_hash') == self.roster_hash:
+                    logger.info(f"Resuming import from {self.state_path}")
+                    return state
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable import state {self.state_path}: {str(e)}")
+        return {
+            'roster_hash': self.roster_hash,
+            'photos_root': str(self.photos_root) if self.photos_root else None,
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'finished_at': None,
+            'roster': None,
+            'students': {}
+        }
+
+    def _save_state(self):
+        """Write the state atomically so an interrupt never leaves a torn file"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.state_path.with_suffix('.partial')
+        partial.write_text(json.dumps(self.state, indent=1))
+        os.replace(partial, self.state_path)
+
+    # Import
+
+    def _photo_paths(self, student_id: str) -> List[str]:
+        if self.photos_root is None:
+            return []
+        folder = self.photos_root / student_id
+        if not folder.is_dir():
+            return []
+        extensions = BULK_IMPORT_SETTINGS['photo_extensions']
+        return sorted(str(p) for p in folder.iterdir() if p.suffix.lower() in extensions)
+
+    def _import_roster(self) -> dict:
+        valid, invalid = self.parse_roster()
+        inserted, existing = StudentOperations.create_students_bulk(
+            [{k: v for k, v in student.items() if k != 'line'} for student in valid]
+        )
+        inserted = set(inserted)
+        logger.info(f"Roster: {len(inserted)} inserted, {len(existing)} already registered, "
+                    f"{len(invalid)} invalid")
+        return {
+            'students': [
+                {'line': s['line'], 'student_id': s['student_id'], 'name': s['name'],
+                 'roster': 'inserted' if s['student_id'] in inserted else 'existing'}
+                for s in valid
+            ],
+            'invalid': invalid
+        }
+
+    def _record(self, entry: dict, photos: int, result: Optional[dict]):
+        """Store one student's photo results and checkpoint"""
+        student_id = entry['student_id']
+        summary = {**entry, 'photos': photos, 'accepted': 0, 'rejected': {}, 'encodings': 0,
+                   'status': STATUS_NO_PHOTOS, 'message': ''}
+
+        if result is not None:
+            summary['accepted'] = len(result['accepted'])
+            summary['rejected'] = result['rejected']
+            success, msg = FaceEncodingOperations.add_encodings(student_id, result['accepted'])
+            folder = self.dataset_dir / student_id
+            if folder.is_dir():
+                image_count = sum(1 for p in folder.iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+                StudentOperations.update_student(student_id, image_count=image_count)
+            summary['encodings'] = FaceEncodingOperations.get_encoding_count(student_id)
+
+            if not success or (result['errors'] and not result['accepted'] and not result['rejected']):
+                summary['status'], summary['message'] = STATUS_FAILED, msg if not success else result['errors'][0]
+            else:
+                summary['status'] = STATUS_READY if summary['encodings'] >= self.min_encodings else STATUS_INSUFFICIENT
+                summary['message'] = '; '.join(result['errors'][:3])
+
+        self.state['students'][student_id] = summary
+        self._save_state()
+
+    def run(self, progress_callback: Callable[[int, int], None] = None,
+            restart: bool = False, refresh_model: bool = True) -> List[dict]:
+        """
+        Import the roster and photos, skipping work a previous run already finished
+        progress_callback: optional callable(students_done, students_total)
+        restart: ignore any saved state and start over
+        refresh_model: rewrite the recognizer's model snapshot once encodings were added
+        Returns the per-student report (see report())
+        """
+        self.state = self._load_state(restart)
+        if self.state['roster'] is None:
+            self.state['roster'] = self._import_roster()
+            self._save_state()
+
+        entries = self.state['roster']['students']
+        done = self.state['students']
+        # Students without photos, or whose import failed, are retried on every run
+        retry = (STATUS_NO_PHOTOS, STATUS_FAILED)
+        pending = [
+            entry for entry in entries
+            if entry['student_id'] not in done or done[entry['student_id']]['status'] in retry
+        ]
+        total, finished = len(entries), len(entries) - len(pending)
+        if progress_callback:
+            progress_callback(finished, total)
+
+        work = []
+        for entry in pending:
+            photos = self._photo_paths(entry['student_id'])
+            if photos:
+                work.append((entry, photos))
+            else:
+                self._record(entry, 0, None)
+                finished += 1
+        if progress_callback:
+            progress_callback(finished, total)
+
+        added = 0
+        if work:
+            # Spawned, not forked: the importer holds pooled database connections
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(work)),
+                                     mp_context=mp.get_context('spawn')) as pool:
+                futures = {
+                    pool.submit(_process_student_photos, entry['student_id'], photos,
+                                str(self.dataset_dir)): (entry, photos)
+                    for entry, photos in work
+                }
+                for future in as_completed(futures):
+                    entry, photos = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Photo import failed for {entry['student_id']}: {str(e)}")
+                        result = {'accepted': [], 'rejected': {}, 'errors': [str(e)]}
+                    self._record(entry, len(photos), result)
+                    added += len(result['accepted'])
+                    finished += 1
+                    if progress_callback:
+                        progress_callback(finished, total)
+
+        self.state['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self._save_state()
+
+        if added and refresh_model:
+            from utils.face_recognizer import FaceRecognizer
+            FaceRecognizer().save_model()
+
+        ready = sum(1 for s in done.values() if s['status'] == STATUS_READY)
+        SystemLogOperations.log_activity(
+            'INFO', 'bulk_import',
+            f"Bulk import: {len(entries)} students, {ready} ready for recognition, "
+            f"{len(self.state['roster']['invalid'])} invalid roster rows",
+            user_action='bulk_import'
+        )
+        return self.report()
+
+    # Report
+
+    def report(self) -> List[dict]:
+        """One row per roster line: roster outcome, photo counts and recognition readiness"""
+        if not self.state or self.state['roster'] is None:
+            return []
+        rows = []
+        for entry in self.state['roster']['students']:
+            summary = self.state['students'].get(entry['student_id'])
+            if summary is None:
+                rows.append({**entry, 'photos': '', 'accepted': '', 'rejected': '', 'encodings': '',
+                             'status': 'pending', 'message': ''})
+                continue
+            rejected = ', '.join(f"{reason}: {count}" for reason, count in sorted(summary['rejected'].items()))
+            rows.append({**summary, 'rejected': rejected})
+        for invalid in self.state['roster']['invalid']:
+            rows.append({'line': invalid['line'], 'student_id': invalid['student_id'], 'name': '',
+                         'roster': 'rejected', 'photos': '', 'accepted': '', 'rejected': '',
+                         'encodings': '', 'status': STATUS_INVALID, 'message': invalid['message']})
+        rows.sort(key=lambda row: row['line'])
+        return [{field: row.get(field, '') for field in REPORT_FIELDS} for row in rows]
+
+    def write_report(self, sink) -> None:
+        """Write report() as CSV to a path or text file-like object"""
+        if isinstance(sink, (str, Path)):
+            with open(sink, 'w', newline='', encoding='utf-8') as f:
+                return self.write_report(f)
+        writer = csv.DictWriter(sink, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(self.report())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.bulk_import",
+                                     description="Enroll students from a CSV roster and photo tree")
+    parser.add_argument("roster", help="CSV with student_id,name[,email,phone,department,batch,semester,section,address]")
+    parser.add_argument("--photos", default=None, help="Directory containing <student_id>/ photo folders")
+    parser.add_argument("--workers", type=int, default=None, help="Photo-processing processes")
+    parser.add_argument("--state", default=None, help="Resume state file (default: per roster in logs/bulk_import)")
+    parser.add_argument("--report", default=None, help="Write the per-student report to this CSV")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress and start over")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    importer = BulkImporter(args.roster, args.photos, state_path=args.state, max_workers=args.workers)
+
+    def progress(done: int, total: int):
+        print(f"\r{done}/{total} students", end='', flush=True)
+
+    rows = importer.run(progress_callback=progress, restart=args.restart)
+    print()
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+    print(', '.join(f"{status}: {count}" for status, count in sorted(counts.items())))
+
+    report_path = args.report or importer.state_path.with_suffix('.csv')
+    importer.write_report(report_path)
+    print(f"Report written to {report_path}")
+    return 0 if counts.get(STATUS_FAILED, 0) == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
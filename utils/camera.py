@@ -6,37 +6,295 @@ Handles camera operations and frame capture
 import cv2
 import numpy as np
 import logging
-from typing import Optional, Tuple, Generator
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Generator, Union
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
-from config.settings import CAMERA_SETTINGS
+from config.settings import (
+    CAMERA_SETTINGS, VIDEO_ATTENDANCE_SETTINGS, REPLAY_SETTINGS, DISPLAY_SETTINGS,
+    DATASET_DIR
+)
 
 logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Source name selecting the synthetic replay camera ("replay" or "replay:<video path>")
+REPLAY_SOURCE = "replay"
+
+
+class ImageSequenceCapture:
+    """
+    Minimal cv2.VideoCapture look-alike over a directory of images
+    Frames are the directory's images in sorted filename order
+    """
+
+    def __init__(self, directory: Union[str, Path], fps: float = None):
+        self.directory = Path(directory)
+        self.fps = fps or VIDEO_ATTENDANCE_SETTINGS['image_sequence_fps']
+        self.files = sorted(
+            p for p in self.directory.iterdir()
+            if p.suffix.lower() in IMAGE_EXTENSIONS
+        ) if self.directory.is_dir() else []
+        self.position = 0
+        self._shape = None
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+    def grab(self) -> bool:
+        """Advance to the next frame without decoding it"""
+        if self.position >= len(self.files):
+            return False
+        self.position += 1
+        return True
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Decode the frame most recently grabbed"""
+        if self.position == 0:
+            return False, None
+        frame = cv2.imread(str(self.files[self.position - 1]))
+        if frame is not None:
+            self._shape = frame.shape
+        return frame is not None, frame
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            if self._shape is None and self.files:
+                first = cv2.imread(str(self.files[0]))
+                self._shape = first.shape if first is not None else None
+            if self._shape is None:
+                return 0.0
+            return float(self._shape[1] if prop == cv2.CAP_PROP_FRAME_WIDTH else self._shape[0])
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = max(0, min(int(value), len(self.files)))
+            return True
+        return False
+
+    def release(self):
+        self.files = []
+        self.position = 0
+
+    def getBackendName(self) -> str:
+        return "IMAGE_SEQUENCE"
+
+
+class ReplayCapture:
+    """
+    Synthetic camera for headless load testing
+    Loops over face crops from DATASET_DIR (compositing several into each frame)
+    or over a video file, paced at a configurable frame rate
+    """
+
+    def __init__(self, video_path: Union[str, Path] = None, fps: float = None,
+                 faces_per_frame: int = None, width: int = None, height: int = None):
+        self.fps = REPLAY_SETTINGS['fps'] if fps is None else fps
+        self.faces_per_frame = max(1, faces_per_frame or REPLAY_SETTINGS['faces_per_frame'])
+        self.width = width or CAMERA_SETTINGS['frame_width']
+        self.height = height or CAMERA_SETTINGS['frame_height']
+        self.video = None
+        self.crops = []
+        self.crop_index = 0
+        self.frames_served = 0
+        self._next_frame_time = None
+        self._cache = OrderedDict()  # Decoded tiles, least recently used first
+
+        video_path = video_path or REPLAY_SETTINGS['video_path']
+        if video_path:
+            self.video = cv2.VideoCapture(str(video_path))
+        else:
+            self.crops = sorted(
+                p for p in DATASET_DIR.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS
+            )
+
+        # Tile grid used when compositing crops
+        self.cols = int(np.ceil(np.sqrt(self.faces_per_frame)))
+        self.rows = int(np.ceil(self.faces_per_frame / self.cols))
+
+    def isOpened(self) -> bool:
+        if self.video is not None:
+            return self.video.isOpened()
+        return bool(self.crops)
+
+    def _load_crop(self, path: Path) -> Optional[np.ndarray]:
+        """Decode a crop once, keeping a bounded LRU cache of decoded tiles"""
+        tile = self._cache.get(path)
+        if tile is not None:
+            self._cache.move_to_end(path)
+        else:
+            image = cv2.imread(str(path))
+            if image is None:
+                return None
+            tile_w = self.width // self.cols
+            tile_h = self.height // self.rows
+            size = int(min(tile_w, tile_h) * 0.8)
+            tile = cv2.resize(image, (size, size))
+            if len(self._cache) >= REPLAY_SETTINGS['max_cached_crops']:
+                self._cache.popitem(last=False)
+            self._cache[path] = tile
+        return tile
+
+    def _compose_frame(self) -> np.ndarray:
+        """Place the next faces_per_frame crops on a plain background"""
+        frame = np.full((self.height, self.width, 3), 90, dtype=np.uint8)
+        tile_w = self.width // self.cols
+        tile_h = self.height // self.rows
+
+        for slot in range(self.faces_per_frame):
+            tile = self._load_crop(self.crops[self.crop_index % len(self.crops)])
+            self.crop_index += 1
+            if tile is None:
+                continue
+            row, col = divmod(slot, self.cols)
+            size = tile.shape[0]
+            x = col * tile_w + (tile_w - size) // 2
+            y = row * tile_h + (tile_h - size) // 2
+            frame[y:y + size, x:x + size] = tile
+
+        return frame
+
+    def _pace(self):
+        """Sleep until the next frame is due (fps <= 0 runs unthrottled)"""
+        if self.fps <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_frame_time is None or now - self._next_frame_time > 1.0:
+            # First frame, or the consumer fell far behind: restart the schedule
+            self._next_frame_time = now
+        delay = self._next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame_time += 1.0 / self.fps
+
+    def grab(self) -> bool:
+        return self.isOpened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.isOpened():
+            return False, None
+
+        self._pace()
+
+        if self.video is not None:
+            ret, frame = self.video.read()
+            if not ret:
+                # Loop the recording
+                self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.video.read()
+            if not ret:
+                return False, None
+        else:
+            frame = self._compose_frame()
+
+        self.frames_served += 1
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.video.get(prop) if self.video is not None else self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.video.get(prop) if self.video is not None else self.height)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_served)
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop == cv2.CAP_PROP_FPS:
+            self.fps = value
+            return True
+        return False
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+        self.crops = []
+        self._cache.clear()
+
+    def getBackendName(self) -> str:
+        return "REPLAY"
+
+
+def is_replay_source(source: Union[int, str, Path]) -> bool:
+    """Check whether a source selects the synthetic replay camera"""
+    return isinstance(source, str) and (
+        source == REPLAY_SOURCE or source.startswith(REPLAY_SOURCE + ":")
+    )
+
+
+def open_capture(source: Union[int, str, Path]):
+    """
+    Open a capture for a camera index, a video file, an image-sequence directory
+    or the replay source
+    Returns an object with the cv2.VideoCapture read/grab/get/set/release interface
+    """
+    if is_replay_source(source):
+        _, _, video_path = source.partition(":")
+        return ReplayCapture(video_path or None)
+    if isinstance(source, (str, Path)) and Path(source).is_dir():
+        return ImageSequenceCapture(source)
+    if isinstance(source, Path):
+        source = str(source)
+    return cv2.VideoCapture(source)
+
+
+def is_file_source(source: Union[int, str, Path]) -> bool:
+    """Check whether a source is a recording rather than a live device"""
+    return (isinstance(source, (str, Path)) and not is_replay_source(source)
+            and Path(source).exists())
+
 
 class CameraManager:
     """Manages camera operations"""
 
-    def __init__(self, camera_id: int = None):
+    def __init__(self, camera_id: Union[int, str, Path] = None):
         self.camera_id = camera_id if camera_id is not None else CAMERA_SETTINGS['default_camera']
         self.cap = None
         self.is_running = False
 
+    @property
+    def is_file_source(self) -> bool:
+        """True when reading a video file or image directory instead of a device"""
+        return is_file_source(self.camera_id)
+
+    @property
+    def is_live_device(self) -> bool:
+        """True for physical cameras (not recordings or the replay source)"""
+        return not self.is_file_source and not is_replay_source(self.camera_id)
+
     def start(self) -> bool:
         """Start the camera"""
         try:
-            self.cap = cv2.VideoCapture(self.camera_id)
+            self.cap = open_capture(self.camera_id)
 
             if not self.cap.isOpened():
                 logger.error(f"Failed to open camera {self.camera_id}")
                 return False
 
-            # Set camera properties
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_SETTINGS['frame_width'])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_SETTINGS['frame_height'])
-            self.cap.set(cv2.CAP_PROP_FPS, CAMERA_SETTINGS['fps'])
+            # Set camera properties (recordings and replay keep their own format)
+            if self.is_live_device:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_SETTINGS['frame_width'])
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_SETTINGS['frame_height'])
+                self.cap.set(cv2.CAP_PROP_FPS, CAMERA_SETTINGS['fps'])
 
             self.is_running = True
             logger.info(f"Camera {self.camera_id} started")
@@ -60,13 +318,41 @@ class CameraManager:
 
         ret, frame = self.cap.read()
         if not ret:
-            logger.warning("Failed to read frame")
+            if self.is_live_device:
+                logger.warning("Failed to read frame")
             return False, None
 
-        # Flip horizontally for mirror effect
-        frame = cv2.flip(frame, 1)
+        # Flip horizontally for mirror effect (live cameras only)
+        if self.is_live_device:
+            frame = cv2.flip(frame, 1)
         return True, frame
 
+    def skip_frames(self, count: int) -> int:
+        """Advance past frames without decoding them, returns frames skipped"""
+        skipped = 0
+        while self.cap is not None and skipped < count and self.cap.grab():
+            skipped += 1
+        return skipped
+
+    def seek(self, frame_index: int) -> bool:
+        """Jump to a frame index (recordings only)"""
+        if self.cap is None or not self.is_file_source:
+            return False
+        return bool(self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index))
+
+    def get_frame_count(self) -> int:
+        """Number of frames in a recording, 0 for live cameras"""
+        if self.cap is None or not self.is_file_source:
+            return 0
+        return max(int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+
+    def get_source_fps(self) -> float:
+        """Native frame rate of the source, falling back to the configured fps"""
+        if self.cap is None:
+            return float(CAMERA_SETTINGS['fps'])
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        return float(fps) if fps and fps > 0 else float(CAMERA_SETTINGS['fps'])
+
     def get_frame_generator(self) -> Generator[np.ndarray, None, None]:
         """Generator that yields frames continuously"""
         while self.is_running:
@@ -74,22 +360,22 @@ class CameraManager:
             if ret:
                 yield frame
 
-    def change_camera(self, camera_id: int) -> bool:
+    def change_camera(self, camera_id: Union[int, str, Path]) -> bool:
         """Switch to a different camera"""
         self.stop()
         self.camera_id = camera_id
         return self.start()
 
     @staticmethod
-    def list_available_cameras(max_cameras: int = 10) -> list:
-        """List all available camera indices"""
-        available = []
-        for i in range(max_cameras):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                available.append(i)
-                cap.release()
-        return available
+    def list_available_cameras(refresh: bool = False) -> list:
+        """
+        List available camera indices from the shared registry
+        Only blocks when no probe has completed yet (or refresh=True)
+        """
+        registry = get_camera_registry()
+        if refresh or registry.last_probed is None:
+            registry.refresh(wait=True)
+        return registry.get_cameras()
 
     def get_camera_info(self) -> dict:
         """Get current camera properties"""
@@ -104,12 +390,153 @@ class CameraManager:
         }
 
 
-def frame_to_bytes(frame: np.ndarray, format: str = '.jpg') -> bytes:
+def probe_cameras(max_cameras: int = None) -> list:
+    """Open and release each device index, returning the ones that work (slow)"""
+    if max_cameras is None:
+        max_cameras = CAMERA_SETTINGS['probe_max_devices']
+    available = []
+    for i in range(max_cameras):
+        cap = cv2.VideoCapture(i)
+        if cap.isOpened():
+            available.append(i)
+        cap.release()
+    return available
+
+
+class CameraRegistry:
+    """
+    Cached list of camera devices
+    Probing runs in a background thread so page renders never wait on device probes;
+    results are reused until they are older than the TTL or a refresh is requested
+    """
+
+    def __init__(self, max_devices: int = None, ttl_seconds: float = None):
+        self.max_devices = max_devices or CAMERA_SETTINGS['probe_max_devices']
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else CAMERA_SETTINGS['probe_ttl_seconds']
+        self._devices = None
+        self._probed_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def last_probed(self) -> Optional[float]:
+        """time.time() of the last completed probe, None if never probed"""
+        return self._probed_at
+
+    @property
+    def is_probing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _probe(self):
+        devices = probe_cameras(self.max_devices)
+        with self._lock:
+            self._devices = devices
+            self._probed_at = time.time()
+        logger.info(f"Camera probe found devices: {devices}")
+
+    def refresh(self, wait: bool = False):
+        """Start a background probe (no-op if one is running), optionally wait for it"""
+        with self._lock:
+            if not self.is_probing:
+                self._thread = threading.Thread(target=self._probe, name="camera-probe", daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join()
+
+    def get_cameras(self) -> list:
+        """
+        Return the cached device list without blocking
+        Falls back to the default camera until the first probe completes
+        """
+        stale = (self._probed_at is None or
+                 time.time() - self._probed_at > self.ttl_seconds)
+        if stale:
+            self.refresh()
+
+        with self._lock:
+            devices = list(self._devices) if self._devices else []
+        return devices or [CAMERA_SETTINGS['default_camera']]
+
+
+_camera_registry = None
+_camera_registry_lock = threading.Lock()
+
+
+def get_camera_registry() -> CameraRegistry:
+    """Process-wide camera registry shared by all pages and sessions"""
+    global _camera_registry
+    with _camera_registry_lock:
+        if _camera_registry is None:
+            _camera_registry = CameraRegistry()
+        return _camera_registry
+
+
+def frame_to_bytes(frame: np.ndarray, format: str = '.jpg', quality: int = None) -> bytes:
     """Convert frame to bytes for streaming"""
-    _, buffer = cv2.imencode(format, frame)
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if quality and format == '.jpg' else []
+    _, buffer = cv2.imencode(format, frame, params)
     return buffer.tobytes()
 
 
+def scale_rect(rect: Tuple[int, int, int, int], scale: float) -> Tuple[int, int, int, int]:
+    """Scale an (x, y, w, h) rectangle from frame to preview coordinates"""
+    return tuple(int(v * scale) for v in rect)
+
+
+class PreviewRenderer:
+    """
+    Rate-limited preview for Streamlit placeholders
+    Frames are downscaled into a reused buffer, overlays are drawn on that buffer
+    and the result is sent as JPEG bytes, so the display costs far less than
+    pushing full-size RGB arrays on every processed frame
+    """
+
+    def __init__(self, placeholder, max_fps: float = None, scale: float = None,
+                 jpeg_quality: int = None):
+        self.placeholder = placeholder
+        self.max_fps = DISPLAY_SETTINGS['max_fps'] if max_fps is None else max_fps
+        self.scale = scale or DISPLAY_SETTINGS['scale']
+        self.jpeg_quality = jpeg_quality or DISPLAY_SETTINGS['jpeg_quality']
+        self._buffer = None
+        self._last_render = 0.0
+        self.frames_rendered = 0
+
+    def due(self) -> bool:
+        """Whether enough time has passed since the last rendered frame"""
+        if self.max_fps <= 0:
+            return True
+        return time.perf_counter() - self._last_render >= 1.0 / self.max_fps
+
+    def render(self, frame: np.ndarray, draw=None, force: bool = False) -> bool:
+        """
+        Show a frame if the display rate allows it
+        draw: optional callable(canvas, scale) drawing overlays onto the preview buffer
+        Returns True when a frame was sent
+        """
+        if not force and not self.due():
+            return False
+
+        height, width = frame.shape[:2]
+        size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+        if self._buffer is None or self._buffer.shape != (size[1], size[0]) + frame.shape[2:]:
+            self._buffer = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+
+        if size == (width, height):
+            np.copyto(self._buffer, frame)
+        else:
+            cv2.resize(frame, size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+
+        if draw is not None:
+            draw(self._buffer, self.scale)
+
+        self.placeholder.image(frame_to_bytes(self._buffer, '.jpg', self.jpeg_quality),
+                               use_container_width=True)
+        self._last_render = time.perf_counter()
+        self.frames_rendered += 1
+        return True
+
+
 def add_overlay_text(frame: np.ndarray, text: str,
                      position: Tuple[int, int] = (10, 30),
                      font_scale: float = 0.7,
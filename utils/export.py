@@ -1,80 +1,420 @@
 """
 Export Module
-Export attendance data to Excel and PDF
+Export attendance data to Excel, CSV and PDF
 """
 
 import pandas as pd
+import csv
+import io
+import re
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
+from itertools import islice
+import multiprocessing as mp
 from pathlib import Path
+from typing import Iterable
 import logging
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
-from config.settings import EXPORTS_DIR
+from config.settings import EXPORTS_DIR, PDF_EXPORT_SETTINGS
 
 logger = logging.getLogger(__name__)
 
+# Column headers of attendance exports, in order
+ATTENDANCE_COLUMNS = ('Student ID', 'Name', 'Department', 'Date', 'Time In', 'Time Out',
+                      'Status', 'Confidence')
+
+# Rows handed to the writer per call by the streaming exporters
+STREAM_CHUNK_ROWS = 1000
+
+# Excel sheet limits: rows per sheet (including the header) and name length
+EXCEL_MAX_ROWS = 1048576
+EXCEL_SHEET_NAME_LENGTH = 31
+
+# Column widths of the streamed Excel export, matching ATTENDANCE_COLUMNS
+EXCEL_COLUMN_WIDTHS = (14, 24, 18, 12, 10, 10, 10, 12)
+
+# Column widths of the PDF report in points, matching ATTENDANCE_COLUMNS (fits A4 portrait)
+PDF_COLUMN_WIDTHS = (60, 88, 70, 52, 42, 42, 45, 52)
+
+# Section heading of students without a department
+NO_DEPARTMENT = 'No Department'
+
+
+def attendance_row_values(record) -> tuple:
+    """Export values of one AttendanceRow, matching ATTENDANCE_COLUMNS"""
+    return (
+        record.student_id,
+        record.name or 'N/A',
+        record.department or 'N/A',
+        str(record.date),
+        str(record.time_in) if record.time_in else 'N/A',
+        str(record.time_out) if record.time_out else 'N/A',
+        record.status,
+        f"{record.confidence_score:.2%}" if record.confidence_score else 'N/A'
+    )
+
+
+def _text_sink(sink):
+    """
+    Text view of a sink for csv: text streams are used as they are, binary
+    streams (BytesIO, files opened 'wb') are wrapped as UTF-8
+    Returns: (text stream, wrapper to detach when done or None)
+    """
+    if isinstance(sink, io.TextIOBase):
+        return sink, None
+    wrapper = io.TextIOWrapper(sink, encoding='utf-8', newline='', write_through=True)
+    return wrapper, wrapper
+
+
+def write_attendance_csv(records: Iterable, sink) -> int:
+    """Write a header and one CSV line per record, STREAM_CHUNK_ROWS at a time; returns the row count"""
+    stream, wrapper = _text_sink(sink)
+    try:
+        writer = csv.writer(stream)
+        writer.writerow(ATTENDANCE_COLUMNS)
+        rows = map(attendance_row_values, records)
+        written = 0
+        while True:
+            chunk = list(islice(rows, STREAM_CHUNK_ROWS))
+            if not chunk:
+                return written
+            writer.writerows(chunk)
+            written += len(chunk)
+    finally:
+        # Leave the caller's binary stream open
+        if wrapper is not None:
+            wrapper.flush()
+            wrapper.detach()
+
+
+def _sheet_name(name: str, used: set) -> str:
+    """Valid, unique (case-insensitive) worksheet name for name"""
+    base = re.sub(r'[\[\]:*?/\\]', '-', name).strip("' ") or 'Sheet'
+    base = base[:EXCEL_SHEET_NAME_LENGTH]
+    candidate, n = base, 2
+    while candidate.lower() in used:
+        suffix = f" ({n})"
+        candidate = base[:EXCEL_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_attendance_excel(records: Iterable, sink, split_by_department: bool = False,
+                           sheet_name: str = "Attendance") -> int:
+    """
+    Write records to an .xlsx workbook row by row with xlsxwriter's constant_memory
+    mode, so only the current row of each sheet is held in memory
+    Dates and times are written as Excel dates and confidence as a percentage.
+    split_by_department puts each department on its own sheet; a sheet that reaches
+    Excel's row limit continues on a new one. Returns the number of data rows
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(sink, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#1a1a2e'})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    time_format = workbook.add_format({'num_format': 'hh:mm:ss'})
+    percent_format = workbook.add_format({'num_format': '0.00%'})
+
+    used_names = set()
+    # Open sheet and its next row, by sheet key (department or None)
+    sheets = {}
+
+    def add_sheet(title: str):
+        worksheet = workbook.add_worksheet(_sheet_name(title, used_names))
+        for col, width in enumerate(EXCEL_COLUMN_WIDTHS):
+            worksheet.set_column(col, col, width)
+        worksheet.write_row(0, 0, ATTENDANCE_COLUMNS, header_format)
+        worksheet.freeze_panes(1, 0)
+        return [worksheet, 1]
+
+    written = 0
+    try:
+        for record in records:
+            key = (record.department or 'No Department') if split_by_department else None
+            sheet = sheets.get(key)
+            if sheet is None or sheet[1] >= EXCEL_MAX_ROWS:
+                sheet = sheets[key] = add_sheet(key or sheet_name)
+            worksheet, row = sheet
+
+            worksheet.write_string(row, 0, record.student_id)
+            worksheet.write_string(row, 1, record.name or 'N/A')
+            worksheet.write_string(row, 2, record.department or 'N/A')
+            worksheet.write_datetime(row, 3, record.date, date_format)
+            if record.time_in:
+                worksheet.write_datetime(row, 4, record.time_in, time_format)
+            if record.time_out:
+                worksheet.write_datetime(row, 5, record.time_out, time_format)
+            worksheet.write_string(row, 6, record.status or '')
+            if record.confidence_score is not None:
+                worksheet.write_number(row, 7, record.confidence_score, percent_format)
+
+            sheet[1] = row + 1
+            written += 1
+
+        if not sheets:
+            add_sheet(sheet_name)
+    finally:
+        workbook.close()
+    return written
+
+
+def _pdf_styles() -> dict:
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=18,
+                                spaceAfter=30, alignment=1),
+        'heading': styles['Heading2'],
+        'normal': styles['Normal'],
+        'table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a1a2e')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dee2e6')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+        ]),
+    }
 
-class ExportManager:
-    """Handles data export to various formats"""
 
-    def __init__(self):
-        EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+def render_attendance_pdf(sections: Iterable, sink, title: str = None) -> int:
+    """
+    Render one PDF document of (heading, records) sections, each starting on a new page
+    Rows are laid out in fixed-width tables of PDF_EXPORT_SETTINGS['rows_per_table'] rows,
+    so layout time grows linearly with the report instead of with one huge table.
+    The whole document is built at once; see write_attendance_pdf for bounded memory
+    Returns the number of rows
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
+
+    styles = _pdf_styles()
+    rows_per_table = PDF_EXPORT_SETTINGS['rows_per_table']
+    story = []
+    if title:
+        story.append(Paragraph(title, styles['title']))
+        story.append(Paragraph(
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['normal']
+        ))
+        story.append(Spacer(1, 20))
+
+    written = 0
+    for index, (heading, records) in enumerate(sections):
+        if heading:
+            if index:
+                story.append(PageBreak())
+            story.append(Paragraph(heading, styles['heading']))
+        rows = map(attendance_row_values, records)
+        while True:
+            chunk = list(islice(rows, rows_per_table))
+            if not chunk:
+                break
+            table = Table([ATTENDANCE_COLUMNS] + chunk, colWidths=PDF_COLUMN_WIDTHS, repeatRows=1)
+            table.setStyle(styles['table'])
+            story.append(table)
+            written += len(chunk)
+
+    if not story:
+        story.append(Spacer(1, 1))
+    SimpleDocTemplate(sink, pagesize=A4).build(story)
+    return written
+
+
+def write_attendance_pdf(records: Iterable, sink, title: str = None, heading: str = None) -> int:
+    """
+    Write records as a PDF report, rendering PDF_EXPORT_SETTINGS['rows_per_part'] rows
+    at a time and concatenating the parts with pypdf, so memory stays bounded
+    Without pypdf the report is rendered as one document
+    Returns the number of rows
+    """
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        return render_attendance_pdf([(heading, records)], sink, title)
+
+    rows_per_part = PDF_EXPORT_SETTINGS['rows_per_part']
+    records = iter(records)
+    writer = PdfWriter()
+    written = 0
+    while True:
+        chunk = list(islice(records, rows_per_part))
+        if not chunk and written:
+            break
+        part = io.BytesIO()
+        first = not written
+        written += render_attendance_pdf(
+            [(heading if first else None, chunk)], part, title if first else None
+        )
+        writer.append(part)
+        if not chunk:
+            break
+    writer.write(sink)
+    return written
+
+
+def _render_department_pdf(start_date: date, end_date: date, student_id: str,
+                           department: str, title: str) -> bytes:
+    """Worker: one department's section of the report, streamed from the database"""
+    from database.operations import AttendanceOperations
+
+    records = AttendanceOperations.iter_attendance_report(
+        start_date, end_date, student_id=student_id, department=department
+    )
+    part = io.BytesIO()
+    write_attendance_pdf(records, part, title, heading=department or NO_DEPARTMENT)
+    return part.getvalue()
+
+
+def write_department_pdf(start_date: date, end_date: date, sink, student_id: str = None,
+                         title: str = None, max_workers: int = None) -> int:
+    """
+    Write the attendance report with one section per department
+    With pypdf the sections are rendered in parallel worker processes and concatenated
+    in department order; without it they are rendered one after another
+    Returns the number of rows
+    """
+    from database.operations import AttendanceOperations
+
+    departments = AttendanceOperations.get_report_departments(start_date, end_date, student_id)
+    total = sum(count for _, count in departments)
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        sections = (
+            (department or NO_DEPARTMENT, AttendanceOperations.iter_attendance_report(
+                start_date, end_date, student_id=student_id, department=department
+            ))
+            for department, _ in departments
+        )
+        return render_attendance_pdf(sections, sink, title)
+
+    if not departments:
+        return render_attendance_pdf([], sink, title)
+
+    max_workers = max_workers or PDF_EXPORT_SETTINGS['max_workers'] or os.cpu_count() or 1
+    writer = PdfWriter()
+    # Spawned workers open their own database connections instead of inheriting ours
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(departments)),
+                             mp_context=mp.get_context('spawn')) as pool:
+        futures = [
+            pool.submit(_render_department_pdf, start_date, end_date, student_id,
+                        department, title if index == 0 else None)
+            for index, (department, _) in enumerate(departments)
+        ]
+        for future in futures:
+            writer.append(io.BytesIO(future.result()))
+    writer.write(sink)
+    return total
 
-    def export_to_excel(self, data: list, filename: str = None,
-                        sheet_name: str = "Attendance") -> str:
-        """Export data to Excel file"""
+
+class ExportManager:
+    """
+    Handles data export to various formats
+    Every exporter writes to a sink (BytesIO or any file-like object) when one is
+    given and returns it; otherwise it writes EXPORTS_DIR/filename and returns the path
+    """
+
+    def _export(self, label: str, extension: str, write, sink=None, filename: str = None):
+        """Run write(target) on the sink or a new file in EXPORTS_DIR; None on error"""
         try:
-            if filename is None:
-                filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            if sink is not None:
+                write(sink)
+                logger.debug(f"Exported {label} to {type(sink).__name__}")
+                return sink
 
+            if filename is None:
+                filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+            EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
             filepath = EXPORTS_DIR / filename
+            with open(filepath, 'wb') as f:
+                write(f)
 
-            df = pd.DataFrame(data)
-            df.to_excel(filepath, sheet_name=sheet_name, index=False)
-
-            logger.info(f"Exported to Excel: {filepath}")
+            logger.info(f"Exported to {label}: {filepath}")
             return str(filepath)
 
+        except ImportError as e:
+            package = (e.name or label).split('.')[0]
+            logger.error(f"{package} not installed. Install with: pip install {package}")
+            return None
         except Exception as e:
-            logger.error(f"Error exporting to Excel: {str(e)}")
+            logger.error(f"Error exporting to {label}: {str(e)}")
             return None
 
-    def export_to_csv(self, data: list, filename: str = None) -> str:
-        """Export data to CSV file"""
-        try:
-            if filename is None:
-                filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-            filepath = EXPORTS_DIR / filename
-
-            df = pd.DataFrame(data)
-            df.to_csv(filepath, index=False)
-
-            logger.info(f"Exported to CSV: {filepath}")
-            return str(filepath)
+    def export_to_excel(self, data: list, filename: str = None,
+                        sheet_name: str = "Attendance", sink=None):
+        """Export a list of row dicts to Excel"""
+        def write(target):
+            pd.DataFrame(data).to_excel(target, sheet_name=sheet_name, index=False)
+
+        return self._export('Excel', 'xlsx', write, sink, filename)
+
+    def export_to_csv(self, data: list, filename: str = None, sink=None):
+        """Export a list of row dicts to CSV"""
+        def write(target):
+            pd.DataFrame(data).to_csv(target, index=False)
+
+        return self._export('CSV', 'csv', write, sink, filename)
+
+    def export_attendance_csv(self, records: Iterable, sink=None, filename: str = None):
+        """
+        Stream AttendanceRow records to CSV without holding the report in memory
+        records: any iterable, e.g. AttendanceOperations.iter_attendance_report(...)
+        sink: text or binary file-like object (e.g. BytesIO for st.download_button)
+        """
+        return self._export('CSV', 'csv', lambda target: write_attendance_csv(records, target),
+                            sink, filename)
+
+    def export_attendance_excel(self, records: Iterable, sink=None, filename: str = None,
+                                split_by_department: bool = False):
+        """Stream AttendanceRow records to an Excel workbook in constant memory"""
+        return self._export(
+            'Excel', 'xlsx',
+            lambda target: write_attendance_excel(records, target, split_by_department),
+            sink, filename
+        )
+
+    def export_attendance_pdf(self, records: Iterable = None, sink=None, filename: str = None,
+                              title: str = "Attendance Report", by_department: bool = False,
+                              start_date: date = None, end_date: date = None,
+                              student_id: str = None):
+        """
+        Export the attendance report to PDF in page-sized tables
+        records: AttendanceRow iterable, e.g. AttendanceOperations.iter_attendance_report(...)
+        by_department: instead of records, query start_date..end_date (and student_id) and
+        render one section per department in parallel processes
+        """
+        def write(target):
+            if by_department:
+                write_department_pdf(start_date, end_date, target, student_id, title)
+            else:
+                write_attendance_pdf(records, target, title)
 
-        except Exception as e:
-            logger.error(f"Error exporting to CSV: {str(e)}")
-            return None
+        return self._export('PDF', 'pdf', write, sink, filename)
 
     def export_to_pdf(self, data: list, filename: str = None,
-                      title: str = "Attendance Report") -> str:
-        """Export data to PDF file"""
-        try:
+                      title: str = "Attendance Report", sink=None):
+        """Export a list of row dicts to PDF as a single table"""
+        def write(target):
             from reportlab.lib import colors
-            from reportlab.lib.pagesizes import letter, A4
+            from reportlab.lib.pagesizes import A4
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
             from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import inch
-
-            if filename is None:
-                filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-
-            filepath = EXPORTS_DIR / filename
 
             # Create document
-            doc = SimpleDocTemplate(str(filepath), pagesize=A4)
+            doc = SimpleDocTemplate(target, pagesize=A4)
             elements = []
 
             # Styles
@@ -121,43 +461,14 @@ class ExportManager:
             # Build PDF
             doc.build(elements)
 
-            logger.info(f"Exported to PDF: {filepath}")
-            return str(filepath)
-
-        except ImportError:
-            logger.error("reportlab not installed. Install with: pip install reportlab")
-            return None
-        except Exception as e:
-            logger.error(f"Error exporting to PDF: {str(e)}")
-            return None
+        return self._export('PDF', 'pdf', write, sink, filename)
 
-    def prepare_attendance_data(self, attendance_records: list) -> list:
-        """Prepare attendance records for export"""
-        data = []
-        for record in attendance_records:
-            if hasattr(record, '__iter__') and len(record) == 2:
-                attendance, student = record
-                data.append({
-                    'Student ID': attendance.student_id,
-                    'Name': student.name,
-                    'Department': student.department or 'N/A',
-                    'Date': str(attendance.date),
-                    'Time In': str(attendance.time_in) if attendance.time_in else 'N/A',
-                    'Time Out': str(attendance.time_out) if attendance.time_out else 'N/A',
-                    'Status': attendance.status,
-                    'Confidence': f"{attendance.confidence_score:.2%}" if attendance.confidence_score else 'N/A'
-                })
-            else:
-                # Single attendance record
-                data.append({
-                    'Student ID': record.student_id,
-                    'Date': str(record.date),
-                    'Time In': str(record.time_in) if record.time_in else 'N/A',
-                    'Time Out': str(record.time_out) if record.time_out else 'N/A',
-                    'Status': record.status,
-                    'Confidence': f"{record.confidence_score:.2%}" if record.confidence_score else 'N/A'
-                })
-        return data
+    def prepare_attendance_data(self, attendance_records) -> list:
+        """Prepare AttendanceRow records (see database.rows) for export"""
+        return [
+            dict(zip(ATTENDANCE_COLUMNS, attendance_row_values(record)))
+            for record in attendance_records
+        ]
 
     def prepare_student_data(self, students: list) -> list:
         """Prepare student records for export"""
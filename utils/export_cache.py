@@ -0,0 +1,166 @@
+"""
+Export Cache
+Size-bounded on-disk store of generated report files, so a report that is
+downloaded again is served without re-running the query and the exporter.
+Report keys include the attendance data version, so any attendance write
+makes earlier entries unreachable; they age out through LRU eviction
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import EXPORT_CACHE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Suffix of cached export files
+CACHE_SUFFIX = '.export'
+
+
+def report_cache_key(format_type: str, start_date, end_date, filters: dict,
+                     data_version: int) -> str:
+    """Cache key of a report export: format, date range, filters and data version"""
+    return json.dumps({
+        'format': format_type,
+        'start': str(start_date),
+        'end': str(end_date),
+        'filters': filters,
+        'version': data_version,
+    }, sort_keys=True, default=str)
+
+
+class ExportCache:
+    """
+    Export bytes stored under a string key, one file per entry
+    A file's modification time is its last use; when the directory grows past
+    max_bytes the least recently used files are deleted
+    """
+
+    def __init__(self, directory: Path = None, max_bytes: int = None):
+        self.directory = Path(directory or EXPORT_CACHE_SETTINGS['directory'])
+        self.max_bytes = max_bytes if max_bytes is not None else EXPORT_CACHE_SETTINGS['max_bytes']
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Counters for this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha256(key.encode('utf-8')).hexdigest() + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached bytes for key, None on a miss"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted by another process between the read and the touch
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def get_or_build(self, key: str, build: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """Cached bytes for key, or build() stored under key; None if build() returns None"""
+        data = self.get(key)
+        if data is None:
+            data = build()
+            if data is not None:
+                self.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> bool:
+        """Store data under key, evicting old entries; False if it is larger than the cache"""
+        if len(data) > self.max_bytes:
+            return False
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        self._evict()
+        return True
+
+    def _entries(self) -> list:
+        """[(last use, size, path)] of cached files"""
+        entries = []
+        for path in self.directory.glob('*' + CACHE_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+                logger.debug(f"Evicted cached export {path.name}")
+
+    def stats(self) -> dict:
+        """Hit/miss counts of this process and the cache's current size"""
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes,
+            }
+
+    def size(self) -> int:
+        """Bytes currently cached"""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """Delete every cached export"""
+        with self._lock:
+            for _, _, path in self._entries():
+                path.unlink(missing_ok=True)
+
+
+_export_cache = None
+_export_cache_lock = threading.Lock()
+
+
+def get_export_cache() -> Optional[ExportCache]:
+    """Process-wide export cache, None when disabled in EXPORT_CACHE_SETTINGS"""
+    global _export_cache
+    if not EXPORT_CACHE_SETTINGS['enabled']:
+        return None
+    with _export_cache_lock:
+        if _export_cache is None:
+            _export_cache = ExportCache()
+        return _export_cache
@@ -9,6 +9,9 @@ import numpy as np
 import face_recognition
 import pickle
 import json
+import hashlib
+import queue
+import threading
 import logging
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict
@@ -19,6 +22,7 @@ from config.settings import (
     FACE_RECOGNITION_SETTINGS, TRAINED_MODELS_DIR, DATASET_DIR,
     ATTENDANCE_SETTINGS
 )
+from database.operations import FaceEncodingOperations
 
 logger = logging.getLogger(__name__)
 
@@ -125,23 +129,216 @@ class FaceQualityValidator:
         return quality_report['overall'], quality_report
 
 
+# Outcomes of preparing a training image
+ENCODING_OK = 'ok'
+ENCODING_LOW_QUALITY = 'low_quality'
+ENCODING_NO_FACE = 'no_face'
+ENCODING_SMALL_FACE = 'small_face'
+
+
+def get_encoder_settings() -> dict:
+    """Settings that change a training encoding; precomputed results must match them"""
+    return {
+        'model': FACE_RECOGNITION_SETTINGS['model'],
+        'encoding_model': FACE_RECOGNITION_SETTINGS['encoding_model'],
+        'num_jitters': FACE_RECOGNITION_SETTINGS['num_jitters'],
+        'min_face_size': FACE_RECOGNITION_SETTINGS.get('min_face_size', 80),
+    }
+
+
+def compute_training_encoding(image: np.ndarray) -> Tuple[str, Optional[np.ndarray], dict]:
+    """
+    Quality-check a face image and compute its training encoding
+    Returns: (status, encoding or None, quality_report)
+    """
+    is_quality_ok, quality_report = FaceQualityValidator.validate_face_image(image)
+    if not is_quality_ok:
+        return ENCODING_LOW_QUALITY, None, quality_report
+
+    # Get face location for additional quality check
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    face_locations = face_recognition.face_locations(
+        rgb_image, model=FACE_RECOGNITION_SETTINGS['model']
+    )
+    if not face_locations:
+        return ENCODING_NO_FACE, None, quality_report
+
+    # Check face size
+    size_ok, _ = FaceQualityValidator.check_face_size(face_locations[0])
+    if not size_ok:
+        return ENCODING_SMALL_FACE, None, quality_report
+
+    # Get encoding with high num_jitters for accuracy
+    encodings = face_recognition.face_encodings(
+        rgb_image, face_locations,
+        num_jitters=FACE_RECOGNITION_SETTINGS['num_jitters'],
+        model=FACE_RECOGNITION_SETTINGS['encoding_model']
+    )
+    if not encodings:
+        return ENCODING_NO_FACE, None, quality_report
+
+    return ENCODING_OK, encodings[0], quality_report
+
+
+def encoding_sidecar_path(image_path: Path) -> Path:
+    """Precomputed encoding file stored next to a face image"""
+    return Path(image_path).with_suffix('.npz')
+
+
+def save_precomputed_encoding(image_path: Path, status: str,
+                              encoding: Optional[np.ndarray], quality_report: dict):
+    """Persist a capture-time encoding alongside its image"""
+    np.savez(
+        encoding_sidecar_path(image_path),
+        status=status,
+        encoding=encoding if encoding is not None else np.empty(0),
+        blur=float(quality_report['blur']['score']),
+        brightness=float(quality_report['brightness']['value']),
+        settings=json.dumps(get_encoder_settings(), sort_keys=True)
+    )
+
+
+def load_precomputed_encoding(image_path: Path) -> Optional[Tuple[str, Optional[np.ndarray], float]]:
+    """
+    Load a capture-time encoding if it is still valid
+    Returns (status, encoding, blur score) or None when missing, older than the image,
+    or computed with different encoder settings
+    """
+    sidecar = encoding_sidecar_path(image_path)
+    try:
+        if sidecar.stat().st_mtime < Path(image_path).stat().st_mtime:
+            return None
+        with np.load(sidecar, allow_pickle=False) as data:
+            if json.loads(str(data['settings'])) != get_encoder_settings():
+                return None
+            status = str(data['status'])
+            encoding = data['encoding'] if data['encoding'].size else None
+            blur = float(data['blur'])
+        return status, encoding, blur
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def image_source_hash(data: bytes) -> str:
+    """Identity of a training image, stored with its encoding"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class CaptureEncoder:
+    """
+    Computes quality metrics and encodings for captured images on a worker thread
+    so training can reuse them instead of re-decoding and re-encoding every image.
+    finish() lets the thread drain the queue in the background; images it has not
+    encoded yet when training starts are encoded from disk there
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._finishing = threading.Event()
+        self.encoded = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the encoder thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="capture-encoder", daemon=True)
+            self._thread.start()
+
+    def submit(self, image_path, image: np.ndarray):
+        """Queue an image already written to image_path; dropped if the queue is full"""
+        try:
+            self._queue.put_nowait((Path(image_path), image))
+        except queue.Full:
+            # Training falls back to encoding this image from disk
+            logger.debug(f"Capture encoder busy, skipping {image_path}")
+
+    @property
+    def pending(self) -> int:
+        """Images queued but not yet encoded"""
+        return self._queue.qsize()
+
+    @property
+    def done(self) -> bool:
+        """True once finish() was called and every queued image is encoded"""
+        return self._thread is None or not self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._finishing.is_set():
+                    break
+                continue
+            image_path, image = item
+            try:
+                status, encoding, quality_report = compute_training_encoding(image)
+                save_precomputed_encoding(image_path, status, encoding, quality_report)
+                self.encoded += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error precomputing encoding for {image_path}: {str(e)}")
+
+    def finish(self):
+        """Stop once the queued images are encoded, without waiting for them"""
+        self._finishing.set()
+
+    def close(self) -> dict:
+        """Finish queued images and stop the thread"""
+        self.finish()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return {'encoded': self.encoded, 'failed': self.failed}
+
+
 class FaceRecognizer:
     """
     Face recognition using face_recognition library (dlib-based)
-    Enhanced with multi-encoding support for better accuracy
+    Enhanced with multi-encoding support for better accuracy.
+    The gallery of per-image encodings lives in the face_encodings table and is
+    held in memory as one contiguous float32 matrix
     """
 
     def __init__(self):
-        self.known_encodings = []  # List of encodings
+        self.known_encodings = []  # Averaged encoding per student (legacy pickle format)
         self.known_ids = []  # Corresponding student IDs
         self.known_names = []  # Corresponding names
-        # Multi-encoding storage: {student_id: [list of encodings]}
-        self.student_encodings: Dict[str, List[np.ndarray]] = {}
+        # Gallery: one row per stored encoding, labels index into gallery_ids
+        self.gallery = np.empty((0, 128), dtype=np.float32)
+        self.gallery_labels = np.empty(0, dtype=np.intp)
+        self.gallery_ids: List[str] = []
         self.student_names: Dict[str, str] = {}
         self.model_path = TRAINED_MODELS_DIR / "face_encodings.pkl"
         self.quality_validator = FaceQualityValidator()
         self.load_model()
 
+    @property
+    def student_encodings(self) -> Dict[str, np.ndarray]:
+        """Encodings grouped per student"""
+        return {
+            student_id: self.gallery[self.gallery_labels == label]
+            for label, student_id in enumerate(self.gallery_ids)
+        }
+
+    def _set_gallery(self, encodings: np.ndarray, student_ids: List[str], names: Dict[str, str]):
+        """Index a gallery of per-row encodings and refresh the averaged legacy lists"""
+        self.gallery_ids = list(dict.fromkeys(student_ids))
+        label_of = {student_id: label for label, student_id in enumerate(self.gallery_ids)}
+        self.gallery = np.ascontiguousarray(encodings, dtype=np.float32)
+        self.gallery_labels = np.fromiter((label_of[sid] for sid in student_ids),
+                                          dtype=np.intp, count=len(student_ids))
+        self.student_names = {sid: names.get(sid, sid) for sid in self.gallery_ids}
+
+        counts = np.bincount(self.gallery_labels, minlength=len(self.gallery_ids))
+        sums = np.zeros((len(self.gallery_ids), self.gallery.shape[1]), dtype=np.float64)
+        np.add.at(sums, self.gallery_labels, self.gallery)
+        means = sums / np.maximum(counts, 1)[:, None]
+        self.known_encodings = list(means)
+        self.known_ids = list(self.gallery_ids)
+        self.known_names = [self.student_names[sid] for sid in self.gallery_ids]
+
     def get_face_encoding(self, image: np.ndarray,
                           known_locations: list = None) -> Optional[np.ndarray]:
         """Get face encoding from an image"""
@@ -207,65 +404,48 @@ class FaceRecognizer:
     def recognize_face(self, face_encoding: np.ndarray) -> Tuple[str, str, float]:
         """
         Recognize a face from its encoding using voting across multiple stored encodings
+        Distances to the whole gallery are computed in one pass and grouped per student
         Returns: (student_id, name, confidence)
         """
-        if not self.student_encodings:
+        if not len(self.gallery):
             return "Unknown", "Unknown", 0.0
 
         try:
             tolerance = FACE_RECOGNITION_SETTINGS['tolerance']
-            best_match_id = None
-            best_match_name = None
-            best_confidence = 0.0
-            match_votes: Dict[str, List[float]] = {}  # {student_id: [confidences]}
-
-            # Compare against all encodings for each student
-            for student_id, encodings in self.student_encodings.items():
-                if not encodings:
-                    continue
-
-                # Calculate distances to all encodings for this student
-                distances = face_recognition.face_distance(encodings, face_encoding)
-
-                # Get matches within tolerance
-                matches_within_tolerance = distances[distances <= tolerance]
-
-                if len(matches_within_tolerance) > 0:
-                    # Calculate average confidence for matches
-                    avg_confidence = 1 - np.mean(matches_within_tolerance)
-                    match_count = len(matches_within_tolerance)
-                    total_encodings = len(encodings)
+            num_students = len(self.gallery_ids)
 
-                    # Weighted confidence: combines match quality with match ratio
-                    # Higher weight if more encodings match
-                    match_ratio = match_count / total_encodings
-                    weighted_confidence = avg_confidence * (0.7 + 0.3 * match_ratio)
+            distances = np.linalg.norm(self.gallery - np.asarray(face_encoding, dtype=np.float32), axis=1)
+            within = distances <= tolerance
+            if not within.any():
+                return "Unknown", "Unknown", 0.0
 
-                    match_votes[student_id] = {
-                        'confidence': weighted_confidence,
-                        'match_count': match_count,
-                        'total': total_encodings,
-                        'best_distance': np.min(distances)
-                    }
+            # Per student: encodings within tolerance, their distance sum, and all encodings
+            labels = self.gallery_labels[within]
+            match_counts = np.bincount(labels, minlength=num_students)
+            distance_sums = np.bincount(labels, weights=distances[within], minlength=num_students)
+            totals = np.bincount(self.gallery_labels, minlength=num_students)
 
-            if not match_votes:
-                return "Unknown", "Unknown", 0.0
+            matched = match_counts > 0
+            avg_confidence = np.zeros(num_students)
+            avg_confidence[matched] = 1 - distance_sums[matched] / match_counts[matched]
 
-            # Find the best match based on weighted confidence
-            best_student_id = max(match_votes.keys(),
-                                   key=lambda x: match_votes[x]['confidence'])
-            best_match_info = match_votes[best_student_id]
+            # Weighted confidence: combines match quality with match ratio
+            # Higher weight if more encodings match
+            weighted = np.where(matched, avg_confidence * (0.7 + 0.3 * match_counts / totals), -np.inf)
+            best = int(np.argmax(weighted))
+            best_confidence = float(weighted[best])
+            best_student_id = self.gallery_ids[best]
 
             # Require at least 2 matching encodings OR very high confidence on single match
-            min_required = FACE_RECOGNITION_SETTINGS.get('min_encodings_per_student', 5)
-            if best_match_info['match_count'] < 2 and best_match_info['confidence'] < 0.7:
-                logger.warning(f"Low confidence match rejected: {best_match_info}")
-                return "Unknown", "Unknown", best_match_info['confidence']
+            if match_counts[best] < 2 and best_confidence < 0.7:
+                logger.warning(f"Low confidence match rejected: {best_student_id} "
+                               f"({match_counts[best]}/{totals[best]} matches, confidence {best_confidence:.3f})")
+                return "Unknown", "Unknown", best_confidence
 
             return (
                 best_student_id,
                 self.student_names.get(best_student_id, "Unknown"),
-                best_match_info['confidence']
+                best_confidence
             )
 
         except Exception as e:
@@ -279,16 +459,13 @@ class FaceRecognizer:
         student_data: List of {'student_id': str, 'name': str, 'images_path': Path}
         """
         try:
-            self.student_encodings = {}
-            self.student_names = {}
-            # Also maintain flat lists for backward compatibility
-            self.known_encodings = []
-            self.known_ids = []
-            self.known_names = []
+            gallery: Dict[str, list] = {}
+            image_counts: Dict[str, int] = {}
 
             total_images = 0
             quality_rejected = 0
             students_trained = 0
+            precomputed_used = 0
 
             for student in student_data:
                 student_id = student['student_id']
@@ -297,74 +474,63 @@ class FaceRecognizer:
 
                 if not images_path.exists():
                     logger.warning(f"No images found for {student_id}")
+                    gallery[student_id] = []
                     continue
 
-                # Process all images for this student
+                # Process all images for this student: [(encoding, quality, source_hash)]
                 student_valid_encodings = []
 
                 # Support both jpg and png images
                 image_files = list(images_path.glob('*.jpg')) + list(images_path.glob('*.png')) + list(images_path.glob('*.jpeg'))
 
                 for img_path in image_files:
-                    image = cv2.imread(str(img_path))
-                    if image is None:
+                    try:
+                        image_bytes = img_path.read_bytes()
+                    except OSError:
                         continue
 
-                    # Validate image quality
-                    is_quality_ok, quality_report = self.quality_validator.validate_face_image(image)
-                    if not is_quality_ok:
+                    # Reuse the encoding computed at capture time when settings match
+                    precomputed = load_precomputed_encoding(img_path)
+                    if precomputed is not None:
+                        status, encoding, quality = precomputed
+                        precomputed_used += 1
+                    else:
+                        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+                        if image is None:
+                            continue
+                        status, encoding, quality_report = compute_training_encoding(image)
+                        quality = float(quality_report['blur']['score'])
+                        if status == ENCODING_LOW_QUALITY:
+                            logger.debug(f"Image rejected for quality: {img_path} - {quality_report}")
+
+                    if status in (ENCODING_LOW_QUALITY, ENCODING_SMALL_FACE):
                         quality_rejected += 1
-                        logger.debug(f"Image rejected for quality: {img_path} - {quality_report}")
                         continue
 
-                    # Get face location for additional quality check
-                    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                    face_locations = face_recognition.face_locations(
-                        rgb_image, model=FACE_RECOGNITION_SETTINGS['model']
-                    )
-
-                    if not face_locations:
-                        continue
-
-                    # Check face size
-                    size_ok, _ = self.quality_validator.check_face_size(face_locations[0])
-                    if not size_ok:
-                        quality_rejected += 1
-                        continue
-
-                    # Get encoding with high num_jitters for accuracy
-                    encodings = face_recognition.face_encodings(
-                        rgb_image, face_locations,
-                        num_jitters=FACE_RECOGNITION_SETTINGS['num_jitters'],
-                        model=FACE_RECOGNITION_SETTINGS['encoding_model']
-                    )
-
-                    if encodings:
-                        student_valid_encodings.append(encodings[0])
+                    if status == ENCODING_OK:
+                        student_valid_encodings.append((encoding, quality, image_source_hash(image_bytes)))
                         total_images += 1
 
                 # Store multiple encodings for this student (don't average)
                 min_required = FACE_RECOGNITION_SETTINGS.get('min_encodings_per_student', 5)
                 if len(student_valid_encodings) >= min_required:
-                    self.student_encodings[student_id] = student_valid_encodings
-                    self.student_names[student_id] = name
+                    gallery[student_id] = student_valid_encodings
+                    image_counts[student_id] = len(image_files)
                     students_trained += 1
-
-                    # Also store average for backward compatibility
-                    avg_encoding = np.mean(student_valid_encodings, axis=0)
-                    self.known_encodings.append(avg_encoding)
-                    self.known_ids.append(student_id)
-                    self.known_names.append(name)
-
                     logger.info(f"Processed {len(student_valid_encodings)} quality images for {name}")
                 else:
                     logger.warning(f"Student {name} has only {len(student_valid_encodings)} valid images (need {min_required})")
+                    gallery[student_id] = []
 
-            # Save the model
+            # Persist the gallery, then reload it so memory matches the database
+            success, msg = FaceEncodingOperations.replace_encodings(gallery, image_counts, exclusive=True)
+            if not success:
+                return False, f"Training failed: {msg}"
+            self.load_model()
             self.save_model()
 
             msg = f"Training complete: {students_trained} students, {total_images} quality images ({quality_rejected} rejected for quality)"
-            logger.info(msg)
+            logger.info(f"{msg}; {precomputed_used} images used capture-time encodings")
             return True, msg
 
         except Exception as e:
@@ -381,55 +547,24 @@ class FaceRecognizer:
             quality_rejected = 0
 
             for image in images:
-                # Validate quality
-                is_quality_ok, quality_report = self.quality_validator.validate_face_image(image)
-                if not is_quality_ok:
-                    quality_rejected += 1
-                    continue
-
-                # Get face location
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                face_locations = face_recognition.face_locations(
-                    rgb_image, model=FACE_RECOGNITION_SETTINGS['model']
-                )
-
-                if not face_locations:
-                    quality_rejected += 1
-                    continue
-
-                # Check face size
-                size_ok, _ = self.quality_validator.check_face_size(face_locations[0])
-                if not size_ok:
+                status, encoding, quality_report = compute_training_encoding(image)
+                if status == ENCODING_OK:
+                    valid_encodings.append((
+                        encoding, float(quality_report['blur']['score']),
+                        image_source_hash(np.ascontiguousarray(image).tobytes())
+                    ))
+                else:
                     quality_rejected += 1
-                    continue
-
-                # Get encoding
-                encodings = face_recognition.face_encodings(
-                    rgb_image, face_locations,
-                    num_jitters=FACE_RECOGNITION_SETTINGS['num_jitters'],
-                    model=FACE_RECOGNITION_SETTINGS['encoding_model']
-                )
-
-                if encodings:
-                    valid_encodings.append(encodings[0])
 
             min_required = FACE_RECOGNITION_SETTINGS.get('min_encodings_per_student', 5)
             if len(valid_encodings) < min_required:
                 return False, f"Only {len(valid_encodings)} valid images. Need at least {min_required} quality face images."
 
-            # Add to existing model or create new
-            self.student_encodings[student_id] = valid_encodings
-            self.student_names[student_id] = name
-
-            # Update flat lists
-            if student_id in self.known_ids:
-                idx = self.known_ids.index(student_id)
-                self.known_encodings[idx] = np.mean(valid_encodings, axis=0)
-            else:
-                self.known_encodings.append(np.mean(valid_encodings, axis=0))
-                self.known_ids.append(student_id)
-                self.known_names.append(name)
-
+            # Replace this student's encodings, keeping everyone else's
+            success, msg = FaceEncodingOperations.replace_encodings({student_id: valid_encodings})
+            if not success:
+                return False, f"Training failed: {msg}"
+            self.load_model()
             self.save_model()
 
             return True, f"Successfully trained with {len(valid_encodings)} images ({quality_rejected} rejected for quality)"
@@ -439,14 +574,17 @@ class FaceRecognizer:
             return False, f"Training failed: {str(e)}"
 
     def save_model(self):
-        """Save trained model to file with multi-encoding support"""
+        """
+        Write a pickle snapshot of the gallery for tools that still read the file
+        The face_encodings table remains the source of truth
+        """
         try:
             TRAINED_MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
-            # Convert numpy arrays to lists for JSON serialization
-            student_encodings_serializable = {}
-            for student_id, encodings in self.student_encodings.items():
-                student_encodings_serializable[student_id] = [enc.tolist() for enc in encodings]
+            student_encodings_serializable = {
+                student_id: encodings.tolist()
+                for student_id, encodings in self.student_encodings.items()
+            }
 
             data = {
                 'version': 2,  # New format version with multi-encoding
@@ -459,39 +597,55 @@ class FaceRecognizer:
             }
             with open(self.model_path, 'wb') as f:
                 pickle.dump(data, f)
-            logger.info(f"Model saved to {self.model_path} with {len(self.student_encodings)} students")
+            logger.info(f"Model saved to {self.model_path} with {len(self.gallery_ids)} students")
         except Exception as e:
             logger.error(f"Error saving model: {str(e)}")
 
     def load_model(self):
-        """Load trained model from file with multi-encoding support"""
+        """
+        Load the gallery from the face_encodings table
+        The pickle written by older versions is imported once, while the table has never
+        been populated; after that an empty table means no student has encodings
+        """
+        try:
+            if not FaceEncodingOperations.is_initialized():
+                self._migrate_pickle()
+            encodings, student_ids, names = FaceEncodingOperations.load_gallery()
+            self._set_gallery(encodings, student_ids, names)
+            logger.info(f"Gallery loaded: {len(self.gallery)} encodings, {len(self.gallery_ids)} students")
+        except Exception as e:
+            logger.error(f"Error loading face encodings from database: {str(e)}")
+
+    def _migrate_pickle(self):
+        """Import the gallery of the legacy pickle file into the face_encodings table"""
+        if not self.model_path.exists():
+            return
         try:
-            if self.model_path.exists():
-                with open(self.model_path, 'rb') as f:
-                    data = pickle.load(f)
-
-                # Check for new format (version 2)
-                if data.get('version', 1) >= 2:
-                    # Load multi-encoding format
-                    self.student_encodings = {}
-                    for student_id, encodings in data.get('student_encodings', {}).items():
-                        self.student_encodings[student_id] = [np.array(enc) for enc in encodings]
-                    self.student_names = data.get('student_names', {})
-
-                # Load legacy format for backward compatibility
-                self.known_encodings = [np.array(enc) for enc in data.get('encodings', [])]
-                self.known_ids = data.get('ids', [])
-                self.known_names = data.get('names', [])
-
-                # If only legacy format exists, convert to new format
-                if not self.student_encodings and self.known_ids:
-                    for i, student_id in enumerate(self.known_ids):
-                        self.student_encodings[student_id] = [self.known_encodings[i]]
-                        self.student_names[student_id] = self.known_names[i]
-
-                logger.info(f"Model loaded: {len(self.student_encodings)} students")
+            with open(self.model_path, 'rb') as f:
+                data = pickle.load(f)
+
+            if data.get('version', 1) >= 2:
+                student_encodings = data.get('student_encodings', {})
+            else:
+                # Only the averaged encoding per student exists
+                student_encodings = {
+                    student_id: [encoding]
+                    for student_id, encoding in zip(data.get('ids', []), data.get('encodings', []))
+                }
+
+            gallery = {}
+            for student_id, encodings in student_encodings.items():
+                rows = [np.asarray(encoding, dtype=np.float32) for encoding in encodings]
+                gallery[student_id] = [
+                    (row, None, hashlib.sha256(row.tobytes()).hexdigest()) for row in rows
+                ]
+            success, msg = FaceEncodingOperations.replace_encodings(gallery, exclusive=True)
+            if success:
+                logger.info(f"Migrated {self.model_path} into the database: {msg}")
+            else:
+                logger.error(f"Migrating {self.model_path} failed: {msg}")
         except Exception as e:
-            logger.error(f"Error loading model: {str(e)}")
+            logger.error(f"Error migrating model {self.model_path}: {str(e)}")
 
 
 class LBPHRecognizer:
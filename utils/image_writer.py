@@ -0,0 +1,194 @@
+"""
+Async Image Writer Module
+Background JPEG encoding and disk writes for captured face crops
+"""
+
+import os
+import queue
+import threading
+import logging
+from pathlib import Path
+from typing import Optional, Tuple
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import CAPTURE_SETTINGS
+from utils.helpers import create_student_folder
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling the worker to drain and exit
+_STOP = object()
+
+
+class AsyncImageWriter:
+    """
+    Writes face images on a background thread through a bounded queue
+    Files are fsynced in batches; failures are collected for the caller to report
+    """
+
+    def __init__(self, max_queue: int = None, fsync_batch: int = None,
+                 jpeg_quality: int = None, submit_timeout: float = 2.0,
+                 on_written=None):
+        """on_written: optional callable(filepath, image) run on the writer thread after each write"""
+        self.max_queue = max_queue or CAPTURE_SETTINGS['writer_queue_size']
+        self.fsync_batch = CAPTURE_SETTINGS['fsync_batch'] if fsync_batch is None else fsync_batch
+        self.jpeg_quality = jpeg_quality or CAPTURE_SETTINGS['jpeg_quality']
+        self.submit_timeout = submit_timeout
+        self.on_written = on_written
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._unsynced = []  # Open file objects awaiting the next batch fsync
+        self._folders = {}
+
+        self.written = []
+        self.failed = []  # [(path, error message)]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="image-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, student_id: str, image: np.ndarray, image_index: int) -> Optional[str]:
+        """
+        Queue a face image for writing, returns its target path
+        Blocks briefly when the queue is full; returns None if it stays full
+        The caller must not modify the array after submitting it
+        """
+        if student_id not in self._folders:
+            self._folders[student_id] = create_student_folder(student_id)
+        filepath = self._folders[student_id] / f"{student_id}_{image_index:04d}.jpg"
+
+        try:
+            self._queue.put((filepath, image), timeout=self.submit_timeout)
+        except queue.Full:
+            self.failed.append((str(filepath), "Writer queue full"))
+            logger.warning(f"Dropped face image, writer queue full: {filepath}")
+            return None
+        return str(filepath)
+
+    @property
+    def pending(self) -> int:
+        """Images queued but not yet written"""
+        return self._queue.qsize()
+
+    def _write(self, filepath: Path, image: np.ndarray):
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+
+        f = open(filepath, 'wb')
+        try:
+            f.write(buffer.tobytes())
+            f.flush()
+        except Exception:
+            f.close()
+            raise
+
+        if self.fsync_batch > 0:
+            self._unsynced.append(f)
+        else:
+            f.close()
+
+    def _sync(self):
+        """fsync and close every file written since the last batch"""
+        for f in self._unsynced:
+            try:
+                os.fsync(f.fileno())
+            except OSError as e:
+                # Counted as written when the write returned; it is not durable after all
+                self.written.remove(str(f.name))
+                self.failed.append((f.name, f"fsync failed: {e}"))
+            finally:
+                f.close()
+        self._unsynced = []
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            filepath, image = item
+            try:
+                self._write(filepath, image)
+            except Exception as e:
+                self.failed.append((str(filepath), str(e)))
+                logger.error(f"Error saving face image {filepath}: {str(e)}")
+            else:
+                self.written.append(str(filepath))
+                logger.debug(f"Saved face image: {filepath}")
+                if self.on_written is not None:
+                    try:
+                        self.on_written(filepath, image)
+                    except Exception as e:
+                        logger.error(f"on_written failed for {filepath}: {str(e)}")
+
+            if len(self._unsynced) >= self.fsync_batch > 0:
+                self._sync()
+
+        self._sync()
+
+    def close(self) -> dict:
+        """
+        Drain the queue, fsync outstanding files and stop the thread
+        Returns: {'written': int, 'failed': [(path, error)]}
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+        return {'written': len(self.written), 'failed': list(self.failed)}
+
+
+def start_capture_writer() -> Tuple[AsyncImageWriter, Optional[object]]:
+    """
+    Start a writer for a capture session, chained to a CaptureEncoder when
+    capture-time encoding is enabled and face_recognition is available
+    Returns: (writer, encoder or None); close the writer before the encoder
+    """
+    encoder = None
+    if CAPTURE_SETTINGS['precompute_encodings']:
+        try:
+            from utils.face_recognizer import CaptureEncoder
+            encoder = CaptureEncoder()
+            encoder.start()
+        except ImportError:
+            logger.info("face_recognition not available, skipping capture-time encoding")
+
+    writer = AsyncImageWriter(on_written=encoder.submit if encoder else None)
+    writer.start()
+    return writer, encoder
+
+
+def report_capture_encoding():
+    """
+    Report, on a Streamlit page, the capture encoders of earlier runs that have drained
+    and how many images are left; encoders are kept in st.session_state.capture_encoders
+    """
+    import streamlit as st
+
+    running = []
+    for encoder in st.session_state.get('capture_encoders', []):
+        if encoder.done:
+            report = encoder.close()
+            failed = f", {report['failed']} failed" if report['failed'] else ""
+            st.info(f"Precomputed encodings for {report['encoded']} captured images{failed}")
+        else:
+            running.append(encoder)
+    st.session_state.capture_encoders = running
+
+    if running:
+        st.caption(f"Encoding {sum(e.pending for e in running)} captured images in the background")
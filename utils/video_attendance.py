@@ -0,0 +1,255 @@
+"""
+Offline Video Attendance Module
+Computes attendance from a recorded lecture (video file or image-sequence directory)
+by splitting the recording into time chunks and recognizing faces in a process pool
+"""
+
+import os
+import time
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+import sys
+
+import cv2
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.settings import (
+    VIDEO_ATTENDANCE_SETTINGS, FACE_RECOGNITION_SETTINGS, ATTENDANCE_SETTINGS
+)
+from utils.camera import CameraManager
+
+logger = logging.getLogger(__name__)
+
+# Recognizer loaded once per worker process by _init_worker
+_worker_recognizer = None
+
+
+def _init_worker():
+    """Process-pool initializer: load the trained model once per worker"""
+    global _worker_recognizer
+    from utils.face_recognizer import FaceRecognizer
+    _worker_recognizer = FaceRecognizer()
+
+
+def _process_chunk(source: str, start_frame: int, end_frame: int,
+                   frame_skip: int, detection_scale: float,
+                   num_jitters: int) -> dict:
+    """
+    Recognize faces in frames [start_frame, end_frame) of a recording
+    Returns: {'sightings': {student_id: {...}}, 'frames_processed': int}
+    """
+    import face_recognition
+
+    camera = CameraManager(source)
+    if not camera.start():
+        return {'sightings': {}, 'frames_processed': 0, 'error': f"Cannot open {source}"}
+
+    threshold = ATTENDANCE_SETTINGS['confidence_threshold']
+    sightings: Dict[str, dict] = {}
+    frames_processed = 0
+
+    try:
+        camera.seek(start_frame)
+        frame_index = start_frame
+
+        while frame_index < end_frame:
+            ret, frame = camera.read_frame()
+            if not ret:
+                break
+
+            small = cv2.resize(frame, (0, 0), fx=detection_scale, fy=detection_scale)
+            rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            locations = face_recognition.face_locations(
+                rgb_small, model=FACE_RECOGNITION_SETTINGS['model']
+            )
+
+            if locations:
+                # Encode on the full-resolution frame for accuracy
+                scale = 1.0 / detection_scale
+                full_locations = [
+                    (int(top * scale), int(right * scale), int(bottom * scale), int(left * scale))
+                    for (top, right, bottom, left) in locations
+                ]
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                encodings = face_recognition.face_encodings(
+                    rgb_frame, full_locations, num_jitters=num_jitters,
+                    model=FACE_RECOGNITION_SETTINGS['encoding_model']
+                )
+
+                for encoding in encodings:
+                    student_id, name, confidence = _worker_recognizer.recognize_face(encoding)
+                    if student_id == "Unknown" or confidence < threshold:
+                        continue
+
+                    seen = sightings.get(student_id)
+                    if seen is None:
+                        sightings[student_id] = {
+                            'name': name,
+                            'first_frame': frame_index,
+                            'confidence': confidence,
+                            'detections': 1
+                        }
+                    else:
+                        seen['confidence'] = max(seen['confidence'], confidence)
+                        seen['detections'] += 1
+
+            frames_processed += 1
+            frame_index += 1
+
+            # Skip ahead without decoding, never past the chunk boundary
+            to_skip = min(frame_skip - 1, end_frame - frame_index)
+            if to_skip > 0:
+                frame_index += camera.skip_frames(to_skip)
+
+    finally:
+        camera.stop()
+
+    return {'sightings': sightings, 'frames_processed': frames_processed}
+
+
+class VideoAttendanceProcessor:
+    """Batch attendance from recorded lectures using a pool of worker processes"""
+
+    def __init__(self, chunk_seconds: float = None, frame_skip: int = None,
+                 max_workers: int = None):
+        settings = VIDEO_ATTENDANCE_SETTINGS
+        self.chunk_seconds = chunk_seconds or settings['chunk_seconds']
+        self.frame_skip = max(1, frame_skip or settings['frame_skip'])
+        self.max_workers = max_workers or settings['max_workers'] or os.cpu_count() or 1
+        self.detection_scale = settings['detection_scale']
+        self.num_jitters = settings['num_jitters']
+        self.min_detections = settings['min_detections']
+
+    @staticmethod
+    def probe_source(source: Union[str, Path]) -> Tuple[int, float]:
+        """Return (frame_count, fps) of a recording"""
+        camera = CameraManager(str(source))
+        if not camera.start():
+            return 0, 0.0
+        try:
+            return camera.get_frame_count(), camera.get_source_fps()
+        finally:
+            camera.stop()
+
+    def split_chunks(self, frame_count: int, fps: float) -> List[Tuple[int, int]]:
+        """Split a recording into [start, end) frame ranges of chunk_seconds each"""
+        chunk_frames = max(int(self.chunk_seconds * fps), self.frame_skip)
+        return [
+            (start, min(start + chunk_frames, frame_count))
+            for start in range(0, frame_count, chunk_frames)
+        ]
+
+    def process(self, source: Union[str, Path],
+                recording_start: datetime = None,
+                progress_callback=None) -> dict:
+        """
+        Recognize everyone in a recording
+        recording_start: wall-clock time of the first frame, used for first-seen timestamps
+        progress_callback: optional callable(chunks_done, chunks_total)
+        """
+        source = str(source)
+        frame_count, fps = self.probe_source(source)
+        if frame_count == 0:
+            return {'success': False, 'message': f"Could not read recording: {source}"}
+
+        if recording_start is None:
+            recording_start = datetime.fromtimestamp(Path(source).stat().st_mtime)
+
+        chunks = self.split_chunks(frame_count, fps)
+        started = time.perf_counter()
+
+        merged: Dict[str, dict] = {}
+        frames_processed = 0
+        errors = []
+
+        # Spawned, not forked: a forked worker would inherit the parent's pooled
+        # SQLite connections and the checkpoint thread's locks
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(chunks)),
+                                 mp_context=mp.get_context('spawn'),
+                                 initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_process_chunk, source, start, end, self.frame_skip,
+                            self.detection_scale, self.num_jitters)
+                for start, end in chunks
+            ]
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                frames_processed += result['frames_processed']
+                if result.get('error'):
+                    errors.append(result['error'])
+
+                # Dedupe identities across chunks, keeping the earliest sighting
+                for student_id, seen in result['sightings'].items():
+                    current = merged.get(student_id)
+                    if current is None:
+                        merged[student_id] = dict(seen)
+                        continue
+                    current['first_frame'] = min(current['first_frame'], seen['first_frame'])
+                    current['confidence'] = max(current['confidence'], seen['confidence'])
+                    current['detections'] += seen['detections']
+
+                if progress_callback:
+                    progress_callback(done, len(chunks))
+
+        elapsed = time.perf_counter() - started
+        duration = frame_count / fps if fps else 0.0
+
+        students = {}
+        for student_id, seen in merged.items():
+            if seen['detections'] < self.min_detections:
+                continue
+            students[student_id] = {
+                'name': seen['name'],
+                'first_seen': recording_start + timedelta(seconds=seen['first_frame'] / fps),
+                'confidence': seen['confidence'],
+                'detections': seen['detections']
+            }
+
+        stats = {
+            'frames_total': frame_count,
+            'frames_processed': frames_processed,
+            'chunks': len(chunks),
+            'workers': min(self.max_workers, len(chunks)),
+            'elapsed_seconds': elapsed,
+            'recording_seconds': duration,
+            # Source frames covered per wall-clock second
+            'fps': frame_count / elapsed if elapsed > 0 else 0.0,
+            # Frames actually decoded and recognized per second
+            'processed_fps': frames_processed / elapsed if elapsed > 0 else 0.0,
+            'realtime_factor': duration / elapsed if elapsed > 0 else 0.0,
+        }
+
+        logger.info(
+            f"Processed {source}: {len(students)} students, "
+            f"{stats['fps']:.1f} fps ({stats['realtime_factor']:.1f}x real time)"
+        )
+
+        return {
+            'success': not errors,
+            'message': "; ".join(errors) if errors else "Recording processed",
+            'students': students,
+            'stats': stats
+        }
+
+    @staticmethod
+    def write_attendance(students: Dict[str, dict], notes: str = None) -> Dict[str, Tuple[bool, str]]:
+        """Mark attendance for every recognized student at their first-seen time"""
+        from database.operations import AttendanceOperations
+
+        results = {}
+        for student_id, info in sorted(students.items(), key=lambda item: item[1]['first_seen']):
+            results[student_id] = AttendanceOperations.mark_attendance(
+                student_id=student_id,
+                confidence_score=info['confidence'],
+                status='Present',
+                notes=notes,
+                timestamp=info['first_seen'],
+                # A day already recorded keeps its record; this is not a later sighting
+                record_time_out=False
+            )
+        return results